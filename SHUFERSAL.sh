@@ -8,6 +8,9 @@ LATEST_LOG="$LOG_DIR/shufersal_latest.log"
 # Create logs directory if it doesn't exist
 mkdir -p "$LOG_DIR"
 
+# Run id shared by every Python process of this execution (see run_logging.py)
+export RUN_ID="${RUN_ID:-$(date +%Y%m%d_%H%M%S)_$$}"
+
 # Function to log messages with timestamp (before exec redirect)
 log_message_initial() {
     local level="$1"
@@ -77,10 +80,48 @@ else
     log_message "WARNING" ".env file not found"
 fi
 
+# Pre-flight: one plain HTTP request before paying for Chrome cleanup/launch
+# Exit codes: 13 = geo-block maintenance page, 14 = site outage (see preflight.py)
+log_message "INFO" "Running pre-flight check..."
+python preflight.py
+PREFLIGHT_EXIT_CODE=$?
+if [ $PREFLIGHT_EXIT_CODE -eq 13 ]; then
+    log_message "ERROR" "Failure reason: Geographic blocking detected (non-Israeli IP) - browser not launched"
+    cp "$LOG_FILE" "$LATEST_LOG"
+    exit $PREFLIGHT_EXIT_CODE
+elif [ $PREFLIGHT_EXIT_CODE -eq 14 ]; then
+    log_message "ERROR" "Failure reason: Shufersal site unreachable or down - browser not launched"
+    cp "$LOG_FILE" "$LATEST_LOG"
+    exit $PREFLIGHT_EXIT_CODE
+elif [ $PREFLIGHT_EXIT_CODE -ne 0 ]; then
+    log_message "ERROR" "Pre-flight check failed with exit code $PREFLIGHT_EXIT_CODE"
+    cp "$LOG_FILE" "$LATEST_LOG"
+    exit $PREFLIGHT_EXIT_CODE
+fi
+
+# Chrome/driver pair from the provisioning cache (exit 6 = mismatch or not provisioned, see provision.py).
+# Not provisioned yet or Chrome updated: provision once now; if that fails too, fall back to
+# SeleniumBase's own driver handling as before provisioning existed
+log_message "INFO" "Checking Chrome and driver versions..."
+python provision.py check
+PROVISION_EXIT_CODE=$?
+if [ $PROVISION_EXIT_CODE -eq 6 ]; then
+    log_message "INFO" "Drivers not provisioned for this Chrome, running: python provision.py install"
+    if ! python provision.py install; then
+        log_message "WARNING" "Driver provisioning failed, continuing with SeleniumBase's driver download"
+    fi
+elif [ $PROVISION_EXIT_CODE -ne 0 ]; then
+    log_message "WARNING" "Driver check failed with exit code $PROVISION_EXIT_CODE, continuing with SeleniumBase's driver handling"
+fi
+
 log_message "INFO" "Checking for running Chrome and driver instances..."
 
 # Use our cross-platform cleanup script
-if [ -f "./cleanup_processes.sh" ]; then
+# Under scheduler.py the per-job lock already guarantees no previous run is alive,
+# and a machine-wide kill would take down other jobs' browsers
+if [ -n "$SCHEDULER_JOB" ]; then
+    log_message "INFO" "Running as scheduler job '$SCHEDULER_JOB' (job lock held), skipping machine-wide cleanup"
+elif [ -f "./cleanup_processes.sh" ]; then
     log_message "INFO" "Running cross-platform process cleanup..."
     ./cleanup_processes.sh cleanup
 else
@@ -103,7 +144,13 @@ log_message "INFO" "Configuration: SAVE=$SAVE ACTIVATE=$ACTIVATE MAX_ROWS=$MAX_R
 
 # Run the test and capture exit code
 log_message "INFO" "Executing pytest command..."
-SAVE=$SAVE ACTIVATE=$ACTIVATE MAX_ROWS=$MAX_ROWS pytest test_shufersal.py -s -v --uc
+# PREFLIGHT=False: already probed above
+# ADAPTIVE=True: start with the cheapest browser tier and escalate only when challenged
+if [ "${ADAPTIVE:-False}" = "True" ]; then
+    PREFLIGHT=False SAVE=$SAVE ACTIVATE=$ACTIVATE MAX_ROWS=$MAX_ROWS python adaptive_launch.py shufersal
+else
+    PREFLIGHT=False SAVE=$SAVE ACTIVATE=$ACTIVATE MAX_ROWS=$MAX_ROWS pytest test_shufersal.py -s -v --uc
+fi
 PYTEST_EXIT_CODE=$?
 
 # Log execution results
@@ -123,12 +170,19 @@ else
     log_message "ERROR" "SHUFERSAL AUTOMATION FAILED"
     log_message "ERROR" "Exit code: $PYTEST_EXIT_CODE"
     
-    # Check for common error patterns in the log
-    if grep -q "GEO-BLOCKING DETECTED" "$LOG_FILE"; then
+    # Classify the failure from the structured log (logs/shufersal.jsonl), not by grepping text
+    FAILURE_EVENT=$(python run_logging.py failure "$RUN_ID" shufersal)
+    if [ $PYTEST_EXIT_CODE -eq 10 ]; then
+        log_message "ERROR" "Failure reason: Bot challenge/block on every browser tier (adaptive launch)"
+    elif [ "$FAILURE_EVENT" = "geo_block" ]; then
         log_message "ERROR" "Failure reason: Geographic blocking detected (non-Israeli IP)"
-    elif grep -q "Login failed" "$LOG_FILE"; then
+    elif [ "$FAILURE_EVENT" = "login_failed" ]; then
         log_message "ERROR" "Failure reason: Login authentication failed"
-    elif grep -q "NO COUPONS FOUND" "$LOG_FILE"; then
+    elif [ "$FAILURE_EVENT" = "missing_credentials" ]; then
+        log_message "ERROR" "Failure reason: SHUFERSAL_EMAIL or SHUFERSAL_PSWD not set"
+    elif [ "$FAILURE_EVENT" = "layout_drift" ]; then
+        log_message "ERROR" "Failure reason: Coupons page layout changed (see data/layout_drift_*.json)"
+    elif [ "$FAILURE_EVENT" = "no_coupons" ]; then
         log_message "ERROR" "Failure reason: No coupons found on the page"
     elif grep -q "SessionNotCreatedException" "$LOG_FILE"; then
         log_message "ERROR" "Failure reason: Chrome session creation failed (Task Scheduler environment issue)"
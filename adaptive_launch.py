@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Headless-first launcher with automatic escalation to UC / virtual display.
+
+Runs the site's pytest file with the cheapest browser tier first:
+
+    headless    plain headless Chrome, images blocked
+    uc-headless --uc --uc-cdp --headless
+    uc-xvfb     headed UC under a virtual display (--xvfb on Linux, headed elsewhere)
+
+A run exits with EXIT_ESCALATE when the page-state classifier sees a bot
+challenge; the launcher then retries one tier up. A geo-block (maintenance
+page) exits 13 right away and is not retried, since no browser tier gets
+past it. Only a passing run counts as working (a failed login fails the test). The tier that last worked is remembered per site in
+data/launch_tiers.json and used as the starting point next time (cheaper tiers are re-tried after
+RETRY_CHEAPER_DAYS).
+
+Usage:
+    python adaptive_launch.py shufersal [extra pytest args, e.g. --proxy=host:port]
+"""
+import os
+import sys
+import json
+import logging
+import datetime
+import subprocess
+
+log = logging.getLogger(__name__)
+
+# Outside pytest's own exit codes (5 is NO_TESTS_COLLECTED) and preflight's 13/14
+EXIT_ESCALATE = 10
+
+STATE_FILE = os.path.join('.', 'data', 'launch_tiers.json')
+RETRY_CHEAPER_DAYS = 7
+
+SITES = {
+    'shufersal': 'test_shufersal.py',
+}
+
+TIERS = [
+    ('headless', ['--headless', '--block-images']),
+    ('uc-headless', ['--uc', '--uc-cdp', '--headless']),
+    ('uc-xvfb', ['--uc', '--xvfb'] if sys.platform.startswith('linux') else ['--uc']),
+]
+TIER_NAMES = [name for name, _ in TIERS]
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, path)
+
+
+def starting_tier(site, state, today=None):
+    """Index of the tier to start from: the last one that worked, unless it is time to retry cheaper"""
+    entry = state.get(site)
+    if not entry or entry.get('tier') not in TIER_NAMES:
+        return 0
+    today = today or datetime.date.today()
+    recorded = datetime.date.fromisoformat(entry['date'])
+    if (today - recorded).days >= RETRY_CHEAPER_DAYS:
+        return 0
+    return TIER_NAMES.index(entry['tier'])
+
+
+def run(site, extra_args=()):
+    if site not in SITES:
+        log.error(f"[FAIL] Unknown site '{site}'. Known sites: {', '.join(SITES)}")
+        return 2
+    state = load_state()
+    first = starting_tier(site, state)
+    env = dict(os.environ, ADAPTIVE_LAUNCH='True')
+
+    code = EXIT_ESCALATE
+    for index in range(first, len(TIERS)):
+        name, args = TIERS[index]
+        cmd = [sys.executable, '-m', 'pytest', SITES[site], '-s', '-v'] + args + list(extra_args)
+        log.info(f"[LAUNCH] {site}: tier '{name}' -> {' '.join(cmd[3:])}")
+        code = subprocess.call(cmd, env=env)
+        if code != EXIT_ESCALATE:
+            if code == 0:
+                state[site] = {'tier': name, 'date': datetime.date.today().isoformat()}
+                save_state(state)
+                log.info(f"[OK] {site}: tier '{name}' succeeded and was remembered")
+            return code
+        log.info(f"[RETRY] {site}: tier '{name}' was challenged, escalating")
+    log.error(f"[FAIL] {site}: challenged on every tier")
+    return code
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(2)
+    import run_logging
+    run_logging.setup_logging('adaptive_launch')
+    sys.exit(run(sys.argv[1], sys.argv[2:]))
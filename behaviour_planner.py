@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Human-like behaviour planner that overlaps stealth delays with useful work.
+
+plan_behaviours() draws the whole randomized timeline up front with the same
+probabilities and delay ranges as the original serial code. BehaviourRunner
+then performs each action and, instead of plainly sleeping through the dwell
+time that follows it, runs queued work (page classification, filter clicks,
+bulk DOM reads, file writes) inside that idle window and sleeps only for what
+is left. Wall time becomes roughly max(behaviour track, work track).
+
+WebDriver is not thread safe, so work runs on the main thread between
+actions - the overlap is with dwell time, not with other driver calls.
+"""
+import time
+import random
+import logging
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+
+def plan_behaviours(is_headless, rng=random):
+    """
+    Return the behaviour timeline as a list of (action, params, dwell_seconds).
+    A planned refresh is moved to the front so work done afterwards is not invalidated,
+    followed by the disclaimer so work never runs under it.
+    """
+    steps = []
+
+    # Random additional browsing simulation (reading pause, occasional refresh)
+    reading = rng.random() < 0.25
+    if reading and rng.random() < 0.1:
+        steps.append(('refresh', {}, rng.uniform(2.0, 4.0)))
+
+    # Random chance to close disclaimer message (3 out of 4 times)
+    # Comes before any idle window so queued work never clicks under the disclaimer
+    if rng.random() < 0.75:
+        steps.append(('disclaimer', {
+            'pre_delay': rng.uniform(0.5, 1.2),
+            'hover': not is_headless and rng.random() < 0.6,
+            'hover_delay': rng.uniform(0.2, 0.5),
+        }, rng.uniform(0.3, 0.9)))
+    else:
+        steps.append(('skip_disclaimer', {}, 0.0))
+
+    if reading:
+        steps.append(('reading', {}, rng.uniform(1.0, 2.5)))
+
+    # Random scroll behavior (simulate reading) - works in headless
+    if rng.random() < 0.4:
+        steps.append(('scroll', {'position': rng.randint(200, 800)}, rng.uniform(0.8, 2.0)))
+        steps.append(('scroll', {'position': 0}, rng.uniform(0.3, 0.7)))
+
+    # Random mouse movement simulation - skip in headless mode
+    if not is_headless and rng.random() < 0.35:
+        steps.append(('hover', {'index': rng.randint(0, 4)}, rng.uniform(0.2, 0.8)))
+
+    # Randomly resize browser window - skip in headless mode
+    if not is_headless and rng.random() < 0.35:
+        steps.append(('resize', {
+            'width_variance': rng.randint(-150, 200),
+            'height_variance': rng.randint(-80, 120),
+        }, rng.uniform(0.5, 1.8)))
+        if rng.random() < 0.15:
+            steps.append(('minimize', {}, rng.uniform(0.5, 1.2)))
+            steps.append(('maximize', {}, rng.uniform(0.3, 0.8)))
+
+    # Random page interaction delay - works in headless
+    steps.append(('interaction_delay', {}, rng.uniform(1.2, 3.5)))
+    return steps
+
+
+class BehaviourRunner:
+    """Performs a behaviour plan and runs queued work inside its idle windows"""
+
+    DISCLAIMER_BUTTON = "#couponsPage > div.disclaimerSection > button"
+    # Dwell after these is a plain sleep: the page is reloading or the window is minimized
+    NO_WORK_ACTIONS = ('refresh', 'minimize')
+
+    def __init__(self, sb):
+        self.sb = sb
+        self.work = deque()
+        self.results = {}
+        self.idle_total = 0.0
+        self.work_total = 0.0
+
+    def add_work(self, name, func):
+        """Queue func(); its return value is stored in results[name], exceptions propagate"""
+        self.work.append((name, func))
+
+    def idle(self, seconds):
+        """Spend `seconds` running queued work, sleeping only for the remainder"""
+        self.idle_total += seconds
+        deadline = time.monotonic() + seconds
+        while self.work and time.monotonic() < deadline:
+            self._run_next()
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def finish(self):
+        """Run any work that did not fit into the idle windows"""
+        while self.work:
+            self._run_next()
+        saved = min(self.idle_total, self.work_total)
+        log.info(f"[TIME] Behaviour idle {self.idle_total:.1f}s, work {self.work_total:.1f}s, overlapped {saved:.1f}s")
+        return self.results
+
+    def run(self, plan):
+        for action, params, dwell in plan:
+            try:
+                getattr(self, '_do_' + action)(**params)
+            except Exception as e:
+                log.warning(f"[WARN] Could not perform {action} behavior: " + str(e))
+            if action in self.NO_WORK_ACTIONS:
+                time.sleep(dwell)
+            else:
+                self.idle(dwell)
+        return self.finish()
+
+    def _run_next(self):
+        # Work handles its own recoverable errors; anything raised (e.g. a test failure) aborts the run
+        name, func = self.work.popleft()
+        start = time.monotonic()
+        try:
+            self.results[name] = func()
+        finally:
+            self.work_total += time.monotonic() - start
+
+    # Actions - no sleeping here, dwell time is handled by idle()
+
+    def _do_reading(self):
+        log.info("[READ] Simulating reading behavior...")
+
+    def _do_refresh(self):
+        log.info("[RETRY] Random page refresh")
+        self.sb.refresh_page()
+
+    def _do_disclaimer(self, pre_delay, hover, hover_delay):
+        if not self.sb.is_element_present(self.DISCLAIMER_BUTTON):
+            log.info("[INFO] No disclaimer message found")
+            return
+        log.info("[INFO] Closing disclaimer message...")
+        time.sleep(pre_delay)
+        if hover:
+            from selenium.webdriver.common.action_chains import ActionChains
+            element = self.sb.find_element(self.DISCLAIMER_BUTTON)
+            ActionChains(self.sb.driver).move_to_element(element).perform()
+            time.sleep(hover_delay)
+            log.info("[MOUSE] Moved mouse to disclaimer button")
+        self.sb.click(self.DISCLAIMER_BUTTON)
+        log.info("[OK] Disclaimer closed")
+
+    def _do_skip_disclaimer(self):
+        log.info("[DICE] Randomly chose not to close disclaimer (human-like behavior)")
+
+    def _do_scroll(self, position):
+        self.sb.execute_script(f"window.scrollTo(0, {position});")
+        log.info(f"[SCROLL] Random scroll to position {position}")
+
+    def _do_hover(self, index):
+        from selenium.webdriver.common.action_chains import ActionChains
+        elements = self.sb.find_elements("div, span, button")[:5]
+        if elements:
+            ActionChains(self.sb.driver).move_to_element(elements[index % len(elements)]).perform()
+            log.info("[MOUSE] Random mouse hover simulation")
+
+    def _do_resize(self, width_variance, height_variance):
+        current_size = self.sb.driver.get_window_size()
+        new_width = max(1000, min(1600, current_size['width'] + width_variance))
+        new_height = max(700, min(1200, current_size['height'] + height_variance))
+        self.sb.driver.set_window_size(new_width, new_height)
+        log.info(f"[SCREEN] Randomly resized browser to {new_width}x{new_height}")
+
+    def _do_minimize(self):
+        self.sb.driver.minimize_window()
+        log.info("Minimized window")
+
+    def _do_maximize(self):
+        self.sb.driver.maximize_window()
+        log.info("Restored window")
+
+    def _do_interaction_delay(self):
+        log.info("[TIME] Random interaction delay")
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""Local web UI for browsing coupon history and marking preferences.
+
+All data/*.csv files are imported once into an SQLite store
+(data/coupons.sqlite); later refreshes import only new or changed files. Each
+distinct coupon is one row with first/last seen dates, and an FTS5 index covers
+its normalized title, store and description (niqqud stripped, final letters
+folded), so a search never touches the CSVs.
+
+The browser only receives one page of results at a time. API responses carry
+an ETag derived from the store version, preferences file and query, so a
+repeated request is answered with 304 without running the query.
+Exclude/emphasize marks go through preferences.py, which writes atomically.
+
+Usage:
+    python coupon_browser.py [--port 8765]     # then open http://127.0.0.1:8765/
+"""
+import os
+import re
+import sys
+import glob
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import datetime
+import threading
+import unicodedata
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import preferences
+import coupon_journal
+
+DB_FILE = os.path.join('.', 'data', 'coupons.sqlite')
+CSV_GLOB = os.path.join('.', 'data', '*.csv')
+PAGE_SIZE = 50
+REFRESH_INTERVAL = 10.0   # seconds between checks for new CSV files
+
+_FINALS = str.maketrans('ךםןףץ', 'כמנפצ')
+_NIQQUD = re.compile('[֑-ׇ]')
+_PUNCT = re.compile(r'[\'"׳״`´]')
+
+
+def normalize(text):
+    """Search form of a text: NFKC, niqqud and geresh/gershayim removed, final letters folded, lowercase"""
+    text = unicodedata.normalize('NFKC', text or '')
+    text = _PUNCT.sub('', _NIQQUD.sub('', text))
+    return text.translate(_FINALS).lower()
+
+
+def fts_query(q):
+    """User query -> FTS5 query: every word must match as a prefix"""
+    words = re.findall(r'\w+', normalize(q))
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _seen_date(path):
+    """Run date from the CSV name (%m_%d_%Y_%H_%M_%S), file mtime otherwise"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    try:
+        return datetime.datetime.strptime(name, '%m_%d_%Y_%H_%M_%S').isoformat()
+    except ValueError:
+        return datetime.datetime.fromtimestamp(os.path.getmtime(path)).isoformat()
+
+
+class CouponStore:
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL, rows INTEGER);
+    CREATE TABLE IF NOT EXISTS coupons (
+        id INTEGER PRIMARY KEY, key TEXT UNIQUE, title TEXT, store TEXT, description TEXT,
+        percent TEXT, date_valid TEXT, restrictions TEXT, activated INTEGER DEFAULT 0,
+        first_seen TEXT, last_seen TEXT, seen INTEGER DEFAULT 0);
+    CREATE INDEX IF NOT EXISTS coupons_last_seen ON coupons (last_seen DESC);
+    CREATE VIRTUAL TABLE IF NOT EXISTS coupons_fts USING fts5(norm);
+    CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE IF NOT EXISTS sightings (path TEXT, key TEXT, PRIMARY KEY (path, key));
+    """
+
+    def __init__(self, path=DB_FILE, csv_glob=CSV_GLOB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.csv_glob = csv_glob
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(self.SCHEMA)
+        self.lock = threading.RLock()
+        self.checked = 0.0
+
+    def version(self):
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        return int(row['value']) if row else 0
+
+    def refresh(self, force=False):
+        """Import CSV files that are new or changed since the last refresh; returns files imported"""
+        with self.lock:
+            if not force and time.monotonic() - self.checked < REFRESH_INTERVAL:
+                return 0
+            self.checked = time.monotonic()
+            known = {row['path']: row['mtime'] for row in self.db.execute("SELECT path, mtime FROM files")}
+            changed = [p for p in sorted(glob.glob(self.csv_glob), key=_seen_date)
+                       if known.get(p) != os.path.getmtime(p)]
+            if not changed:
+                return 0
+            with self.db:
+                for path in changed:
+                    self._import(path)
+                self.db.execute("INSERT INTO meta VALUES ('version', ?) ON CONFLICT(name) DO UPDATE SET value = ?",
+                                (self.version() + 1, self.version() + 1))
+            return len(changed)
+
+    def _import(self, path):
+        import csv
+        seen = _seen_date(path)
+        with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.DictReader(f))
+        for row in rows:
+            key = coupon_journal.coupon_key({}, {'title': row.get('title', ''), 'description': row.get('description', '')})
+            activated = 1 if str(row.get('activated')).lower() in ('true', '1', 't') else 0
+            # One sighting per run file and coupon: re-importing a changed CSV does not count it again
+            new_sighting = self.db.execute("INSERT OR IGNORE INTO sightings VALUES (?, ?)", (path, key)).rowcount
+            existing = self.db.execute("SELECT id, first_seen, last_seen FROM coupons WHERE key = ?", (key,)).fetchone()
+            if existing is None:
+                cursor = self.db.execute(
+                    "INSERT INTO coupons (key, title, store, description, percent, date_valid, restrictions,"
+                    " activated, first_seen, last_seen, seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)",
+                    (key, row.get('title'), row.get('store'), row.get('description'), row.get('percent'),
+                     row.get('dateValid'), row.get('restrictions'), activated, seen, seen))
+                norm = normalize(' '.join(row.get(k) or '' for k in ('title', 'store', 'description')))
+                self.db.execute("INSERT INTO coupons_fts (rowid, norm) VALUES (?, ?)", (cursor.lastrowid, norm))
+            else:
+                self.db.execute(
+                    "UPDATE coupons SET seen = seen + ?, activated = max(activated, ?),"
+                    " first_seen = min(first_seen, ?), last_seen = max(last_seen, ?),"
+                    " percent = CASE WHEN ? >= last_seen THEN ? ELSE percent END,"
+                    " date_valid = CASE WHEN ? >= last_seen THEN ? ELSE date_valid END WHERE id = ?",
+                    (new_sighting, activated, seen, seen, seen, row.get('percent'), seen, row.get('dateValid'),
+                     existing['id']))
+        self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (path, os.path.getmtime(path), len(rows)))
+
+    def query(self, q='', page=1, size=PAGE_SIZE, preference='', activated=None, prefs=None):
+        """One page of coupons, newest first: (total, [dict]) - filtering and paging run in SQL"""
+        where, params = [], []
+        if q and fts_query(q):
+            where.append("id IN (SELECT rowid FROM coupons_fts WHERE coupons_fts MATCH ?)")
+            params.append(fts_query(q))
+        if activated is not None:
+            where.append("activated = ?")
+            params.append(1 if activated else 0)
+        if preference:
+            # Same substring rule as preferences.classify(), evaluated in SQL
+            prefs = prefs or preferences.load()
+            terms = [t.lower() for t in prefs.get(preference, [])]
+            match = "instr(lower(coalesce(title, '') || ' ' || coalesce(description, '')), ?) > 0"
+            where.append('(' + ' OR '.join([match] * len(terms)) + ')' if terms else '0')
+            params.extend(terms)
+        clause = (' WHERE ' + ' AND '.join(where)) if where else ''
+        with self.lock:
+            total = self.db.execute(f"SELECT count(*) FROM coupons{clause}", params).fetchone()[0]
+            rows = self.db.execute(
+                f"SELECT * FROM coupons{clause} ORDER BY last_seen DESC, id LIMIT ? OFFSET ?",
+                params + [size, (max(page, 1) - 1) * size]).fetchall()
+        prefs = prefs or preferences.load()
+        coupons = []
+        for row in rows:
+            coupon = dict(row)
+            coupon['preference'], coupon['preference_term'] = preferences.classify(coupon, prefs)
+            coupons.append(coupon)
+        return total, coupons
+
+
+PAGE_HTML = """<!DOCTYPE html>
+<html dir="rtl" lang="he"><head><meta charset="utf-8"><title>Coupons</title>
+<style>
+body { font-family: sans-serif; margin: 1em; }
+table { border-collapse: collapse; width: 100%; }
+td, th { border-bottom: 1px solid #ddd; padding: 4px 6px; text-align: right; }
+tr.exclude { color: #999; text-decoration: line-through; }
+tr.emphasize { background: #fff6cc; }
+</style></head><body>
+<form id="f"><input name="q" placeholder="search" size="40">
+<select name="preference"><option value="">all</option><option>emphasize</option><option>exclude</option></select>
+<select name="activated"><option value="">any</option><option value="1">activated</option><option value="0">not activated</option></select>
+<button>search</button></form>
+<p id="info"></p><table id="t"></table>
+<p><button id="prev">prev</button> <button id="next">next</button></p>
+<script>
+var page = 1;
+function esc(s) { var d = document.createElement('div'); d.textContent = s || ''; return d.innerHTML; }
+function load() {
+    var params = new URLSearchParams(new FormData(document.getElementById('f')));
+    params.set('page', page);
+    fetch('/api/coupons?' + params).then(function (r) { return r.json(); }).then(function (data) {
+        document.getElementById('info').textContent = data.total + ' coupons, page ' + data.page + '/' + data.pages;
+        var html = '<tr><th>title</th><th>store</th><th>deal</th><th>valid</th><th>last seen</th><th>seen</th><th></th></tr>';
+        data.coupons.forEach(function (c) {
+            html += '<tr class="' + c.preference + '"><td>' + esc(c.title) + '</td><td>' + esc(c.store) + '</td><td>' +
+                esc(c.percent) + '</td><td>' + esc(c.date_valid) + '</td><td>' + esc(c.last_seen.slice(0, 10)) +
+                '</td><td>' + c.seen + '</td><td>' +
+                ['exclude', 'emphasize'].map(function (k) {
+                    // Un-marking removes the stored term that matched, which may differ from the title
+                    var action = c.preference === k ? 'remove' : 'add';
+                    var term = action === 'remove' ? c.preference_term : c.title;
+                    return '<button data-kind="' + k + '" data-action="' + action + '" data-term="' + esc(term) + '">' +
+                        (action === 'add' ? k : 'un-' + k) + '</button>';
+                }).join(' ') + '</td></tr>';
+        });
+        document.getElementById('t').innerHTML = html;
+    });
+}
+document.getElementById('t').addEventListener('click', function (e) {
+    var b = e.target;
+    if (!b.dataset.kind) { return; }
+    fetch('/api/prefs', {method: 'POST', headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({action: b.dataset.action, kind: b.dataset.kind, term: b.dataset.term})}).then(load);
+});
+document.getElementById('f').addEventListener('submit', function (e) { e.preventDefault(); page = 1; load(); });
+document.getElementById('prev').onclick = function () { if (page > 1) { page--; load(); } };
+document.getElementById('next').onclick = function () { page++; load(); };
+load();
+</script></body></html>
+"""
+
+
+class Handler(BaseHTTPRequestHandler):
+    store = None
+    prefs_lock = threading.Lock()
+
+    def log_message(self, fmt, *args):
+        pass  # keep the console quiet; one line per request is noise here
+
+    def _send(self, status, body=b'', content_type='application/json; charset=utf-8', headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/':
+            self._send(200, PAGE_HTML.encode('utf-8'), 'text/html; charset=utf-8')
+        elif url.path == '/api/coupons':
+            self.store.refresh()
+            prefs_mtime = os.stat(preferences.PREFERENCES_FILE).st_mtime_ns if os.path.exists(preferences.PREFERENCES_FILE) else 0
+            etag = '"' + hashlib.sha1(f"{self.store.version()}|{prefs_mtime}|{url.query}".encode('utf-8')).hexdigest()[:20] + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self._send(304, headers=[('ETag', etag)])
+                return
+            args = {k: v[0] for k, v in parse_qs(url.query).items()}
+            page = max(int(args.get('page') or 1), 1)
+            activated = {'1': True, '0': False}.get(args.get('activated', ''))
+            total, coupons = self.store.query(args.get('q', ''), page, PAGE_SIZE, args.get('preference', ''), activated)
+            body = json.dumps({'total': total, 'page': page, 'pages': max((total + PAGE_SIZE - 1) // PAGE_SIZE, 1),
+                               'coupons': coupons}, ensure_ascii=False).encode('utf-8')
+            self._send(200, body, headers=[('ETag', etag), ('Cache-Control', 'no-cache')])
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def do_POST(self):
+        if urlsplit(self.path).path != '/api/prefs':
+            self._send(404, b'{"error": "not found"}')
+            return
+        try:
+            data = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            action, kind, term = data['action'], data['kind'], data['term'].strip()
+            if action not in ('add', 'remove') or not term:
+                raise ValueError(f"bad preference update: {data}")
+            with self.prefs_lock:  # read-modify-write of preferences.json
+                prefs = getattr(preferences, action)(kind, term)
+        except (KeyError, ValueError, AttributeError) as e:
+            self._send(400, json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8'))
+            return
+        self._send(200, json.dumps(prefs, ensure_ascii=False).encode('utf-8'))
+
+
+def serve(port=8765, host='127.0.0.1', store=None):
+    Handler.store = store or CouponStore()
+    imported = Handler.store.refresh(force=True)
+    print(f"Imported {imported} CSV files, serving on http://{host}:{port}/")
+    server = ThreadingHTTPServer((host, port), Handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local coupon browser')
+    parser.add_argument('--port', type=int, default=8765)
+    sys.exit(serve(parser.parse_args().port))
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Write-ahead journal of processed coupons for checkpoint/resume.
+
+Every processed coupon is appended to data/journal/<run_id>.jsonl as soon as
+it is extracted/activated and fsynced in small batches. A run that finishes
+writes an 'end' record. With RESUME=True the next run picks up the newest
+journal without an 'end' record, skips coupons it already activated and
+carries its rows into the final CSV. prune() removes journals that can no
+longer be resumed, keeping the newest KEEP_COMPLETED finished ones.
+"""
+import os
+import json
+import glob
+import datetime
+
+JOURNAL_DIR = os.path.join('.', 'data', 'journal')
+KEEP_COMPLETED = 5
+
+
+def coupon_key(record, row):
+    """Stable coupon identity: the promo id, or title+description when it is missing"""
+    if record.get('promo'):
+        return 'promo:' + record['promo']
+    return 'text:' + row['title'] + '|' + row['description']
+
+
+class CouponJournal:
+    def __init__(self, run_id=None, journal_dir=JOURNAL_DIR, batch=5):
+        self.run_id = run_id or datetime.datetime.now().strftime('%m_%d_%Y_%H_%M_%S')
+        self.path = os.path.join(journal_dir, f'{self.run_id}.jsonl')
+        self.batch = batch
+        self.pending = 0
+        os.makedirs(journal_dir, exist_ok=True)
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self._write({'event': 'start'})
+        self.sync()
+
+    def _write(self, entry):
+        entry['ts'] = datetime.datetime.now().isoformat(timespec='seconds')
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def append(self, key, row):
+        self._write({'event': 'coupon', 'key': key, 'row': row})
+        self.pending += 1
+        if self.pending >= self.batch:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+
+    def close(self, completed=True):
+        if completed:
+            self._write({'event': 'end'})
+        self.sync()
+        self.file.close()
+
+
+def read_journal(path):
+    """Return (rows by key in order, completed flag); a torn last line is ignored"""
+    rows = {}
+    completed = False
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break  # partially written line from a crash
+            if entry['event'] == 'coupon':
+                rows[entry['key']] = entry['row']
+            elif entry['event'] == 'end':
+                completed = True
+    return rows, completed
+
+
+def find_incomplete(journal_dir=JOURNAL_DIR):
+    """Return (path, rows by key) of the newest journal without an 'end' record, or (None, {})"""
+    paths = glob.glob(os.path.join(journal_dir, '*.jsonl'))
+    if not paths:
+        return None, {}
+    path = max(paths, key=os.path.getmtime)
+    rows, completed = read_journal(path)
+    if completed:
+        return None, {}  # the latest run finished - nothing to resume
+    return path, rows
+
+
+def prune(journal_dir=JOURNAL_DIR, keep=KEEP_COMPLETED):
+    """
+    Delete journals that are no longer needed and return their paths.
+    The newest journal is always kept (it is the one RESUME would use), other incomplete
+    ones are superseded by it, and of the completed ones the newest `keep` are kept.
+    """
+    paths = sorted(glob.glob(os.path.join(journal_dir, '*.jsonl')), key=os.path.getmtime, reverse=True)
+    removed, kept = [], 0
+    for path in paths[1:]:
+        _, completed = read_journal(path)
+        if completed and kept < keep:
+            kept += 1
+            continue
+        os.remove(path)
+        removed.append(path)
+    return removed
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Bulk extraction of coupon tiles.
+
+All fields of every tile are read in a single execute_script call; the
+returned records carry a WebElement reference so activation can still click
+the tile's button.
+"""
+import re
+
+LIST_SELECTOR = '.couponsCards .tileContainer li'
+
+# Fallbacks tried in order when the main selector finds nothing
+ALTERNATIVE_SELECTORS = [
+    '.couponsCards li',
+    '.tileContainer li',
+    'li[data-coupon]',
+    '.coupon-item',
+    '.coupon-card',
+    '[class*="coupon"]',
+    '[class*="tile"]',
+    '.grid-item',
+    'li'  # Very broad fallback
+]
+
+ACTIVATE_BUTTON = 'button.miglog-btn-promo.miglog-btn-add'
+
+TILE_RECORDS_JS = """
+var selector = arguments[0], visibleOnly = arguments[1], activateButton = arguments[2];
+function text(root, sel) {
+    var el = root.querySelector(sel);
+    return el ? (el.innerText || '').trim() : null;
+}
+var out = [];
+var items = document.querySelectorAll(selector);
+for (var i = 0; i < items.length; i++) {
+    var li = items[i];
+    if (visibleOnly && !(li.offsetWidth || li.offsetHeight || li.getClientRects().length)) { continue; }
+    var tile = li.querySelector('.tile');
+    var img = li.querySelector('.imgContainer img.pic');
+    var btn = li.querySelector(activateButton);
+    out.push({
+        element: li,
+        promo: tile ? tile.getAttribute('data-promo') || '' : '',
+        productCode: tile ? tile.getAttribute('data-product-code') || '' : '',
+        description: text(li, '.description'),
+        percent: text(li, '.price .number'),
+        title: text(li, '.title'),
+        imgAlt: img ? img.getAttribute('alt') : null,
+        smallText: text(li, '.smallText.grayBg'),
+        allText: (li.innerText || '').trim(),
+        button: btn,
+        buttonText: btn ? (btn.innerText || '').trim() : null,
+        buttonUsable: !!(btn && !btn.disabled && (btn.offsetWidth || btn.offsetHeight))
+    });
+}
+return out;
+"""
+
+
+def read_tiles(sb, selector=LIST_SELECTOR, visible_only=True):
+    """Return tile records for selector in one WebDriver call"""
+    return sb.execute_script(TILE_RECORDS_JS, selector, visible_only, ACTIVATE_BUTTON) or []
+
+
+def row_from_record(record):
+    """Build a CSV row from a tile record (same rules as the per-element extraction)"""
+    title = ''
+    store = ''
+    description = record.get('description') or ''
+    percent = record.get('percent') or ''
+
+    # Try to extract store/brand name (usually at the end after comma)
+    if description:
+        if ',' in description:
+            parts = description.split(',')
+            title = parts[0].strip()
+            store = parts[-1].strip()
+        else:
+            title = description
+
+    # If still no title, try the hidden title div
+    if not title and record.get('title'):
+        title = record['title']
+
+    # Extract from alt text if needed
+    alt_text = record.get('imgAlt')
+    if not title and alt_text and 'cleartext' in alt_text:
+        match = re.search(r'cleartext-->(.*?)<', alt_text)
+        if match:
+            content = match.group(1)
+            if '₪' in content:
+                title = content.split('₪')[0].strip()
+
+    # If we couldn't extract structured data, fall back to all text
+    if not title and not description:
+        lines = [line.strip() for line in (record.get('allText') or '').split('\n') if line.strip()]
+        if lines:
+            title = lines[0]
+            if len(lines) > 1:
+                description = ' '.join(lines[1:])
+
+    row = {
+        'title': title,
+        'store': store,
+        'description': description,
+        'percent': percent,
+        'dateValid': '',
+        'restrictions': '',
+        'activated': False  # Will be set to True if activation succeeds
+    }
+
+    # Validity date and restrictions from the smallText section
+    for line in (record.get('smallText') or '').split('\n'):
+        line = line.strip()
+        if 'תקף עד:' in line:  # "Valid until" in Hebrew
+            row['dateValid'] = line
+        elif 'מוגבל' in line:  # "Limited" in Hebrew
+            row['restrictions'] = line
+    return row
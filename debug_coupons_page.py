@@ -1,5 +1,8 @@
 import os
 from seleniumbase import BaseCase
+import run_logging
+
+log = run_logging.setup_logging('debug_coupons_page')
 
 class DebugCouponsPage(BaseCase):
     def test_debug_page_structure(self):
@@ -25,7 +28,7 @@ class DebugCouponsPage(BaseCase):
         with open('./web_extracts/shufersal/coupons_page_current.html', 'w', encoding='utf-8') as f:
             f.write(page_source)
         
-        print("✅ Page source saved to ./web_extracts/shufersal/coupons_page_current.html")
+        log.info("[OK] Page source saved to ./web_extracts/shufersal/coupons_page_current.html")
         
         # Try to find coupon elements with various selectors
         selectors_to_test = [
@@ -42,12 +45,11 @@ class DebugCouponsPage(BaseCase):
         for selector in selectors_to_test:
             try:
                 elements = self.find_elements(selector)
-                print(f"Selector '{selector}': Found {len(elements)} elements")
+                log.info(f"Selector '{selector}': Found {len(elements)} elements")
                 if len(elements) > 0:
                     # Show first element's text and HTML
                     first_elem = elements[0]
-                    print(f"  First element text: {first_elem.text[:100]}...")
-                    print(f"  First element HTML: {first_elem.get_attribute('outerHTML')[:200]}...")
-                    print()
+                    log.info(f"  First element text: {first_elem.text[:100]}...")
+                    log.info(f"  First element HTML: {first_elem.get_attribute('outerHTML')[:200]}...")
             except Exception as e:
-                print(f"Selector '{selector}': Error - {e}")
+                log.warning(f"Selector '{selector}': Error - {e}")
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""Pool of long-lived Xvfb servers for headed UC runs on Linux.
+
+Instead of starting a fresh virtual display for every run, N Xvfb servers
+(:90, :91, ... by default) are kept alive between jobs. Each browser job
+leases one with an exclusive file lock, so concurrent jobs - in the same or
+in different processes - never share or collide on a display number.
+Displays are health-checked on lease and recycled when unhealthy or after
+MAX_LEASES uses.
+
+Usage:
+    with DisplayPool().lease() as display:   # sets DISPLAY for the block
+        ...
+    python display_pool.py status|stop
+"""
+import os
+import sys
+import json
+import logging
+import time
+import shutil
+import signal
+import tempfile
+import subprocess
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+POOL_DIR = os.path.join(tempfile.gettempdir(), 'pytests_display_pool')
+DEFAULT_SIZE = int(os.environ.get('DISPLAY_POOL_SIZE', 2))
+DEFAULT_BASE = int(os.environ.get('DISPLAY_POOL_BASE', 90))
+SCREEN = '1440x1880x24'
+MAX_LEASES = 50
+
+
+class DisplayPool:
+    def __init__(self, size=DEFAULT_SIZE, base=DEFAULT_BASE, screen=SCREEN, max_leases=MAX_LEASES):
+        if not sys.platform.startswith('linux'):
+            raise RuntimeError("Display pool is only supported on Linux")
+        if not shutil.which('Xvfb'):
+            raise RuntimeError("Xvfb not found. Install it with: sudo apt install xvfb")
+        self.displays = [base + i for i in range(size)]
+        self.screen = screen
+        self.max_leases = max_leases
+        os.makedirs(POOL_DIR, exist_ok=True)
+
+    def _path(self, n, ext):
+        return os.path.join(POOL_DIR, f'display_{n}.{ext}')
+
+    def _read_state(self, n):
+        try:
+            with open(self._path(n, 'json'), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'pid': None, 'leases': 0}
+
+    def _write_state(self, n, state):
+        with open(self._path(n, 'json'), 'w') as f:
+            json.dump(state, f)
+
+    def healthy(self, n):
+        """Xvfb process alive and its X socket present"""
+        pid = self._read_state(n).get('pid')
+        if not pid:
+            return False
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            return False
+        return os.path.exists(f'/tmp/.X11-unix/X{n}')
+
+    def _start(self, n, timeout=5.0):
+        proc = subprocess.Popen(
+            ['Xvfb', f':{n}', '-screen', '0', self.screen, '-nolisten', 'tcp'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True,  # survives the job that started it
+        )
+        self._write_state(n, {'pid': proc.pid, 'leases': 0})
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"Xvfb :{n} exited with code {proc.returncode} (display number in use?)")
+            if os.path.exists(f'/tmp/.X11-unix/X{n}'):
+                log.info(f"[SCREEN] Started Xvfb :{n} (pid {proc.pid})")
+                return
+            time.sleep(0.05)
+        raise RuntimeError(f"Xvfb :{n} did not come up within {timeout}s")
+
+    def _stop(self, n):
+        pid = self._read_state(n).get('pid')
+        if pid:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                log.info(f"[SCREEN] Stopped Xvfb :{n} (pid {pid})")
+            except OSError:
+                pass
+        self._write_state(n, {'pid': None, 'leases': 0})
+
+    def _try_lock(self, n):
+        import fcntl
+        f = open(self._path(n, 'lock'), 'w')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return None
+        return f
+
+    @contextmanager
+    def lease(self, timeout=120.0, set_env=True):
+        """Lease a healthy display for the duration of the block; yields ':N'"""
+        deadline = time.monotonic() + timeout
+        lock = None
+        while lock is None:
+            for n in self.displays:
+                lock = self._try_lock(n)
+                if lock:
+                    break
+            if lock is None:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"No free display in pool {self.displays} after {timeout}s")
+                time.sleep(0.5)
+
+        previous = os.environ.get('DISPLAY')
+        try:
+            if not self.healthy(n):
+                self._stop(n)
+                self._start(n)
+            state = self._read_state(n)
+            state['leases'] += 1
+            self._write_state(n, state)
+            display = f':{n}'
+            if set_env:
+                os.environ['DISPLAY'] = display
+            log.info(f"[SCREEN] Leased display {display} (use {state['leases']}/{self.max_leases})")
+            yield display
+        finally:
+            if set_env:
+                if previous is None:
+                    os.environ.pop('DISPLAY', None)
+                else:
+                    os.environ['DISPLAY'] = previous
+            if self._read_state(n)['leases'] >= self.max_leases:
+                self._stop(n)  # recycled lazily on the next lease
+            lock.close()
+
+    def status(self):
+        for n in self.displays:
+            state = self._read_state(n)
+            print(f":{n} pid={state.get('pid')} leases={state.get('leases')} healthy={self.healthy(n)}")
+
+    def stop_all(self):
+        for n in self.displays:
+            lock = self._try_lock(n)
+            if lock is None:
+                log.warning(f"[WARN] Display :{n} is leased, not stopping it")
+                continue
+            self._stop(n)
+            lock.close()
+
+
+if __name__ == '__main__':
+    import run_logging
+    run_logging.setup_logging('display_pool')
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    pool = DisplayPool()
+    if command == 'stop':
+        pool.stop_all()
+    elif command == 'status':
+        pool.status()
+    else:
+        print(__doc__)
+        sys.exit(2)
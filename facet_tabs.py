@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""Facet-partitioned coupon extraction across several tabs of one browser session.
+
+The coupon categories (#filter_categorys facet, with their result counts)
+are read in one call and packed into N partitions of similar size, largest
+category first. Each partition gets its own tab of the logged-in browser:
+
+  1. all tabs are opened and their navigation started without waiting, so
+     the pages load in parallel
+  2. in each tab the "not activated" status plus the partition's categories
+     are selected and "show results" is clicked, again without waiting
+  3. each tab is read with one bulk DOM call once its old grid is gone (or
+     the URL changed) and the new one has settled
+
+Records carry the handle of their tab ('tab') so activation can switch to
+it, and are merged de-duplicated by data-product-code (promo id when a
+tile has no product code). Usable tiles of the unfiltered main tab that no
+partition returned (coupons in no category) are logged and kept with the
+main tab's handle. close_tabs() closes the partition tabs after activation.
+"""
+import time
+import logging
+
+import coupon_tiles
+
+log = logging.getLogger(__name__)
+
+FACETS_JS = """
+var out = [];
+document.querySelectorAll('#filter_categorys input.js-facet-checkbox').forEach(function (input) {
+    var label = document.querySelector('label[for="' + input.id + '"]');
+    var count = label && label.querySelector('.searchCount');
+    var name = label && label.querySelector('.searchName');
+    out.push({id: input.id, name: name ? name.textContent.trim() : '',
+              count: count ? parseInt(count.textContent, 10) || 0 : 0});
+});
+return out;
+"""
+
+# Select status + categories and submit; the grid reloads asynchronously.
+# The current first tile and URL are remembered so the reload can be detected.
+APPLY_JS = """
+var ids = arguments[0];
+window.__facetGridBefore = document.querySelector(arguments[1]);
+window.__facetUrlBefore = location.href;
+function press(id) {
+    var button = document.querySelector('label[for="' + id + '"] > button');
+    if (!button) { throw new Error('facet ' + id + ' not found'); }
+    button.click();
+}
+press('notActivated');
+ids.forEach(press);
+document.querySelector('#filter_categorys').closest('.facet__values')
+    .querySelector('li.wrapperBtnShowResult button').click();
+return true;
+"""
+
+GRID_STATE_JS = """
+return [document.readyState, document.querySelectorAll(arguments[0]).length];
+"""
+
+# True once the grid seen before APPLY_JS was replaced or the page navigated
+# (a full navigation also drops the remembered window properties)
+GRID_REPLACED_JS = """
+var old = window.__facetGridBefore;
+if (location.href !== window.__facetUrlBefore) { return true; }
+return old ? !old.isConnected : !!document.querySelector(arguments[0]);
+"""
+
+
+def plan_partitions(facets, tabs):
+    """Greedy largest-first packing of facets into at most `tabs` partitions of similar total count"""
+    partitions = [[] for _ in range(min(tabs, len(facets)))]
+    totals = [0] * len(partitions)
+    for facet in sorted(facets, key=lambda f: f['count'], reverse=True):
+        index = totals.index(min(totals))
+        partitions[index].append(facet)
+        totals[index] += facet['count']
+    return [p for p in partitions if p]
+
+
+def record_key(record):
+    return record.get('productCode') or 'promo:' + (record.get('promo') or record.get('allText') or '')
+
+
+def merge(record_lists):
+    """Concatenate partition records, keeping the first record per product code (or promo id)"""
+    seen, merged = set(), []
+    for records in record_lists:
+        for record in records:
+            key = record_key(record)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(record)
+    return merged
+
+
+def _wait_ready(sb, selector, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if sb.execute_script("return document.readyState") == 'complete' and sb.is_element_present(selector):
+            return
+        time.sleep(0.2)
+    raise TimeoutError(f"{selector} not present after {timeout}s")
+
+
+def _wait_replaced(sb, timeout):
+    """Wait until the filter submit replaced the grid, so the settle check does not read the old one"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if sb.execute_script(GRID_REPLACED_JS, coupon_tiles.LIST_SELECTOR):
+            return True
+        time.sleep(0.15)
+    log.warning(f"[WARN] Grid not reloaded {timeout}s after applying the categories")
+    return False
+
+
+def _wait_settled(sb, timeout, quiet=0.6):
+    """Wait until the tile count has stopped changing for `quiet` seconds"""
+    deadline = time.monotonic() + timeout
+    last, since = None, time.monotonic()
+    while time.monotonic() < deadline:
+        state = sb.execute_script(GRID_STATE_JS, coupon_tiles.LIST_SELECTOR)
+        if state != last:
+            last, since = state, time.monotonic()
+        elif state[0] == 'complete' and time.monotonic() - since >= quiet:
+            return
+        time.sleep(0.15)
+    log.warning(f"[WARN] Grid still changing after {timeout}s, reading it as is")
+
+
+def extract(sb, url, tabs, timeout=30):
+    """Run the partitioned extraction; returns merged records (with 'tab' handles)"""
+    main = sb.driver.current_window_handle
+    facets = sb.execute_script(FACETS_JS) or []
+    unfiltered = [r for r in coupon_tiles.read_tiles(sb, visible_only=False) if r.get('buttonUsable')]
+    if not facets:
+        raise RuntimeError("No coupon category facets found (#filter_categorys), cannot partition")
+    partitions = plan_partitions(facets, tabs)
+    for i, part in enumerate(partitions):
+        log.info(f"[TAB] Partition {i + 1}: {sum(f['count'] for f in part)} coupons in "
+                 + ', '.join(f"{f['name']} ({f['count']})" for f in part))
+
+    handles = []
+    for _ in partitions:
+        sb.driver.switch_to.new_window('tab')
+        sb.execute_script("window.location.href = arguments[0];", url)  # do not wait for the load
+        handles.append(sb.driver.current_window_handle)
+
+    for handle, part in zip(handles, partitions):
+        sb.driver.switch_to.window(handle)
+        _wait_ready(sb, '#filter_categorys', timeout)
+        sb.execute_script(APPLY_JS, [f['id'] for f in part], coupon_tiles.LIST_SELECTOR)
+
+    record_lists = []
+    for handle in handles:
+        sb.driver.switch_to.window(handle)
+        _wait_replaced(sb, timeout)
+        _wait_settled(sb, timeout)
+        records = coupon_tiles.read_tiles(sb)
+        for record in records:
+            record['tab'] = handle
+        record_lists.append(records)
+
+    sb.driver.switch_to.window(main)
+    merged = merge(record_lists)
+    log.info(f"[TAB] {sum(len(r) for r in record_lists)} tiles from {len(handles)} tabs, {len(merged)} after de-duplication")
+
+    found = {record_key(r) for r in merged}
+    uncategorised = [r for r in unfiltered if record_key(r) not in found]
+    if uncategorised:
+        log.warning(f"[WARN] {len(uncategorised)} coupons are in no category partition, keeping them from the main tab")
+        for record in uncategorised:
+            log.info(f"   {record.get('description') or record.get('title') or record_key(record)}")
+            record['tab'] = main
+        merged.extend(uncategorised)
+    return merged
+
+
+def close_tabs(sb, records, main):
+    """Close the partition tabs opened by extract() and return to the main tab"""
+    tabs = {r['tab'] for r in records if r.get('tab')} - {main}
+    for handle in tabs:
+        if handle in sb.driver.window_handles:
+            sb.driver.switch_to.window(handle)
+            sb.driver.close()
+    sb.driver.switch_to.window(main)
+    return len(tabs)
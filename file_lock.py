@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Exclusive per-name file locks (fcntl on POSIX, msvcrt on Windows).
+
+A lock is held for as long as the returned file stays open, and is released
+by the OS when the holding process dies, so a crashed run never leaves a
+stale lock behind.
+
+Usage:
+    lock = file_lock.try_lock('shufersal')             # None when held elsewhere
+    lock = file_lock.wait_lock('step_latency', timeout=5)
+    ...
+    lock.close()
+"""
+import os
+import time
+
+LOCK_DIR = os.path.join('.', 'data', 'locks')
+
+
+def try_lock(name, lock_dir=LOCK_DIR):
+    """Exclusive non-blocking lock for name; returns the open lock file or None if held"""
+    os.makedirs(lock_dir, exist_ok=True)
+    f = open(os.path.join(lock_dir, f'{name}.lock'), 'a+')
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def wait_lock(name, lock_dir=LOCK_DIR, timeout=60.0, poll=0.5):
+    """Retry try_lock until timeout seconds passed; returns the open lock file or None"""
+    deadline = time.monotonic() + timeout
+    while True:
+        lock = try_lock(name, lock_dir)
+        if lock or time.monotonic() > deadline:
+            return lock
+        time.sleep(poll)
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""Bot-detection fingerprint matrix against a local probe page.
+
+Serves a probe page on 127.0.0.1 that computes the usual automation tells
+and POSTs them back to the server (so nothing depends on the driver still
+being attached, which matters for UC reconnect mode):
+
+    webdriver      navigator.webdriver is true
+    headless_ua    "HeadlessChrome" in the user agent
+    no_plugins     navigator.plugins is empty
+    no_languages   navigator.languages is empty
+    no_chrome      window.chrome missing
+    swiftshader    WebGL renderer is SwiftShader/llvmpipe (software GPU)
+    permissions    Notification.permission contradicts permissions.query
+    cdp_runtime    console.debug serialized an Error (CDP Runtime domain enabled)
+    cdc_vars       chromedriver cdc_ variables on window/document
+    zero_outer     window.outerWidth/outerHeight is 0
+
+Every launch configuration runs in its own process, all in parallel, and
+the result is a table of detected signals and launch time per config,
+saved to data/fingerprint_matrix.json.
+
+Usage:
+    python fingerprint_matrix.py [config ...]     # default: all configs
+"""
+import os
+import sys
+import json
+import time
+import threading
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+RESULTS_FILE = os.path.join('.', 'data', 'fingerprint_matrix.json')
+REPORT_TIMEOUT = 20.0
+
+# name -> SB() keyword arguments
+LAUNCH_MODES = {
+    'plain': {},
+    'headless': {'headless': True},
+    'uc': {'uc': True},
+    'uc-cdp': {'uc': True, 'uc_cdp_events': True},
+    'uc-headless': {'uc': True, 'headless': True},
+}
+if sys.platform.startswith('linux'):
+    LAUNCH_MODES['uc-xvfb'] = {'uc': True, 'xvfb': True}
+
+CONFIGS = {f'{mode}{"+stealth" if stealthy else ""}': (kwargs, stealthy)
+           for mode, kwargs in LAUNCH_MODES.items() for stealthy in (False, True)}
+
+# Same settings test_shufersal.py applies
+STEALTH = dict(
+    languages=["en-US", "en"],
+    vendor="Google Inc.",
+    platform="Win32",
+    webgl_vendor="Intel Inc.",
+    renderer="Intel Iris OpenGL Engine",
+    fix_hairline=True,
+)
+
+PROBE_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>probe</title></head><body><h1 id="status">probing</h1>
+<script>
+(async function () {
+    var s = {};
+    s.webdriver = navigator.webdriver === true;
+    s.headless_ua = /HeadlessChrome/.test(navigator.userAgent);
+    s.no_plugins = !navigator.plugins || navigator.plugins.length === 0;
+    s.no_languages = !navigator.languages || navigator.languages.length === 0;
+    s.no_chrome = !window.chrome;
+    var renderer = '';
+    try {
+        var gl = document.createElement('canvas').getContext('webgl');
+        var ext = gl && gl.getExtension('WEBGL_debug_renderer_info');
+        renderer = ext ? gl.getParameter(ext.UNMASKED_RENDERER_WEBGL) : (gl ? gl.getParameter(gl.RENDERER) : 'none');
+    } catch (e) { renderer = 'error'; }
+    s.swiftshader = /SwiftShader|llvmpipe/i.test(renderer);
+    s.permissions = false;
+    try {
+        var p = await navigator.permissions.query({name: 'notifications'});
+        s.permissions = Notification.permission === 'denied' && p.state === 'prompt';
+    } catch (e) {}
+    var cdp = false, err = new Error();
+    Object.defineProperty(err, 'stack', {get: function () { cdp = true; return ''; }});
+    console.debug(err);
+    s.cdp_runtime = cdp;
+    var names = Object.getOwnPropertyNames(window).concat(Object.getOwnPropertyNames(document));
+    s.cdc_vars = names.some(function (n) { return /^\\$?cdc_|^\\$wdc_/.test(n); });
+    s.zero_outer = window.outerWidth === 0 || window.outerHeight === 0;
+    var info = {userAgent: navigator.userAgent, renderer: renderer, platform: navigator.platform,
+                languages: navigator.languages, hardwareConcurrency: navigator.hardwareConcurrency};
+    await fetch('/report' + location.search, {method: 'POST', body: JSON.stringify({signals: s, info: info})});
+    document.getElementById('status').textContent = 'done';
+})();
+</script></body></html>
+"""
+
+
+class _ProbeHandler(BaseHTTPRequestHandler):
+    reports = None
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        config = parse_qs(url.query).get('config', [''])[0]
+        if url.path == '/':
+            self._send(200, PROBE_HTML.encode('utf-8'), 'text/html; charset=utf-8')
+        elif url.path == '/report' and config in self.reports:
+            self._send(200, json.dumps(self.reports[config]).encode('utf-8'))
+        else:
+            self._send(404, b'{}')
+
+    def do_POST(self):
+        config = parse_qs(urlsplit(self.path).query).get('config', [''])[0]
+        self.reports[config] = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        self._send(200, b'{}')
+
+
+class ProbeServer:
+    def __enter__(self):
+        handler = type('Handler', (_ProbeHandler,), {'reports': {}})
+        self.reports = handler.reports
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/'
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _wait_report(url, timeout=REPORT_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url.replace('/?', '/report?'), timeout=2) as response:
+                return json.loads(response.read())
+        except OSError:
+            time.sleep(0.25)
+    return None
+
+
+def run_config(name, probe_url):
+    """Launch one configuration, load the probe page, return its result (runs in a worker process)"""
+    from seleniumbase import SB
+    kwargs, stealthy = CONFIGS[name]
+    url = f'{probe_url}?config={name}'
+    start = time.perf_counter()
+    result = {'config': name, 'launch_s': None, 'error': None}
+    try:
+        with SB(**kwargs) as sb:
+            result['launch_s'] = round(time.perf_counter() - start, 2)
+            if stealthy:
+                from selenium_stealth import stealth
+                stealth(sb.driver, **STEALTH)
+            if kwargs.get('uc'):
+                sb.uc_open_with_reconnect(url, 2)
+            else:
+                sb.open(url)
+            report = _wait_report(url)
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'.splitlines()[0]
+        return result
+    if report is None:
+        result['error'] = 'probe page did not report'
+        return result
+    result['detected'] = sorted(k for k, v in report['signals'].items() if v)
+    result['info'] = report['info']
+    return result
+
+
+def run_matrix(names=None, workers=None):
+    names = names or list(CONFIGS)
+    unknown = [n for n in names if n not in CONFIGS]
+    if unknown:
+        raise ValueError(f"Unknown configs {unknown}. Known: {', '.join(CONFIGS)}")
+    with ProbeServer() as server, ProcessPoolExecutor(max_workers=workers or len(names)) as executor:
+        results = list(executor.map(run_config, names, [server.url] * len(names)))
+    # Undetected first, then cheapest launch
+    results.sort(key=lambda r: (r['error'] is not None, len(r.get('detected', [])), r['launch_s'] or 1e9))
+    return results
+
+
+def print_table(results):
+    print(f"{'config':22} {'launch':>7}  detected signals")
+    for r in results:
+        launch = f"{r['launch_s']:.1f}s" if r['launch_s'] is not None else '-'
+        signals = r['error'] or (', '.join(r['detected']) or 'none')
+        print(f"{r['config']:22} {launch:>7}  {signals}")
+    clean = [r for r in results if not r['error'] and not r['detected']]
+    if clean:
+        print(f"\nCheapest undetected config: {clean[0]['config']} ({clean[0]['launch_s']:.1f}s launch)")
+    else:
+        print("\nNo configuration passed every probe signal")
+
+
+if __name__ == '__main__':
+    workers = int(os.environ.get('MATRIX_WORKERS', 0)) or None
+    results = run_matrix(sys.argv[1:], workers)
+    print_table(results)
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    with open(RESULTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=1)
+    print(f"Saved {RESULTS_FILE}")
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""Human-cadence typing executed inside the page.
+
+The whole keystroke timeline (per-key delays, occasional backspace corrections,
+pauses between fields) is generated in Python up front and handed to the
+browser in one execute_script call. The page replays it with setTimeout, so
+typing runs asynchronously instead of one WebDriver round trip plus one Python
+sleep per character. Credentials are passed as script arguments, never
+interpolated into JS source.
+
+The replayed events are synthetic (isTrusted is false); a page that checks
+it can tell them apart from real input.
+"""
+import random
+import logging
+
+log = logging.getLogger(__name__)
+
+# Keys physically adjacent on a QWERTY keyboard (same row and the rows above and below), used for realistic typos
+_NEIGHBOURS = {
+    'q': 'wa', 'w': 'qeas', 'e': 'wrsd', 'r': 'etdf', 't': 'ryfg', 'y': 'tugh', 'u': 'yihj', 'i': 'uojk',
+    'o': 'ipkl', 'p': 'ol',
+    'a': 'qwsz', 's': 'weadzx', 'd': 'ersfxc', 'f': 'rtdgcv', 'g': 'tyfhvb', 'h': 'yugjbn', 'j': 'uihknm',
+    'k': 'iojlm', 'l': 'opk',
+    'z': 'asx', 'x': 'zsdc', 'c': 'xdfv', 'v': 'cfgb', 'b': 'vghn', 'n': 'bhjm', 'm': 'njk',
+}
+
+# Replays the timeline: [[selector, op, char, delay_ms], ...]
+# op is 'focus', 'char' or 'back'. Sets window.__typingDone when finished.
+TYPING_JS = """
+var timeline = arguments[0];
+window.__typingDone = false;
+window.__typingError = null;
+var setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+function fire(el, type, key) {
+    if (type === 'input') {
+        el.dispatchEvent(new InputEvent('input', {bubbles: true, data: key}));
+    } else {
+        el.dispatchEvent(new KeyboardEvent(type, {bubbles: true, key: key}));
+    }
+}
+var i = 0;
+function step() {
+    if (i >= timeline.length) {
+        window.__typingDone = true;
+        return;
+    }
+    var ev = timeline[i++];
+    try {
+        var el = document.querySelector(ev[0]);
+        if (ev[1] === 'focus') {
+            el.focus();
+            el.dispatchEvent(new FocusEvent('focus'));
+        } else if (ev[1] === 'back') {
+            fire(el, 'keydown', 'Backspace');
+            setter.call(el, el.value.slice(0, -1));
+            fire(el, 'input', null);
+            fire(el, 'keyup', 'Backspace');
+        } else {
+            fire(el, 'keydown', ev[2]);
+            fire(el, 'keypress', ev[2]);
+            setter.call(el, el.value + ev[2]);
+            fire(el, 'input', ev[2]);
+            fire(el, 'keyup', ev[2]);
+        }
+        if (i === timeline.length || timeline[i][0] !== ev[0]) {
+            el.dispatchEvent(new Event('change', {bubbles: true}));
+        }
+    } catch (e) {
+        window.__typingError = String(e);
+        window.__typingDone = true;
+        return;
+    }
+    setTimeout(step, ev[3]);
+}
+step();
+"""
+
+
+def build_timeline(fields, key_delay=(50, 150), pause=(200, 500), mistake_chance=0.1):
+    """
+    Build a keystroke timeline for fields = [(selector, text, (min_ms, max_ms) or None), ...].
+    With probability mistake_chance per field, inserts a wrong neighbour key followed by
+    a backspace correction.
+    Returns (timeline, total_ms).
+    """
+    timeline = []
+    for selector, text, delays in fields:
+        delays = delays or key_delay
+        timeline.append([selector, 'focus', '', random.randint(*pause)])
+        # At most one typo per field, on a letter
+        letters = [i for i, ch in enumerate(text) if ch.isascii() and ch.isalpha()]
+        typo_at = random.choice(letters) if letters and random.random() < mistake_chance else -1
+        for i, ch in enumerate(text):
+            if i == typo_at:
+                wrong = random.choice(_NEIGHBOURS[ch.lower()])
+                wrong = wrong.upper() if ch.isupper() else wrong
+                timeline.append([selector, 'char', wrong, random.randint(*delays)])
+                timeline.append([selector, 'back', '', random.randint(100, 300)])
+            timeline.append([selector, 'char', ch, random.randint(*delays)])
+        # Last key of the field waits for the inter-field pause
+        timeline[-1][3] = random.randint(*pause)
+    total_ms = sum(ev[3] for ev in timeline)
+    return timeline, total_ms
+
+
+def start_typing(sb, timeline):
+    """Start replaying timeline in the page; returns immediately"""
+    sb.execute_script(TYPING_JS, timeline)
+
+
+def wait_for_typing(sb, total_ms, timeout_margin=5.0):
+    """
+    Sleep until the timeline should be finished, then poll until the page reports done.
+    Returns True on success, False on timeout or a script error.
+    """
+    sb.sleep(total_ms / 1000.0)
+    waited = 0.0
+    while waited < timeout_margin:
+        done, error = sb.execute_script("return [window.__typingDone, window.__typingError];")
+        if done:
+            if error:
+                log.warning(f"[WARN] In-page typing failed: {error}")
+                return False
+            return True
+        sb.sleep(0.1)
+        waited += 0.1
+    log.warning("[WARN] In-page typing did not finish in time")
+    return False
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""Passive capture of the backend responses behind the coupons grid.
+
+Two backends:
+  - CDP events: when the driver exposes add_cdp_listener (UC mode with
+    --uc-cdp-events), Network.responseReceived is recorded for matching URLs
+    and bodies are fetched later with Network.getResponseBody.
+  - In-page hook: only when allowed (NET_CAPTURE=hook), a script registered
+    with Page.addScriptToEvaluateOnNewDocument wraps fetch/XMLHttpRequest and
+    keeps matching response bodies in window.__capturedResponses. Patched
+    fetch/XHR are visible to the page, so this is off by default.
+
+Coupon records are then parsed straight from the JSON/HTML payloads, in the
+same shape as coupon_tiles.read_tiles() records (without element references).
+"""
+import re
+import json
+import logging
+import threading
+from html.parser import HTMLParser
+
+log = logging.getLogger(__name__)
+
+# Responses worth keeping: coupon grid and promotions. Facet responses are left out on purpose:
+# their values ({code, name, count}) are categories, not coupons
+URL_PATTERN = r'coupon|promo|/online/he/(?:coupons|my-account/personal-area/my-coupons)'
+COUPON_KEYS = ('promotionCode', 'promoId', 'couponCode')
+CONTENT_TYPES = ('json', 'html')
+MAX_BODY = 4 * 1024 * 1024
+MAX_RESPONSES = 200
+
+CAPTURE_JS = """
+(function() {
+    if (window.__captureInstalled) { return; }
+    window.__captureInstalled = true;
+    window.__capturedResponses = [];
+    var pattern = new RegExp(%(pattern)s, 'i');
+    var types = %(types)s, maxBody = %(max_body)d, maxResponses = %(max_responses)d;
+    function keep(url, status, type, body) {
+        if (!pattern.test(url || '')) { return; }
+        type = (type || '').toLowerCase();
+        if (!types.some(function(t) { return type.indexOf(t) !== -1; })) { return; }
+        if (window.__capturedResponses.length >= maxResponses) { return; }
+        window.__capturedResponses.push({url: url, status: status, type: type, body: (body || '').substring(0, maxBody)});
+    }
+    var origFetch = window.fetch;
+    if (origFetch) {
+        window.fetch = function() {
+            return origFetch.apply(this, arguments).then(function(resp) {
+                try {
+                    var type = resp.headers.get('content-type');
+                    resp.clone().text().then(function(body) { keep(resp.url, resp.status, type, body); });
+                } catch (e) {}
+                return resp;
+            });
+        };
+    }
+    var origOpen = XMLHttpRequest.prototype.open;
+    XMLHttpRequest.prototype.open = function(method, url) {
+        this.__captureUrl = url;
+        this.addEventListener('load', function() {
+            try {
+                var body = (this.responseType === '' || this.responseType === 'text') ? this.responseText : '';
+                keep(this.responseURL || this.__captureUrl, this.status, this.getResponseHeader('content-type'), body);
+            } catch (e) {}
+        });
+        return origOpen.apply(this, arguments);
+    };
+})();
+""" % {
+    'pattern': json.dumps(URL_PATTERN),
+    'types': json.dumps(list(CONTENT_TYPES)),
+    'max_body': MAX_BODY,
+    'max_responses': MAX_RESPONSES,
+}
+
+
+class NetworkCapture:
+    def __init__(self, driver, allow_hook=False):
+        self.driver = driver
+        self.allow_hook = allow_hook
+        self.pattern = re.compile(URL_PATTERN, re.I)
+        # requestId -> info, in arrival order; written by the CDP listener thread
+        self.cdp_responses = {}
+        self.lock = threading.Lock()
+        # UC drivers only dispatch CDP events when launched with --uc-cdp-events (reactor running)
+        self.use_cdp_events = hasattr(driver, 'add_cdp_listener') and bool(getattr(driver, 'reactor', None))
+        self.mark_index = 0
+        self.marked = False
+
+    def start(self):
+        """Install the listener; call before navigating to the coupons page. Returns False when no backend is usable"""
+        if self.use_cdp_events:
+            self.driver.add_cdp_listener('Network.responseReceived', self._on_response)
+            log.info("[NET] Capturing coupon responses via CDP network events")
+        elif self.allow_hook:
+            self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': CAPTURE_JS})
+            log.info("[NET] Capturing coupon responses via in-page fetch/XHR hook")
+        else:
+            log.info("[NET] No CDP event stream (--uc-cdp-events), network capture disabled")
+            return False
+        return True
+
+    def mark(self):
+        """Remember the current position; since_mark() then returns only newer responses"""
+        if self.use_cdp_events:
+            with self.lock:
+                self.mark_index = len(self.cdp_responses)
+        else:
+            self.mark_index = self.driver.execute_script("return (window.__capturedResponses || []).length;")
+        self.marked = True
+
+    def since_mark(self):
+        """Responses captured after the last mark() (e.g. the grid reload caused by a filter)"""
+        return self.responses(self.mark_index)
+
+    def _on_response(self, message):
+        params = message.get('params', {})
+        response = params.get('response', {})
+        url = response.get('url', '')
+        mime = response.get('mimeType', '').lower()
+        if self.pattern.search(url) and any(t in mime for t in CONTENT_TYPES):
+            with self.lock:
+                if len(self.cdp_responses) < MAX_RESPONSES:
+                    self.cdp_responses[params.get('requestId')] = {
+                        'url': url, 'status': response.get('status'), 'type': mime}
+
+    def responses(self, after=0):
+        """Return captured responses (from position `after` on) as [{url, status, type, body}, ...]"""
+        if not self.use_cdp_events:
+            return (self.driver.execute_script("return window.__capturedResponses || [];") or [])[after:]
+        # Slice the recorded entries before fetching bodies, so evicted bodies do not shift the mark
+        with self.lock:
+            pending = list(self.cdp_responses.items())[after:]
+        captured = []
+        for request_id, info in pending:
+            try:
+                result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            except Exception:
+                continue  # body already evicted by the browser
+            captured.append(dict(info, body=result.get('body', '')[:MAX_BODY]))
+        return captured
+
+
+class _TileParser(HTMLParser):
+    """Extract coupon tile records from an HTML fragment (same fields as coupon_tiles)"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.records = []
+        self.current = None
+        self.depth = 0
+        self.capture = []   # stack of (field, depth at open)
+        self.in_price = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('img', 'input', 'br', 'hr', 'meta', 'link'):
+            self._void(tag, attrs)
+            return
+        self.depth += 1
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if 'tile' in classes and 'data-promo' in attrs:
+            self.current = {
+                'element': None, 'promo': attrs.get('data-promo') or '',
+                'productCode': attrs.get('data-product-code') or '',
+                'description': None, 'percent': None, 'title': None, 'imgAlt': None,
+                'smallText': None, 'allText': '', 'button': None, 'buttonText': None,
+                'buttonUsable': False, '_depth': self.depth,
+            }
+            self.records.append(self.current)
+            return
+        if self.current is None:
+            return
+        if tag == 'button' and 'miglog-btn-add' in classes:
+            self.current['buttonText'] = ''
+            self.current['buttonUsable'] = 'disabled' not in attrs
+            self.capture.append(('buttonText', self.depth))
+        elif 'price' in classes:
+            self.in_price = self.depth
+        elif 'number' in classes and self.in_price is not None:
+            self.current['percent'] = ''
+            self.capture.append(('percent', self.depth))
+        elif 'smallText' in classes and 'grayBg' in classes:
+            self.current['smallText'] = ''
+            self.capture.append(('smallText', self.depth))
+        elif 'description' in classes:
+            self.current['description'] = ''
+            self.capture.append(('description', self.depth))
+        elif 'title' in classes and tag == 'div':
+            self.current['title'] = ''
+            self.capture.append(('title', self.depth))
+
+    def _void(self, tag, attrs):
+        if self.current is not None and tag == 'img':
+            attrs = dict(attrs)
+            if 'pic' in (attrs.get('class') or '').split() and self.current['imgAlt'] is None:
+                self.current['imgAlt'] = attrs.get('alt')
+        if self.current is not None and tag == 'br':
+            self.handle_data('\n')
+
+    def handle_startendtag(self, tag, attrs):
+        self._void(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in ('img', 'input', 'br', 'hr', 'meta', 'link'):
+            return
+        while self.capture and self.capture[-1][1] >= self.depth:
+            field, _ = self.capture.pop()
+            self.current[field] = re.sub(r'[ \t]+', ' ', self.current[field]).strip()
+        if self.in_price is not None and self.in_price >= self.depth:
+            self.in_price = None
+        if self.current is not None and self.current['_depth'] >= self.depth:
+            self.current['allText'] = re.sub(r'\s*\n\s*', '\n', re.sub(r'[ \t]+', ' ', self.current['allText'])).strip()
+            del self.current['_depth']
+            self.current = None
+        self.depth -= 1
+
+    def handle_data(self, data):
+        if self.current is None:
+            return
+        self.current['allText'] += data
+        for field, _ in self.capture:
+            self.current[field] += data
+
+
+def records_from_html(html):
+    parser = _TileParser()
+    parser.feed(html)
+    parser.close()
+    for record in parser.records:
+        record.pop('_depth', None)
+    return parser.records
+
+
+def records_from_json(data):
+    """
+    Walk a JSON payload and turn embedded HTML fragments and coupon-like objects into records.
+    Objects qualify when they carry a coupon-specific code (COUPON_KEYS) and a description;
+    a generic 'code' is not enough, Hybris uses it for facet values and categories too.
+    """
+    records = []
+    if isinstance(data, dict):
+        code = next((data[k] for k in COUPON_KEYS if data.get(k)), None)
+        description = data.get('description') or data.get('name')
+        if code and isinstance(description, str):
+            records.append({
+                'element': None, 'promo': str(code),
+                'productCode': str(data.get('productCode') or ''),
+                'description': description.strip(),
+                'percent': str(data.get('price') or data.get('discount') or '').strip() or None,
+                'title': data.get('title'), 'imgAlt': None,
+                'smallText': ' \n'.join(str(data[k]) for k in ('validUntil', 'restrictions') if data.get(k)) or None,
+                'allText': description.strip(), 'button': None, 'buttonText': None,
+                'buttonUsable': False,
+            })
+        values = data.values()
+    elif isinstance(data, list):
+        values = data
+    else:
+        return records
+    for value in values:
+        if isinstance(value, str) and 'data-promo' in value:
+            records.extend(records_from_html(value))
+        elif isinstance(value, (dict, list)):
+            records.extend(records_from_json(value))
+    return records
+
+
+def records_from_responses(responses):
+    """Parse all captured responses; later responses (filter/facet actions) win per promo"""
+    by_promo = {}
+    for response in responses:
+        body = response.get('body') or ''
+        if 'json' in response.get('type', ''):
+            try:
+                found = records_from_json(json.loads(body))
+            except ValueError:
+                continue
+        else:
+            found = records_from_html(body)
+        for record in found:
+            by_promo[record['promo'] or record['allText']] = record
+    return list(by_promo.values())
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Structural fingerprint of the Shufersal coupons page.
+
+The skeleton (tag + stable class names, by depth) of the coupon grid is
+collected in the browser with a single execute_script call and compared
+against a stored baseline, so markup changes are caught before extraction
+starts instead of after walking every fallback selector.
+"""
+import os
+import json
+import hashlib
+import datetime
+
+BASELINE_FILE = os.path.join('.', 'web_extracts', 'shufersal', 'layout_baseline.json')
+DEFAULT_DRIFT_THRESHOLD = 0.35
+
+# Containers whose skeleton identifies the coupons grid
+LAYOUT_ROOTS = ['#couponsPage', '.couponsCards', '.tileContainer']
+
+# Runs in the page: walks each root to a fixed depth, keeps only a few children
+# per node (tiles repeat, so the first ones carry the structure) and drops
+# class names that are generated (digits, template placeholders).
+LAYOUT_SKELETON_JS = """
+var roots = arguments[0], maxDepth = arguments[1], maxChildren = arguments[2];
+function sig(el, depth) {
+    var classes = [];
+    for (var i = 0; i < el.classList.length; i++) {
+        var c = el.classList[i];
+        if (!/[0-9{}]/.test(c)) { classes.push(c); }
+    }
+    classes.sort();
+    return depth + '|' + el.tagName.toLowerCase() + (classes.length ? '.' + classes.join('.') : '');
+}
+var result = {};
+for (var r = 0; r < roots.length; r++) {
+    var root = document.querySelector(roots[r]);
+    if (!root) { result[roots[r]] = null; continue; }
+    var seen = {};
+    var stack = [[root, 0]];
+    while (stack.length) {
+        var item = stack.pop(), el = item[0], depth = item[1];
+        seen[sig(el, depth)] = true;
+        if (depth >= maxDepth) { continue; }
+        var n = Math.min(el.children.length, maxChildren);
+        for (var k = 0; k < n; k++) { stack.push([el.children[k], depth + 1]); }
+    }
+    result[roots[r]] = Object.keys(seen).sort();
+}
+return result;
+"""
+
+
+def collect_skeleton(sb, max_depth=6, max_children=8):
+    """Return {root_selector: sorted signature list or None} from the live page"""
+    return sb.execute_script(LAYOUT_SKELETON_JS, LAYOUT_ROOTS, max_depth, max_children)
+
+
+def skeleton_hash(skeleton):
+    """Stable short hash of a skeleton dict"""
+    payload = json.dumps(skeleton, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def load_baseline(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(skeleton, path=BASELINE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        'recorded': datetime.datetime.now().isoformat(timespec='seconds'),
+        'hash': skeleton_hash(skeleton),
+        'skeleton': skeleton,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    return data
+
+
+def compare_skeletons(baseline, current):
+    """
+    Compare two skeletons and return a drift report.
+    Drift per root is 1 - Jaccard similarity of the signature sets; a root that
+    disappeared counts as full drift. Overall drift is the worst root.
+    """
+    roots = {}
+    for root, base_sigs in baseline.items():
+        cur_sigs = current.get(root)
+        if base_sigs is None:
+            continue  # root was not present when the baseline was recorded
+        if cur_sigs is None:
+            roots[root] = {'drift': 1.0, 'missing': True, 'added': [], 'removed': base_sigs[:10]}
+            continue
+        base_set, cur_set = set(base_sigs), set(cur_sigs)
+        union = base_set | cur_set
+        drift = 1.0 - (len(base_set & cur_set) / len(union)) if union else 0.0
+        roots[root] = {
+            'drift': round(drift, 3),
+            'missing': False,
+            'added': sorted(cur_set - base_set)[:10],
+            'removed': sorted(base_set - cur_set)[:10],
+        }
+    overall = max((r['drift'] for r in roots.values()), default=0.0)
+    return {
+        'drift': overall,
+        'baseline_hash': skeleton_hash(baseline),
+        'current_hash': skeleton_hash(current),
+        'roots': roots,
+    }
+
+
+def save_drift_report(report, data_dir=os.path.join('.', 'data')):
+    timestamp = datetime.datetime.now().strftime('%m_%d_%Y_%H_%M_%S')
+    report_file = os.path.join(data_dir, f'layout_drift_{timestamp}.json')
+    os.makedirs(data_dir, exist_ok=True)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    return report_file
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""In-browser page-state classifier for the Shufersal site.
+
+One execute_script call inspects the page and returns a compact state plus a
+small evidence dict, so routing never has to pull body HTML/text over the
+WebDriver wire.
+"""
+
+LOGIN = 'login'
+COUPONS = 'coupons'
+INTERMEDIATE = 'intermediate'   # /online/he/S page with the coupons link
+MAINTENANCE = 'maintenance'     # geo-block / outage maintenance page
+CHALLENGE = 'challenge'         # bot-challenge iframe
+UNKNOWN = 'unknown'
+
+MAINTENANCE_IMAGE = 's3-eu-west-1.amazonaws.com/www.shufersal.co.il/online/errorpage/Maintenance1.jpg'
+
+BLOCK_PHRASES = [
+    'access denied', 'not available', 'geo', 'location', 'country',
+    'לא זמין', 'גישה נחסמה', 'מדינה', 'איזור'
+]
+
+# Selectors reported in the evidence (previously probed one by one)
+PROBE_SELECTORS = [
+    'h1', 'h2', '.couponsCards', '.tileContainer',
+    '#couponsPage', '.disclaimerSection', '#mCSB_4_container'
+]
+
+PAGE_STATE_JS = """
+var blockPhrases = arguments[0], probes = arguments[1], maintenanceUrl = arguments[2];
+var url = window.location.href;
+var body = document.body;
+var text = body ? (body.innerText || '').toLowerCase() : '';
+var imgs = document.images;
+var maintenanceImg = false, maintenanceExact = false;
+for (var i = 0; i < imgs.length; i++) {
+    var src = imgs[i].getAttribute('src') || '';
+    if (src.toLowerCase().indexOf('maintenance1.jpg') !== -1) { maintenanceImg = true; }
+    if (src.indexOf(maintenanceUrl) !== -1) { maintenanceExact = true; }
+}
+var present = {};
+for (var p = 0; p < probes.length; p++) {
+    present[probes[p]] = !!document.querySelector(probes[p]);
+}
+var phrases = [];
+for (var b = 0; b < blockPhrases.length; b++) {
+    if (text.indexOf(blockPhrases[b]) !== -1) { phrases.push(blockPhrases[b]); }
+}
+var challenge = !!document.querySelector('iframe[src*="challenge"], iframe[title*="challenge"]');
+var loginForm = !!document.querySelector('#j_username');
+var couponsLink = !!document.querySelector('#couponsLinkCart > div > div > img');
+var state = 'unknown';
+if ((maintenanceImg && imgs.length === 1) || maintenanceExact) {
+    state = 'maintenance';
+} else if (challenge) {
+    state = 'challenge';
+} else if (loginForm || url.indexOf('login') !== -1) {
+    state = 'login';
+} else if (url.indexOf('/online/he/S') !== -1 && couponsLink) {
+    state = 'intermediate';
+} else if (present['#couponsPage'] || present['.couponsCards'] || url.indexOf('coupons') !== -1) {
+    state = 'coupons';
+}
+return {
+    state: state,
+    evidence: {
+        url: url,
+        title: document.title,
+        textLength: text.length,
+        imgCount: imgs.length,
+        maintenanceImg: maintenanceImg,
+        maintenanceExact: maintenanceExact,
+        loginForm: loginForm,
+        couponsLink: couponsLink,
+        challenge: challenge,
+        blockPhrases: phrases,
+        present: present,
+        textStart: text.substring(0, 200)
+    }
+};
+"""
+
+
+def classify_page(sb):
+    """Return (state, evidence) for the page currently loaded in sb"""
+    result = sb.execute_script(PAGE_STATE_JS, BLOCK_PHRASES, PROBE_SELECTORS, MAINTENANCE_IMAGE)
+    return result['state'], result['evidence']
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Coupon preferences: terms to exclude from activation or to emphasize.
+
+preferences.json holds two lists of terms, matched case-insensitively against a
+coupon's title and description:
+
+    {"exclude": ["alcohol", ...], "emphasize": ["coffee", ...]}
+
+Excluded coupons are not activated; every saved row carries its preference.
+Updates are written to a temp file and renamed, so a reader never sees a
+half-written file.
+"""
+import os
+import json
+
+PREFERENCES_FILE = 'preferences.json'
+KINDS = ('exclude', 'emphasize')
+
+
+def load(path=PREFERENCES_FILE):
+    if not os.path.exists(path):
+        return {kind: [] for kind in KINDS}
+    with open(path, 'r', encoding='utf-8') as f:
+        prefs = json.load(f)
+    for kind in KINDS:
+        prefs.setdefault(kind, [])
+    return prefs
+
+
+def save(prefs, path=PREFERENCES_FILE):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(prefs, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _check_kind(kind):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown preference kind '{kind}' (expected one of: {', '.join(KINDS)})")
+
+
+def add(kind, term, path=PREFERENCES_FILE):
+    _check_kind(kind)
+    prefs = load(path)
+    if term not in prefs[kind]:
+        prefs[kind].append(term)
+        save(prefs, path)
+    return prefs
+
+
+def remove(kind, term, path=PREFERENCES_FILE):
+    _check_kind(kind)
+    prefs = load(path)
+    if term in prefs[kind]:
+        prefs[kind].remove(term)
+        save(prefs, path)
+    return prefs
+
+
+def classify(row, prefs):
+    """(kind, term) for a coupon row: kind is 'exclude', 'emphasize' or '' (exclude wins when both
+    match) and term the stored term that matched, which is what remove() needs"""
+    text = f"{row.get('title', '') or ''} {row.get('description', '') or ''}".lower()
+    for kind in KINDS:
+        for term in prefs[kind]:
+            if term.lower() in text:
+                return kind, term
+    return '', ''
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Pre-flight probe for the Shufersal site - runs before any browser is launched.
+
+Makes one plain HTTP request (following redirects on the same kept-alive
+connection) to the coupons URL and exits with a distinct code:
+
+     0  site reachable, no maintenance page
+    13  geo-block maintenance page (non-Israeli IP)
+    14  outage (connection error, timeout or 5xx)
+
+(outside pytest's own exit codes 0-5, so the same codes can be raised
+through pytest.exit from the test's setUp)
+
+Usage:
+    python preflight.py [url]          # PREFLIGHT_PROXY=host:port to probe through a proxy
+"""
+import os
+import sys
+import base64
+import logging
+import http.client
+from urllib.parse import urlsplit, urljoin
+
+log = logging.getLogger(__name__)
+
+COUPONS_URL = "https://www.shufersal.co.il/online/he/coupons"
+
+EXIT_OK = 0
+EXIT_GEO_BLOCKED = 13
+EXIT_OUTAGE = 14
+
+MAINTENANCE_MARKER = b'maintenance1.jpg'
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36"
+
+
+class _Connections:
+    """
+    Keeps one connection per (scheme, host) so redirects reuse the socket.
+    proxy is in --proxy format ("host:port" or "user:pass@host:port"); HTTPS goes through CONNECT.
+    """
+
+    def __init__(self, timeout, proxy=None):
+        self.timeout = timeout
+        self.conns = {}
+        self.proxy = None
+        self.proxy_headers = {}
+        if proxy:
+            auth, _, self.proxy = proxy.split('://')[-1].rpartition('@')
+            if auth:
+                token = base64.b64encode(auth.encode('utf-8')).decode('ascii')
+                self.proxy_headers = {'Proxy-Authorization': 'Basic ' + token}
+
+    def get(self, scheme, netloc):
+        key = (scheme, netloc)
+        if key not in self.conns:
+            cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            if self.proxy and scheme == 'https':
+                conn = cls(self.proxy, timeout=self.timeout)
+                conn.set_tunnel(netloc, headers=self.proxy_headers)
+            elif self.proxy:
+                conn = cls(self.proxy, timeout=self.timeout)
+            else:
+                conn = cls(netloc, timeout=self.timeout)
+            self.conns[key] = conn
+        return self.conns[key]
+
+    def target(self, scheme, url, path):
+        """Request target: plain HTTP through a proxy uses the absolute URL"""
+        return url if self.proxy and scheme == 'http' else path
+
+    def close(self):
+        for conn in self.conns.values():
+            conn.close()
+
+
+def probe(url=COUPONS_URL, timeout=5.0, max_redirects=5, read_limit=65536, proxy=None):
+    """
+    Probe url (optionally through proxy) and return (exit_code, detail).
+    Only the first read_limit bytes of the final body are inspected.
+    """
+    conns = _Connections(timeout, proxy)
+    try:
+        for _ in range(max_redirects + 1):
+            parts = urlsplit(url)
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+            conn = conns.get(parts.scheme, parts.netloc)
+            headers = {
+                'User-Agent': USER_AGENT,
+                'Accept-Language': 'he-IL,he;q=0.9,en;q=0.8',
+                'Connection': 'keep-alive',
+            }
+            if parts.scheme == 'http':
+                headers.update(conns.proxy_headers)
+            conn.request('GET', conns.target(parts.scheme, url, path), headers=headers)
+            response = conn.getresponse()
+            body = response.read(read_limit)
+            # Drain the rest so the connection can be reused for the next hop
+            if not response.isclosed():
+                response.read()
+
+            if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                url = urljoin(url, response.getheader('Location'))
+                continue
+            if MAINTENANCE_MARKER in body.lower():
+                return EXIT_GEO_BLOCKED, f"maintenance page served at {url} (HTTP {response.status})"
+            if response.status >= 500:
+                return EXIT_OUTAGE, f"HTTP {response.status} {response.reason} at {url}"
+            return EXIT_OK, f"HTTP {response.status} at {url}"
+        return EXIT_OUTAGE, f"too many redirects (last: {url})"
+    except (OSError, http.client.HTTPException) as e:
+        return EXIT_OUTAGE, f"{type(e).__name__}: {e}"
+    finally:
+        conns.close()
+
+
+def main(argv=None, proxy=None):
+    """Probe and log the outcome; proxy (the browser's --proxy value) overrides PREFLIGHT_PROXY"""
+    argv = sys.argv[1:] if argv is None else argv
+    url = argv[0] if argv else COUPONS_URL
+    timeout = float(os.environ.get('PREFLIGHT_TIMEOUT', 5.0))
+    proxy = proxy or os.environ.get('PREFLIGHT_PROXY') or None
+    code, detail = probe(url, timeout=timeout, proxy=proxy)
+    if code == EXIT_OK:
+        log.info(f"[OK] Pre-flight passed: {detail}")
+    elif code == EXIT_GEO_BLOCKED:
+        log.error(f"[ALERT] SHUFERSAL GEO-BLOCKING DETECTED (pre-flight): {detail}", extra={'event': 'geo_block'})
+        log.info("   Consider running from an Israeli IP or VPN")
+    else:
+        log.error(f"[ALERT] SHUFERSAL OUTAGE DETECTED (pre-flight): {detail}", extra={'event': 'outage'})
+    return code
+
+
+if __name__ == '__main__':
+    import run_logging
+    run_logging.setup_logging('preflight')
+    sys.exit(main())
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""Browser/driver provisioning cache.
+
+Resolves the installed Chrome, and keeps a matching chromedriver plus the
+UC-patched uc_driver per Chrome major version in a local store:
+
+    ~/.cache/pytests_browsers/<major>/chromedriver, uc_driver, manifest.json
+
+manifest.json records the SHA-256 of each binary. `install` fills the store
+once (download + one throwaway headless UC launch that produces the patched
+uc_driver); afterwards `check` only verifies checksums and versions and
+copies the cached binaries into SeleniumBase's drivers folder when they are
+missing or differ - no downloads, no patching. A Chrome/driver version
+mismatch is reported before any session is attempted.
+
+Usage:
+    python provision.py check      # exit 0 ready, 6 mismatch or not provisioned
+    python provision.py install    # resolve, download, pre-patch and cache
+    python provision.py status
+"""
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import subprocess
+
+log = logging.getLogger(__name__)
+
+EXIT_NOT_READY = 6
+CACHE_DIR = os.environ.get('BROWSER_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'pytests_browsers'))
+EXE = '.exe' if os.name == 'nt' else ''
+DRIVERS = ('chromedriver' + EXE, 'uc_driver' + EXE)
+
+
+def sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def drivers_dir():
+    import seleniumbase
+    return os.path.join(os.path.dirname(seleniumbase.__file__), 'drivers')
+
+
+def chrome():
+    """(binary path, full version) of the Chrome SeleniumBase will launch"""
+    from seleniumbase.core import detect_b_ver
+    path = detect_b_ver.get_binary_location('google-chrome')
+    if not path or not os.path.exists(path):
+        raise RuntimeError("Google Chrome not found. Install Chrome or set it up as SeleniumBase expects")
+    version = detect_b_ver.get_browser_version_from_binary(path)
+    if not version:
+        raise RuntimeError(f"Could not read the Chrome version of {path}")
+    return path, version
+
+
+def driver_version(path):
+    """Full version printed by `<driver> --version`, or None"""
+    try:
+        out = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=15).stdout
+    except OSError:
+        return None
+    match = re.search(r'(\d+\.\d+\.\d+\.\d+)', out)
+    return match.group(1) if match else None
+
+
+def _major(version):
+    return version.split('.')[0]
+
+
+def _manifest_path(major):
+    return os.path.join(CACHE_DIR, major, 'manifest.json')
+
+
+def load_manifest(major):
+    path = _manifest_path(major)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def install():
+    """Download the matching driver, let SeleniumBase patch uc_driver once, and cache both"""
+    path, version = chrome()
+    major = _major(version)
+    log.info(f"[SETUP] Chrome {version} at {path}, provisioning drivers for {major}")
+    subprocess.run([sys.executable, '-m', 'seleniumbase', 'get', 'chromedriver', major], check=True)
+    # The first UC launch writes the patched uc_driver next to chromedriver
+    from seleniumbase import SB
+    with SB(uc=True, headless=True) as sb:
+        sb.open('about:blank')
+
+    store = os.path.join(CACHE_DIR, major)
+    os.makedirs(store, exist_ok=True)
+    manifest = {'chrome': version, 'chrome_path': path, 'files': {}}
+    for name in DRIVERS:
+        source = os.path.join(drivers_dir(), name)
+        if not os.path.exists(source):
+            raise RuntimeError(f"{source} was not created; provisioning failed")
+        shutil.copy2(source, os.path.join(store, name))
+        manifest['files'][name] = {'sha256': sha256(source), 'version': driver_version(source)}
+    tmp = _manifest_path(major) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, _manifest_path(major))
+    log.info(f"[OK] Cached {', '.join(DRIVERS)} for Chrome {major} in {store}")
+    return manifest
+
+
+def check():
+    """
+    Make sure SeleniumBase will start a driver matching the installed Chrome, from the cache.
+    Returns (ok, message); never downloads.
+    """
+    path, version = chrome()
+    major = _major(version)
+    manifest = load_manifest(major)
+    if manifest is None:
+        return False, f"Chrome {version} has no cached drivers. Run: python provision.py install"
+    target_dir = drivers_dir()
+    os.makedirs(target_dir, exist_ok=True)
+    for name, entry in manifest['files'].items():
+        cached = os.path.join(CACHE_DIR, major, name)
+        if not os.path.exists(cached) or sha256(cached) != entry['sha256']:
+            return False, f"Cached {name} for Chrome {major} is missing or corrupt. Run: python provision.py install"
+        if entry['version'] and _major(entry['version']) != major:
+            return False, f"Cached {name} is {entry['version']} but Chrome is {version}"
+        target = os.path.join(target_dir, name)
+        if not os.path.exists(target) or sha256(target) != entry['sha256']:
+            shutil.copy2(cached, target)
+            log.info(f"[SETUP] Restored {name} from cache")
+    return True, f"Chrome {version} with cached drivers {', '.join(manifest['files'])}"
+
+
+def status():
+    if not os.path.isdir(CACHE_DIR):
+        print(f"No provisioning cache at {CACHE_DIR}")
+        return
+    for major in sorted(os.listdir(CACHE_DIR)):
+        manifest = load_manifest(major)
+        if manifest:
+            files = ', '.join(f"{name} {entry['version']}" for name, entry in manifest['files'].items())
+            print(f"Chrome {manifest['chrome']}: {files}")
+
+
+if __name__ == '__main__':
+    import run_logging
+    run_logging.setup_logging('provision')
+    command = sys.argv[1] if len(sys.argv) > 1 else 'check'
+    if command == 'install':
+        install()
+    elif command == 'check':
+        ok, message = check()
+        if ok:
+            log.info(f"[OK] {message}")
+        else:
+            log.error(f"[FAIL] {message}", extra={'event': 'driver_mismatch'})
+            sys.exit(EXIT_NOT_READY)
+    elif command == 'status':
+        status()
+    else:
+        print(__doc__)
+        sys.exit(2)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Proxy pool with concurrent latency probing and rolling health scores.
+
+Proxies come from the PROXIES environment variable (comma separated, in
+--proxy format: "host:port" or "user:pass@host:port") or from proxies.txt.
+Each proxy is probed concurrently with the pre-flight check, so a proxy only
+counts as healthy when it returns a real (non-maintenance) Shufersal page.
+Results feed an exponentially weighted success rate and latency, persisted in
+data/proxy_health.json, and best() hands out the highest-scoring proxy.
+Call report_failure() mid-run to demote a proxy and get the next best one;
+a proxy that failed once is not handed out again by the same pool object
+(one pool per run), so failover never cycles A -> B -> A.
+
+Usage:
+    python proxy_pool.py probe     # probe all, print table
+    python proxy_pool.py best      # print best proxy (for --proxy=...)
+"""
+import os
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import preflight
+
+PROXIES_FILE = 'proxies.txt'
+HEALTH_FILE = os.path.join('.', 'data', 'proxy_health.json')
+ALPHA = 0.3            # weight of the newest observation
+FAILURE_LATENCY = 30.0  # latency charged for a failed probe, seconds
+
+
+def load_proxies():
+    """Proxies from PROXIES or proxies.txt; fails when none are configured"""
+    raw = os.environ.get('PROXIES')
+    if raw:
+        proxies = [p.strip() for p in raw.split(',') if p.strip()]
+    elif os.path.exists(PROXIES_FILE):
+        with open(PROXIES_FILE, 'r', encoding='utf-8') as f:
+            proxies = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    else:
+        proxies = []
+    if not proxies:
+        raise RuntimeError("No proxies configured. Set PROXIES=host:port,... or create proxies.txt")
+    return proxies
+
+
+class ProxyPool:
+    def __init__(self, proxies=None, url=preflight.COUPONS_URL, timeout=8.0, health_file=HEALTH_FILE):
+        self.proxies = proxies if proxies is not None else load_proxies()
+        self.url = url
+        self.timeout = timeout
+        self.health_file = health_file
+        self.health = self._load()
+        self.failed = set()   # proxies that failed during this run
+
+    def _load(self):
+        if os.path.exists(self.health_file):
+            with open(self.health_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.health_file), exist_ok=True)
+        tmp = self.health_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.health, f, indent=1)
+        os.replace(tmp, self.health_file)
+
+    def record(self, proxy, ok, latency):
+        """Fold one observation into the proxy's rolling success rate and latency"""
+        entry = self.health.get(proxy)
+        latency = latency if ok else FAILURE_LATENCY
+        if entry is None:
+            entry = {'success': 1.0 if ok else 0.0, 'latency': latency, 'samples': 0}
+        else:
+            entry['success'] = (1 - ALPHA) * entry['success'] + ALPHA * (1.0 if ok else 0.0)
+            entry['latency'] = (1 - ALPHA) * entry['latency'] + ALPHA * latency
+        entry['samples'] += 1
+        entry['last'] = time.time()
+        self.health[proxy] = entry
+
+    def score(self, proxy):
+        """Higher is better: success rate per second of latency; unknown proxies rank just above dead ones"""
+        entry = self.health.get(proxy)
+        if entry is None:
+            return 0.01
+        return entry['success'] / max(entry['latency'], 0.05)
+
+    def _probe_one(self, proxy):
+        start = time.monotonic()
+        code, detail = preflight.probe(self.url, timeout=self.timeout, proxy=proxy)
+        return proxy, code, detail, time.monotonic() - start
+
+    def probe_all(self, workers=8):
+        """Probe every proxy concurrently, update health, return [(proxy, code, detail, latency)]"""
+        with ThreadPoolExecutor(max_workers=min(workers, len(self.proxies))) as executor:
+            results = list(executor.map(self._probe_one, self.proxies))
+        for proxy, code, _, latency in results:
+            self.record(proxy, code == preflight.EXIT_OK, latency)
+        self.save()
+        return results
+
+    def ranked(self, exclude=()):
+        return sorted((p for p in self.proxies if p not in exclude), key=self.score, reverse=True)
+
+    def best(self, exclude=()):
+        """Best-scoring proxy that is currently healthy, or None"""
+        for proxy in self.ranked(exclude):
+            entry = self.health.get(proxy)
+            if entry and entry['success'] >= 0.5:
+                return proxy
+        return None
+
+    def report_failure(self, proxy, exclude=()):
+        """Demote proxy after a mid-run failure and return the next best one not yet failed in this run (or None)"""
+        self.record(proxy, False, FAILURE_LATENCY)
+        self.save()
+        self.failed.add(proxy)
+        return self.best(exclude=tuple(exclude) + tuple(self.failed))
+
+
+def _mask(proxy):
+    return proxy.rpartition('@')[2]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else 'probe'
+    pool = ProxyPool()
+    if command == 'probe':
+        for proxy, code, detail, latency in pool.probe_all():
+            print(f"{_mask(proxy):30} code={code} {latency:6.2f}s score={pool.score(proxy):.3f} {detail}")
+        return 0
+    if command == 'best':
+        pool.probe_all()
+        proxy = pool.best()
+        if proxy is None:
+            print("[FAIL] No healthy proxy in pool", file=sys.stderr)
+            return 1
+        print(proxy)
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
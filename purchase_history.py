@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""Purchase history sync and product-code index.
+
+Order pages are fetched from inside the logged-in page (same-origin fetch, so
+the session cookies apply and no extra navigation happens). Each sync is
+capped (SYNC_PAGES order-list pages, SYNC_ORDERS order pages) so it fits the
+idle window it runs in, and works in two directions:
+
+  - new orders: the list is read from the newest page down to the first
+    order already indexed; of these the oldest are indexed first, so the
+    ones left over stay above the newest indexed order and are found again
+  - backfill: older history is read from backfill_page on, the list page
+    where the previous sync stopped (None once the end of the list was
+    read). It only advances past pages whose orders were all indexed; new
+    orders push older ones to later pages, so restarting there never skips
+    an order, and orders read twice are skipped via the indexed set
+
+so a long history is caught up completely over several runs.
+
+The index (data/purchase_history.json) is keyed by product code, the same code
+coupon tiles carry in data-product-code, so flagging "coupon for something you
+buy" is one dict lookup per coupon:
+
+    {"cursor": "<newest order>", "orders": 12, "indexed": [<order codes>], "backfill_page": 3,
+     "products": {"P_7290110325619": {"name": ..., "count": 5, "last_order": ...}}}
+
+Usage:
+    python purchase_history.py          # print the most frequently bought products
+"""
+import os
+import re
+import json
+import logging
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+log = logging.getLogger(__name__)
+
+INDEX_FILE = os.path.join('.', 'data', 'purchase_history.json')
+ORDERS_URL = 'https://www.shufersal.co.il/online/he/my-account/personal-area/orders/online-orders'
+MAX_PAGES = 50
+SYNC_PAGES = int(os.environ.get('PURCHASE_SYNC_PAGES', 3))
+SYNC_ORDERS = int(os.environ.get('PURCHASE_SYNC_ORDERS', 8))
+
+# Order detail links: .../orders/<order code>, but not the list pages themselves
+ORDER_LINK = re.compile(r'/my-account/personal-area/orders/(?!online-orders)([\w-]+)')
+
+FETCH_JS = """
+var done = arguments[arguments.length - 1];
+fetch(arguments[0], {credentials: 'same-origin'})
+    .then(function (r) { return r.ok ? r.text() : Promise.reject('HTTP ' + r.status); })
+    .then(function (text) { done({text: text}); }, function (e) { done({error: String(e)}); });
+"""
+
+
+class _OrderListParser(HTMLParser):
+    """Order codes in page order (newest first on the site), without duplicates"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.orders = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        match = ORDER_LINK.search(dict(attrs).get('href') or '')
+        if match and match.group(1) not in self.orders:
+            self.orders.append(match.group(1))
+
+
+class _OrderLinesParser(HTMLParser):
+    """Product codes of an order page with their names (data-product-name, or the element's title/alt)"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = {}
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        code = attrs.get('data-product-code')
+        if code:
+            name = attrs.get('data-product-name') or attrs.get('title') or attrs.get('alt') or ''
+            if name or code not in self.lines:
+                self.lines[code] = name.strip()
+
+    handle_startendtag = handle_starttag
+
+
+def parse_order_list(html):
+    parser = _OrderListParser()
+    parser.feed(html)
+    return parser.orders
+
+
+def parse_order_lines(html):
+    """{product_code: name} for one order page"""
+    parser = _OrderLinesParser()
+    parser.feed(html)
+    return parser.lines
+
+
+def load_index(path=INDEX_FILE):
+    if not os.path.exists(path):
+        return {'cursor': None, 'orders': 0, 'indexed': [], 'backfill_page': 0, 'products': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    if 'indexed' not in index:
+        # Written by the uncapped sync, which always read the whole history below its cursor
+        index['indexed'] = [index['cursor']] if index['cursor'] else []
+        index['backfill_page'] = None if index['cursor'] else 0
+    return index
+
+
+def save_index(index, path=INDEX_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def browser_fetch(sb):
+    """fetch(url) -> html through the logged-in page; raises on HTTP or network errors"""
+    def fetch(url):
+        result = sb.driver.execute_async_script(FETCH_JS, url)
+        if 'error' in result:
+            raise RuntimeError(f"Fetching {url} failed: {result['error']}")
+        return result['text']
+    return fetch
+
+
+def scan_orders(fetch, index, url=ORDERS_URL, max_pages=SYNC_PAGES):
+    """
+    Read up to max_pages order-list pages and return (new, older, listing, next_page):
+    new are the orders above the newest indexed one (newest first), older the
+    not yet indexed orders from the backfill position on as (code, page), listing
+    every code read in list order and next_page the first page not read
+    (None when the end of the list was reached).
+    """
+    indexed = set(index['indexed'])
+    backfill = index['backfill_page']
+    new, older, listing = [], [], []
+    forward = True
+    page = 0
+    for _ in range(max_pages):
+        if not forward:
+            if backfill is None:
+                return new, older, listing, None
+            page = max(page, backfill)
+        codes = [code for code in parse_order_list(fetch(f"{url}?page={page}")) if code not in listing]
+        if not codes:
+            return new, older, listing, None  # past the last page
+        listing.extend(codes)
+        for code in codes:
+            if code in indexed:
+                forward = False
+            elif forward:
+                new.append(code)
+            elif backfill is not None:
+                older.append((code, page))
+        page += 1
+    return new, older, listing, page
+
+
+def _fold(index, code, lines):
+    for product, name in lines.items():
+        entry = index['products'].setdefault(product, {'name': name, 'count': 0})
+        entry['count'] += 1
+        entry['last_order'] = code
+        if name:
+            entry['name'] = name
+    index['orders'] += 1
+    index['indexed'].append(code)
+
+
+def sync(fetch, path=INDEX_FILE, url=ORDERS_URL, max_pages=SYNC_PAGES, max_orders=SYNC_ORDERS):
+    """Download up to max_orders not yet indexed orders and fold their lines into the index"""
+    index = load_index(path)
+    backfill_before = index['backfill_page']
+    new, older, listing, next_page = scan_orders(fetch, index, url, max_pages)
+    budget = max_orders or len(new) + len(older)
+    # New orders oldest first, then older history newest first, so both stretches stay contiguous
+    todo = list(reversed(new))[:budget]
+    todo += [code for code, _ in older[:budget - len(todo)]]
+    for code in todo:
+        _fold(index, code, parse_order_lines(fetch(urljoin(url, code))))
+    left = older[len(todo) - min(len(new), budget):]
+    if left:
+        index['backfill_page'] = left[0][1]
+    elif index['backfill_page'] is not None:
+        index['backfill_page'] = next_page
+    indexed = set(index['indexed'])
+    index['cursor'] = next((code for code in listing if code in indexed), index['cursor'])
+    pending = len(new) + len(older) - len(todo)
+    if pending or index['backfill_page'] is not None:
+        log.info(f"[SYNC] {pending} orders left for the next runs, older history continues at list page "
+                 f"{index['backfill_page']}")
+    if todo or index['backfill_page'] != backfill_before:
+        save_index(index, path)
+    log.info(f"[SYNC] Purchase history: {len(todo)} orders indexed, {len(index['products'])} products")
+    return index
+
+
+def bought_counts(records, index):
+    """For each coupon record, how many orders contained its product (0 when never bought)"""
+    products = index['products']
+    return [products[r['productCode']]['count'] if r.get('productCode') in products else 0 for r in records]
+
+
+if __name__ == '__main__':
+    index = load_index()
+    top = sorted(index['products'].items(), key=lambda item: item[1]['count'], reverse=True)
+    for code, entry in top[:30]:
+        print(f"{entry['count']:4}  {code:18} {entry['name']}")
+    print(f"{len(index['products'])} products from {index['orders']} orders (cursor: {index['cursor']})")
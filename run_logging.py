@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""Non-blocking structured logging for the automation scripts.
+
+setup_logging() routes every record through a QueueHandler, so the calling
+thread only enqueues; a QueueListener thread does the formatting and I/O:
+
+  - console: human-readable "[time] [LEVEL] message", written as UTF-8 so
+    Hebrew survives Windows consoles and `tee`
+  - logs/<name>.jsonl: one JSON object per record with run_id, phase and an
+    optional event tag, rotated by size and at midnight, rotated files gzipped
+
+Failure classification is a field lookup on the JSON log:
+    python run_logging.py failure <run_id> [name]
+prints the event tag of the last ERROR record of that run.
+"""
+import os
+import sys
+import json
+import gzip
+import queue
+import atexit
+import shutil
+import logging
+import datetime
+import logging.handlers
+
+LOG_DIR = 'logs'
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 10
+
+_state = {'run_id': None, 'phase': 'startup', 'listener': None, 'phase_callbacks': []}
+
+
+def set_phase(phase):
+    """Tag all following records with phase (e.g. 'login', 'extract', 'activate')"""
+    _state['phase'] = phase
+    for callback in list(_state['phase_callbacks']):
+        callback(phase)
+
+
+def phase():
+    return _state['phase']
+
+
+def on_phase(callback, remove=False):
+    """Register (or remove) callback(phase), called in the calling thread on every set_phase"""
+    if remove:
+        _state['phase_callbacks'].remove(callback)
+    else:
+        _state['phase_callbacks'].append(callback)
+
+
+def run_id():
+    return _state['run_id']
+
+
+class _ContextFilter(logging.Filter):
+    """Stamps run_id/phase on the record in the calling thread, before it is queued"""
+
+    def filter(self, record):
+        record.run_id = _state['run_id']
+        record.phase = _state['phase']
+        if not hasattr(record, 'event'):
+            record.event = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'run_id': record.run_id,
+            'phase': record.phase,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if record.event:
+            entry['event'] = record.event
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class Utf8ConsoleHandler(logging.StreamHandler):
+    """Writes to the current sys.stdout (so pytest capture swaps are honoured) as UTF-8"""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + '\n'
+            stream = sys.stdout
+            buffer = getattr(stream, 'buffer', None)
+            if buffer is not None:
+                stream.flush()
+                buffer.write(msg.encode('utf-8', 'replace'))
+                buffer.flush()
+            else:
+                stream.write(msg)
+                stream.flush()
+        except Exception:
+            self.handleError(record)
+
+
+class DailySizeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotates when the file exceeds maxBytes or the day changes; rotated files are gzipped"""
+
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, encoding='utf-8', **kwargs)
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._gzip_rotator
+
+    @staticmethod
+    def _gzip_rotator(source, dest):
+        with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+    def shouldRollover(self, record):
+        # The file's own date, so a run started today still rotates yesterday's log
+        try:
+            st = os.stat(self.baseFilename)
+        except OSError:
+            st = None
+        if st and st.st_size and datetime.date.fromtimestamp(st.st_mtime) != datetime.date.today():
+            return True
+        return super().shouldRollover(record)
+
+
+def setup_logging(name, run=None, level=logging.INFO, log_dir=LOG_DIR):
+    """
+    Configure the root logger once per process and return logging.getLogger(name).
+    run defaults to $RUN_ID or a timestamp, so a wrapper script can know the id up front.
+    """
+    logger = logging.getLogger(name)
+    if _state['listener'] is not None:
+        return logger
+
+    _state['run_id'] = run or os.environ.get('RUN_ID') or datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    os.makedirs(log_dir, exist_ok=True)
+
+    console = Utf8ConsoleHandler()
+    console.setFormatter(logging.Formatter('[%(asctime)s] [%(levelname)s] %(message)s', '%Y-%m-%d %H:%M:%S'))
+    json_file = DailySizeRotatingFileHandler(os.path.join(log_dir, f'{name}.jsonl'),
+                                             maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT)
+    json_file.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(_ContextFilter())
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, console, json_file, respect_handler_level=True)
+    listener.start()
+    _state['listener'] = listener
+    atexit.register(shutdown)
+    return logger
+
+
+def shutdown():
+    """Flush the queue and stop the listener thread"""
+    listener = _state['listener']
+    if listener is not None:
+        listener.stop()
+        _state['listener'] = None
+
+
+def failure_event(run, name='shufersal', log_dir=LOG_DIR):
+    """Event tag of the last ERROR record of run in logs/<name>.jsonl (None if there is none)"""
+    path = os.path.join(log_dir, f'{name}.jsonl')
+    if not os.path.exists(path):
+        return None
+    event = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('run_id') == run and entry.get('level') in ('ERROR', 'CRITICAL') and entry.get('event'):
+                event = entry['event']
+    return event
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 3 and sys.argv[1] == 'failure':
+        print(failure_event(sys.argv[2], *sys.argv[3:4]) or 'unknown')
+    else:
+        print(__doc__)
+        sys.exit(2)
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""On-demand profiling of one automation run (PROFILE_RUN=True).
+
+Covers the same window on both sides of the driver:
+
+  - Python: a sampling profiler thread (every PROFILE_INTERVAL ms, default 10)
+    records the test thread's stack, rooted at the current run_logging phase,
+    plus tracemalloc snapshots at start and end
+  - WebDriver: every command sent to chromedriver is counted and timed
+  - browser: CDP Performance.getMetrics (task, script, layout and style
+    durations, JS heap, DOM nodes) and the page's performance entries
+    (navigation, resources, paints, long tasks) at every phase change, plus
+    a CDP Tracing.start/end trace (PROFILE_TRACE_CATEGORIES) recorded over a
+    second DevTools connection to the browser between start() and stop()
+
+The bundle is written to data/profiling/<run_id>/:
+
+    summary.txt        wall vs Python CPU vs WebDriver vs browser task time
+    flamegraph.svg     Python samples (stacks.folded is the raw input)
+    allocations.txt    top allocations at the end and growth since the start
+    webdriver.json     per-command count and time
+    timeline.json      trace-event JSON (open in chrome://tracing or Perfetto),
+                       the browser trace shifted onto the run's clock
+"""
+import os
+import sys
+import html
+import json
+import time
+import zlib
+import logging
+import datetime
+import threading
+import tracemalloc
+import urllib.request
+
+import run_logging
+
+log = logging.getLogger(__name__)
+
+PROFILE_DIR = os.path.join('.', 'data', 'profiling')
+INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 10)) / 1000
+TRACE_FRAMES = int(os.environ.get('PROFILE_TRACE_FRAMES', 1))
+TOP_ALLOCATIONS = 30
+TRACE_CATEGORIES = os.environ.get('PROFILE_TRACE_CATEGORIES', 'devtools.timeline,v8.execute,blink.user_timing,'
+                                  'loading,disabled-by-default-devtools.timeline').split(',')
+TRACE_TIMEOUT = 30.0
+
+# Long tasks and LCP are only visible to an observer registered before they happen
+OBSERVER_JS = """
+(function() {
+    window.__perfObserved = [];
+    ['longtask', 'largest-contentful-paint'].forEach(function(type) {
+        try {
+            new PerformanceObserver(function(list) {
+                list.getEntries().forEach(function(e) {
+                    window.__perfObserved.push({name: e.name || type, type: e.entryType, start: e.startTime, duration: e.duration});
+                });
+            }).observe({type: type, buffered: true});
+        } catch (e) {}
+    });
+})();
+"""
+
+ENTRIES_JS = """
+var entries = performance.getEntries().map(function(e) {
+    return {name: e.name, type: e.entryType, start: e.startTime, duration: e.duration};
+});
+return {url: location.href, origin: performance.timeOrigin, entries: entries.concat(window.__perfObserved || [])};
+"""
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, thread_id, interval):
+        super().__init__(name='run-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.stacks = {}
+        self.samples = 0
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            stack = ';'.join(['phase:' + run_logging.phase()] + frames[::-1])
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+
+class _ChromeTrace(threading.Thread):
+    """CDP Tracing over its own browser-level DevTools websocket.
+
+    execute_cdp_cmd cannot receive events, so Tracing.dataCollected is read
+    here; a clock sync marker maps the trace clock onto time.time().
+    """
+
+    def __init__(self, driver, categories):
+        super().__init__(name='run-profiler-trace', daemon=True)
+        import websocket   # websocket-client, installed with selenium
+        address = driver.capabilities.get('goog:chromeOptions', {}).get('debuggerAddress')
+        if not address:
+            raise RuntimeError('no debuggerAddress in the driver capabilities')
+        with urllib.request.urlopen(f'http://{address}/json/version', timeout=5) as response:
+            url = json.load(response)['webSocketDebuggerUrl']
+        self.ws = websocket.create_connection(url, timeout=10, suppress_origin=True)
+        self.events = []
+        self.complete = threading.Event()
+        self._call(1, 'Tracing.start', {'transferMode': 'ReportEvents',
+                                        'traceConfig': {'includedCategories': categories}})
+        self.sync_time = time.time()
+        self._call(2, 'Tracing.recordClockSyncMarker', {'syncId': 'run_profiler'})
+        self.ws.settimeout(None)
+
+    def _call(self, call_id, method, params):
+        self.ws.send(json.dumps({'id': call_id, 'method': method, 'params': params}))
+        while True:
+            message = json.loads(self.ws.recv())
+            if message.get('id') == call_id:
+                if 'error' in message:
+                    raise RuntimeError(f"{method}: {message['error'].get('message')}")
+                return message
+
+    def run(self):
+        try:
+            while not self.complete.is_set():
+                message = json.loads(self.ws.recv())
+                if message.get('method') == 'Tracing.dataCollected':
+                    self.events += message['params']['value']
+                elif message.get('method') == 'Tracing.tracingComplete':
+                    self.complete.set()
+        except Exception as e:
+            log.debug(f"[PROFILE] Trace connection closed: {e}")
+            self.complete.set()
+
+    def stop(self):
+        """End tracing and return the events on the time.time() clock in microseconds"""
+        self.ws.send(json.dumps({'id': 3, 'method': 'Tracing.end', 'params': {}}))
+        if not self.complete.wait(TRACE_TIMEOUT):
+            log.warning(f"[PROFILE] Browser trace incomplete after {TRACE_TIMEOUT:.0f}s")
+        self.ws.close()
+        return align_trace(self.events, self.sync_time)
+
+
+def align_trace(events, sync_time, sync_id='run_profiler'):
+    """Shift Chrome trace events so the clock sync marker lands on sync_time (epoch seconds)"""
+    marker = next((e for e in events if e.get('name') == 'clock_sync' and
+                   e.get('args', {}).get('sync_id') == sync_id), None)
+    if marker is None:
+        log.debug("[PROFILE] No clock sync marker in the browser trace, assuming a monotonic trace clock")
+        offset = (time.time() - time.monotonic()) * 1e6
+    else:
+        offset = sync_time * 1e6 - marker['ts']
+    return [dict(e, ts=e['ts'] + offset) if 'ts' in e and e.get('ph') != 'M' else e for e in events]
+
+
+def flamegraph_svg(stacks, title='', width=1200, row=17):
+    """Render folded stacks {'a;b;c': count} as a self-contained SVG flamegraph"""
+    root = {'n': 0, 'children': {}}
+    for stack, count in stacks.items():
+        node = root
+        node['n'] += count
+        for frame in stack.split(';'):
+            node = node['children'].setdefault(frame, {'n': 0, 'children': {}})
+            node['n'] += count
+    total = root['n'] or 1
+    rects = []
+
+    def walk(node, x, level):
+        for name, child in sorted(node['children'].items()):
+            w = child['n'] / total * width
+            if w >= 0.5:
+                rects.append((x, level, w, name, child['n']))
+                walk(child, x, level + 1)
+            x += w
+
+    walk(root, 0.0, 0)
+    depth = max((r[1] for r in rects), default=0) + 1
+    height = (depth + 2) * row
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">',
+           f'<text x="4" y="{row - 4}">{html.escape(title)} ({total} samples)</text>']
+    for x, level, w, name, count in rects:
+        y = height - (level + 1) * row
+        hue = zlib.crc32(name.split(' ')[0].encode()) % 50
+        label = html.escape(name[:int(w / 7)]) if w > 30 else ''
+        out.append(f'<g><title>{html.escape(name)}: {count} samples ({count * 100 / total:.1f}%)</title>'
+                   f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" fill="hsl({hue},85%,58%)"/>'
+                   f'<text x="{x + 2:.1f}" y="{y + row - 5}">{label}</text></g>')
+    out.append('</svg>')
+    return '\n'.join(out)
+
+
+class RunProfiler:
+    def __init__(self, sb, run=None, out_dir=PROFILE_DIR, interval=INTERVAL):
+        self.sb = sb
+        self.run = run or run_logging.run_id() or datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.path = os.path.join(out_dir, self.run)
+        self.interval = interval
+        self.webdriver = {}
+        self.metrics = []
+        self.pages = {}
+        self.phases = []
+        self.trace = None
+        self.browser_events = []
+
+    def attach(self, driver):
+        """Time chromedriver commands and enable CDP metrics on driver (again after a driver switch)"""
+        executor = driver.command_executor
+        if getattr(executor, '_profiled', False):
+            return
+        execute = executor.execute
+
+        def timed_execute(command, params):
+            start = time.perf_counter()
+            try:
+                return execute(command, params)
+            finally:
+                entry = self.webdriver.setdefault(command, [0, 0.0])
+                entry[0] += 1
+                entry[1] += time.perf_counter() - start
+
+        executor.execute = timed_execute
+        executor._profiled = True
+        try:
+            driver.execute_cdp_cmd('Performance.enable', {})
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': OBSERVER_JS})
+        except Exception as e:
+            log.warning(f"[PROFILE] CDP performance domain unavailable: {e}")
+
+    def _browser_snapshot(self, phase):
+        """CDP metrics and page performance entries; runs on the test thread"""
+        now = time.time()
+        self.phases.append((phase, now))
+        driver = self.sb.driver
+        try:
+            metrics = driver.execute_cdp_cmd('Performance.getMetrics', {}).get('metrics', [])
+            self.metrics.append({'phase': phase, 'ts': now, **{m['name']: m['value'] for m in metrics}})
+        except Exception as e:
+            log.debug(f"[PROFILE] No CDP metrics at {phase}: {e}")
+        try:
+            page = driver.execute_script(ENTRIES_JS)
+        except Exception as e:
+            log.debug(f"[PROFILE] No performance entries at {phase}: {e}")
+            return
+        if page and page.get('origin'):
+            known = self.pages.setdefault((page['origin'], page['url']), {})
+            for entry in page['entries']:
+                known[(entry['type'], entry['name'], entry['start'])] = entry
+
+    def start(self):
+        os.makedirs(self.path, exist_ok=True)
+        self.attach(self.sb.driver)
+        tracemalloc.start(TRACE_FRAMES)
+        self.first_snapshot = tracemalloc.take_snapshot()
+        self.wall, self.cpu = time.perf_counter(), time.process_time()
+        self.sampler = _Sampler(threading.get_ident(), self.interval)
+        self.sampler.start()
+        try:
+            self.trace = _ChromeTrace(self.sb.driver, TRACE_CATEGORIES)
+            self.trace.start()
+        except Exception as e:
+            log.warning(f"[PROFILE] Browser trace unavailable: {e}")
+        run_logging.on_phase(self._browser_snapshot)
+        self._browser_snapshot(run_logging.phase())
+        log.info(f"[PROFILE] Profiling run into {self.path} (sampling every {self.interval * 1000:.0f} ms)")
+
+    def stop(self):
+        """Stop collecting and write the bundle; call while the driver is still alive"""
+        run_logging.on_phase(self._browser_snapshot, remove=True)
+        self._browser_snapshot('end')
+        if self.trace:
+            try:
+                self.browser_events = self.trace.stop()
+            except Exception as e:
+                log.warning(f"[PROFILE] Browser trace lost: {e}")
+        self.sampler.stopped.set()
+        self.sampler.join()
+        wall, cpu = time.perf_counter() - self.wall, time.process_time() - self.cpu
+        last_snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        with open(os.path.join(self.path, 'stacks.folded'), 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.sampler.stacks.items()):
+                f.write(f'{stack} {count}\n')
+        with open(os.path.join(self.path, 'flamegraph.svg'), 'w', encoding='utf-8') as f:
+            f.write(flamegraph_svg(self.sampler.stacks, f'run {self.run}'))
+        self._write_allocations(last_snapshot, peak)
+        with open(os.path.join(self.path, 'webdriver.json'), 'w', encoding='utf-8') as f:
+            json.dump({command: {'count': n, 'seconds': round(s, 3)} for command, (n, s) in
+                       sorted(self.webdriver.items(), key=lambda kv: -kv[1][1])}, f, indent=1)
+        with open(os.path.join(self.path, 'timeline.json'), 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self._trace_events(), 'displayTimeUnit': 'ms'}, f)
+        summary = self._summary(wall, cpu, peak)
+        with open(os.path.join(self.path, 'summary.txt'), 'w', encoding='utf-8') as f:
+            f.write(summary + '\n')
+        log.info(f"[PROFILE] Bundle written to {self.path}\n{summary}")
+        return self.path
+
+    def _write_allocations(self, snapshot, peak):
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        snapshot = snapshot.filter_traces(filters)
+        lines = [f"Peak traced memory: {peak / 2**20:.1f} MB", '', f"Top {TOP_ALLOCATIONS} allocations at the end:"]
+        lines += [f"  {stat}" for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]]
+        lines += ['', f"Top {TOP_ALLOCATIONS} growths since the start:"]
+        lines += [f"  {stat}" for stat in snapshot.compare_to(self.first_snapshot.filter_traces(filters), 'lineno')[:TOP_ALLOCATIONS]]
+        with open(os.path.join(self.path, 'allocations.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def _trace_events(self):
+        """Python phases, CDP metric counters, page performance entries and the browser trace as trace events"""
+        events = [{'ph': 'M', 'pid': 1, 'name': 'process_name', 'args': {'name': 'python run'}},
+                  {'ph': 'M', 'pid': 2, 'name': 'process_name', 'args': {'name': 'browser page'}}]
+        for (name, start), (_, end) in zip(self.phases, self.phases[1:]):
+            events.append({'ph': 'X', 'pid': 1, 'tid': 1, 'name': name, 'cat': 'phase',
+                           'ts': start * 1e6, 'dur': max(0.0, end - start) * 1e6})
+        counters = {'JSHeapUsedSize': 'js heap', 'Nodes': 'dom nodes', 'TaskDuration': 'task s',
+                    'ScriptDuration': 'script s', 'LayoutDuration': 'layout s', 'RecalcStyleDuration': 'style s'}
+        for sample in self.metrics:
+            for key, name in counters.items():
+                if key in sample:
+                    events.append({'ph': 'C', 'pid': 2, 'name': name, 'ts': sample['ts'] * 1e6, 'args': {name: sample[key]}})
+        for tid, ((origin, url), entries) in enumerate(self.pages.items(), start=1):
+            events.append({'ph': 'M', 'pid': 2, 'tid': tid, 'name': 'thread_name', 'args': {'name': url[:120]}})
+            for entry in entries.values():
+                ts = (origin + entry['start']) * 1000
+                if entry['duration']:
+                    events.append({'ph': 'X', 'pid': 2, 'tid': tid, 'cat': entry['type'], 'name': entry['name'][:200],
+                                   'ts': ts, 'dur': entry['duration'] * 1000})
+                else:
+                    events.append({'ph': 'i', 's': 't', 'pid': 2, 'tid': tid, 'cat': entry['type'],
+                                   'name': entry['name'][:200], 'ts': ts})
+        return events + self.browser_events
+
+    def _summary(self, wall, cpu, peak):
+        round_trips = sum(n for n, _ in self.webdriver.values())
+        webdriver_s = sum(s for _, s in self.webdriver.values())
+        lines = [f"Wall time:            {wall:8.1f} s",
+                 f"Python CPU:           {cpu:8.1f} s",
+                 f"WebDriver commands:   {webdriver_s:8.1f} s in {round_trips} round trips",
+                 f"Python samples:       {self.sampler.samples:8d}",
+                 f"Browser trace events: {len(self.browser_events):8d}",
+                 f"Peak traced memory:   {peak / 2**20:8.1f} MB"]
+        for key, label in (('TaskDuration', 'Browser tasks'), ('ScriptDuration', 'Browser script'),
+                           ('LayoutDuration', 'Browser layout'), ('RecalcStyleDuration', 'Browser style')):
+            values = [sample[key] for sample in self.metrics if key in sample]
+            if len(values) >= 2:
+                # Renderer counters restart with every navigation
+                total = sum(b - a if b >= a else b for a, b in zip(values, values[1:]))
+                lines.append(f"{label + ':':22}{total:8.1f} s")
+        lines.append('Slowest WebDriver commands:')
+        for command, (n, s) in sorted(self.webdriver.items(), key=lambda kv: -kv[1][1])[:8]:
+            lines.append(f"  {command:28} {s:7.2f} s  {n:5d} calls")
+        return '\n'.join(lines)
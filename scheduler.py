@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""Local run scheduler for the browser flows (replacement for Task Scheduler / cron).
+
+Jobs are defined in JOBS; their state (next run, last result, retry count) is
+kept in data/scheduler_jobs.json so a restarted daemon picks up where it left.
+
+  - per-job lock file (data/locks/<job>.lock): a job never overlaps itself,
+    also not with a manual `python scheduler.py run <job>`, so no machine-wide
+    Chrome kill is needed between runs. The daemon starts every job through
+    `scheduler.py run <job>`, so the lock is held by the job's own process
+    and stays held when the daemon exits while the job is still running
+  - random start jitter, so jobs do not start on the same second
+  - concurrency limit per resource (one browser job at a time by default)
+  - retry with exponential backoff on failure (except for exit codes that a
+    retry cannot fix, e.g. geo-block)
+  - missed runs (machine asleep or daemon down) run once on wake-up instead of
+    being skipped or replayed several times
+  - jobs exceeding their time limit are killed together with their child
+    processes (browser and driver)
+
+Usage:
+    python scheduler.py daemon         # run the scheduler loop
+    python scheduler.py status         # print the job table
+    python scheduler.py run <job>      # run a job now (waits for nothing, exits 75 if locked)
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import datetime
+import importlib
+import subprocess
+
+import run_logging
+from file_lock import try_lock, LOCK_DIR
+
+log = logging.getLogger(__name__)
+
+STATE_FILE = os.path.join('.', 'data', 'scheduler_jobs.json')
+TICK = 30.0                 # seconds between scheduler wake-ups
+CLOCK_JUMP = 120.0          # wall clock ahead of monotonic by this much = machine was asleep
+EXIT_LOCKED = 75            # `run <job>` found the job's lock held (EX_TEMPFAIL)
+
+LIMITS = {'browser': int(os.environ.get('SCHEDULER_MAX_BROWSERS', 1))}
+
+# schedule: ('daily', 'HH:MM'), ('every', seconds) or ('wake', module, seconds) -
+# the latter asks module.next_wakeup(after) and falls back to every `seconds`
+# when the module has nothing recorded yet
+JOBS = {
+    'shufersal': {
+        'command': ['bash', 'SHUFERSAL.sh'],
+        'schedule': ('daily', '09:53'),
+        'jitter': 15 * 60,
+        'timeout': 30 * 60,
+        'retries': 2,
+        'backoff': 10 * 60,
+        'no_retry': (13,),  # geo-block: a retry from the same IP will not help
+        'catch_up': True,
+        'resource': 'browser',
+    },
+    'yad2': {
+        'command': [sys.executable, 'test_y2.py'],
+        'schedule': ('wake', 'yad2_bumps', 4 * 3600),
+        'jitter': 60,   # bumps should land as soon as the ads are eligible
+        'timeout': 15 * 60,
+        'retries': 2,
+        'backoff': 5 * 60,
+        'no_retry': (),
+        'catch_up': True,
+        'resource': 'browser',
+    },
+    'profile_cleanup': {
+        'command': [sys.executable, 'warm_profile.py', 'cleanup'],
+        'schedule': ('daily', '04:30'),
+        'jitter': 10 * 60,
+        'timeout': 10 * 60,
+        'retries': 3,
+        'backoff': 30 * 60,  # exits 12 (warm_profile.EXIT_BUSY) while a run holds the profile
+        'no_retry': (),
+        'catch_up': True,
+    },
+}
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, path)
+
+
+def next_slot(job, after, rng=random):
+    """Next regular start time (epoch) strictly after `after`, jitter included"""
+    kind, value = job['schedule'][:2]
+    if kind == 'every':
+        base = after + value
+    elif kind == 'wake':
+        base = importlib.import_module(value).next_wakeup(after)
+        if base is None:
+            base = after + job['schedule'][2]
+    elif kind == 'daily':
+        hour, minute = (int(x) for x in value.split(':'))
+        moment = datetime.datetime.fromtimestamp(after)
+        slot = moment.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if slot.timestamp() <= after:
+            slot += datetime.timedelta(days=1)
+        base = slot.timestamp()
+    else:
+        raise ValueError(f"Unknown schedule kind '{kind}' (expected 'daily', 'every' or 'wake')")
+    return base + rng.uniform(0, job.get('jitter', 0))
+
+
+def _kill_tree(proc):
+    """Kill the job and everything it started (browser, driver)"""
+    if os.name == 'nt':
+        subprocess.call(['taskkill', '/F', '/T', '/PID', str(proc.pid)],
+                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        import signal
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+    proc.wait()
+
+
+class Scheduler:
+    def __init__(self, jobs=JOBS, limits=LIMITS, state_file=STATE_FILE, lock_dir=LOCK_DIR, rng=random):
+        self.jobs = jobs
+        self.limits = limits
+        self.state_file = state_file
+        self.lock_dir = lock_dir
+        self.rng = rng
+        self.state = load_state(state_file)
+        self.running = {}   # name -> (proc, started_monotonic)
+        now = time.time()
+        for name, job in jobs.items():
+            entry = self.state.setdefault(name, {'attempts': 0, 'last_code': None, 'last_end': None})
+            if entry.get('next_run') is None:
+                entry['next_run'] = next_slot(job, now, rng)
+        self.save()
+
+    def save(self):
+        save_state(self.state, self.state_file)
+
+    def _in_use(self, resource):
+        return sum(1 for name in self.running if self.jobs[name].get('resource') == resource)
+
+    def _start(self, name, now):
+        job = self.jobs[name]
+        resource = job.get('resource')
+        if resource and self._in_use(resource) >= self.limits.get(resource, 1):
+            return False  # stays due, started when a slot frees up
+        # Cheap pre-check only: the job process takes the lock itself and exits EXIT_LOCKED if it lost a race
+        lock = try_lock(name, self.lock_dir)
+        if lock is None:
+            log.warning(f"[WARN] Job '{name}' is locked by another process, postponing")
+            self.state[name]['next_run'] = now + TICK
+            return False
+        lock.close()
+        run = f"{name}_{datetime.datetime.fromtimestamp(now).strftime('%Y%m%d_%H%M%S')}"
+        env = dict(os.environ, SCHEDULER_JOB=name, RUN_ID=run)
+        kwargs = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == 'nt' else {'start_new_session': True}
+        command = [sys.executable, os.path.abspath(__file__), 'run', name, '--lock-dir', self.lock_dir]
+        proc = subprocess.Popen(command, env=env, **kwargs)
+        self.running[name] = (proc, time.monotonic())
+        self.state[name]['last_start'] = now
+        self.state[name]['run_id'] = run
+        log.info(f"[LAUNCH] Job '{name}' started (pid {proc.pid}, run {run})")
+        return True
+
+    def _finish(self, name, code, now):
+        job = self.jobs[name]
+        entry = self.state[name]
+        if code == EXIT_LOCKED:
+            log.warning(f"[WARN] Job '{name}' was locked by another process, postponing")
+            entry['next_run'] = now + TICK
+            return
+        entry.update(last_code=code, last_end=now)
+        if code == 0:
+            entry['attempts'] = 0
+            entry['next_run'] = next_slot(job, now, self.rng)
+            log.info(f"[OK] Job '{name}' succeeded")
+        elif entry['attempts'] < job.get('retries', 0) and code not in job.get('no_retry', ()):
+            delay = job.get('backoff', 60) * 2 ** entry['attempts']
+            entry['attempts'] += 1
+            entry['next_run'] = now + delay + self.rng.uniform(0, delay / 4)
+            log.warning(f"[RETRY] Job '{name}' failed with code {code}, retry {entry['attempts']} in {delay / 60:.0f} min")
+        else:
+            entry['attempts'] = 0
+            entry['next_run'] = next_slot(job, now, self.rng)
+            log.error(f"[FAIL] Job '{name}' failed with code {code}, next regular run", extra={'event': 'job_failed'})
+
+    def _reap(self, now):
+        for name, (proc, started) in list(self.running.items()):
+            code = proc.poll()
+            timeout = self.jobs[name].get('timeout')
+            if code is None and timeout and time.monotonic() - started > timeout:
+                log.error(f"[FAIL] Job '{name}' exceeded {timeout / 60:.0f} min, killing it", extra={'event': 'job_timeout'})
+                _kill_tree(proc)
+                code = proc.returncode
+            if code is None:
+                continue
+            del self.running[name]
+            self._finish(name, code, now)
+
+    def _catch_up(self, now):
+        """After start-up or wake-up, run each missed job once (coalesced); skip it if catch_up is off"""
+        for name, job in self.jobs.items():
+            entry = self.state[name]
+            if name in self.running or entry['next_run'] > now:
+                continue
+            missed_by = now - entry['next_run']
+            if job.get('catch_up', True):
+                log.info(f"[TIME] Job '{name}' missed its slot by {missed_by / 60:.0f} min, running it now")
+                # Small jitter so several caught-up jobs do not start together
+                entry['next_run'] = now + self.rng.uniform(0, min(job.get('jitter', 0), 120))
+            else:
+                entry['next_run'] = next_slot(job, now, self.rng)
+                log.info(f"[TIME] Job '{name}' missed its slot, skipped to the next one")
+
+    def tick(self, now=None, overslept=False):
+        now = time.time() if now is None else now
+        self._reap(now)
+        if overslept:
+            self._catch_up(now)
+        for name in sorted(self.jobs, key=lambda n: self.state[n]['next_run']):
+            if name not in self.running and self.state[name]['next_run'] <= now:
+                self._start(name, now)
+        self.save()
+
+    def run_forever(self):
+        log.info(f"[TIME] Scheduler started with jobs: {', '.join(self.jobs)}")
+        self._catch_up(time.time())
+        while True:
+            self.tick()
+            due = min(self.state[n]['next_run'] for n in self.jobs)
+            sleep_for = max(1.0, min(TICK, due - time.time()))
+            wall, mono = time.time(), time.monotonic()
+            time.sleep(sleep_for)
+            jump = (time.time() - wall) - (time.monotonic() - mono)
+            if jump > CLOCK_JUMP:
+                log.info(f"[TIME] Wall clock jumped {jump / 60:.0f} min (system sleep?), catching up")
+                self.tick(overslept=True)
+
+    def status(self):
+        for name in self.jobs:
+            entry = self.state[name]
+            next_run = datetime.datetime.fromtimestamp(entry['next_run']).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"{name:12} next={next_run} last_code={entry.get('last_code')} attempts={entry.get('attempts')}")
+
+
+def run_now(name, jobs=JOBS, lock_dir=LOCK_DIR):
+    """Run one job in the foreground, holding its lock; used by the daemon for every job"""
+    if name not in jobs:
+        log.error(f"[FAIL] Unknown job '{name}'. Known jobs: {', '.join(jobs)}")
+        return 2
+    lock = try_lock(name, lock_dir)
+    if lock is None:
+        log.error(f"[FAIL] Job '{name}' is already running (lock {lock_dir}/{name}.lock held)")
+        return EXIT_LOCKED
+    try:
+        return subprocess.call(jobs[name]['command'], env=dict(os.environ, SCHEDULER_JOB=name))
+    finally:
+        lock.close()
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    run_logging.setup_logging('scheduler')
+    if command == 'daemon':
+        Scheduler().run_forever()
+    elif command == 'status':
+        Scheduler().status()
+    elif command == 'run' and len(sys.argv) > 2:
+        lock_dir = sys.argv[sys.argv.index('--lock-dir') + 1] if '--lock-dir' in sys.argv else LOCK_DIR
+        sys.exit(run_now(sys.argv[2], lock_dir=lock_dir))
+    else:
+        print(__doc__)
+        sys.exit(2)
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""Playback QoE harness for Shaka Player: local DASH stand-in with bandwidth throttling.
+
+ContentServer serves a DASH directory (manifest.mpd + segments), a local copy
+of the Shaka Player build and a small player page from localhost, so a run
+needs no network. Every response body goes through one shared token
+bucket, so the whole "link" is throttled like a real connection; the rate can
+follow a profile such as "4000:10,600:10,4000" (kbps:seconds, last one holds)
+to force ABR down- and up-switches.
+
+The player page records QoE in window.__qoe while playing:
+startup latency (load() -> first 'playing'), time to first frame (first
+requestVideoFrameCallback), rebuffer count and duration ('buffering' events
+after start), dropped/decoded frames (getVideoPlaybackQuality) and the
+variant switch history and bandwidth estimate from player.getStats().
+
+Test content is generated once with ffmpeg (3 video renditions, 2 s segments);
+the player build is copied next to it from SHAKA_JS (a URL or a local file):
+    python shaka_qoe.py generate [dir]
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import datetime
+import threading
+import subprocess
+import urllib.request
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+CONTENT_DIR = os.path.join('.', 'data', 'dash_content')
+RESULTS_DIR = os.path.join('.', 'data', 'qoe')
+SHAKA_JS = os.environ.get('SHAKA_JS', 'https://cdn.jsdelivr.net/npm/shaka-player@4.12.0/dist/shaka-player.compiled.js')
+SHAKA_FILE = 'shaka-player.compiled.js'
+CHUNK = 16 * 1024
+
+RENDITIONS = [('1280x720', '3000k'), ('854x480', '1200k'), ('426x240', '400k')]
+
+
+def generate_content(out_dir=CONTENT_DIR, seconds=30):
+    """Multi-bitrate DASH test stream (testsrc2 pattern) via ffmpeg"""
+    if not shutil.which('ffmpeg'):
+        raise RuntimeError("ffmpeg not found. Install it (e.g. sudo apt install ffmpeg) to generate DASH test content")
+    os.makedirs(out_dir, exist_ok=True)
+    split = ''.join(f'[v{i}]' for i in range(len(RENDITIONS)))
+    scales = ';'.join(f'[v{i}]scale={size.replace("x", ":")}[s{i}]' for i, (size, _) in enumerate(RENDITIONS))
+    cmd = ['ffmpeg', '-y', '-f', 'lavfi', '-i', 'testsrc2=size=1280x720:rate=30,format=yuv420p',
+           '-t', str(seconds), '-filter_complex', f'[0:v]split={len(RENDITIONS)}{split};{scales}']
+    for i, (_, bitrate) in enumerate(RENDITIONS):
+        cmd += ['-map', f'[s{i}]', f'-b:v:{i}', bitrate, f'-maxrate:v:{i}', bitrate, f'-bufsize:v:{i}', bitrate]
+    cmd += ['-c:v', 'libx264', '-g', '60', '-keyint_min', '60', '-sc_threshold', '0',
+            '-seg_duration', '2', '-use_template', '1', '-use_timeline', '0',
+            '-adaptation_sets', 'id=0,streams=v', '-f', 'dash', os.path.join(out_dir, 'manifest.mpd')]
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    fetch_shaka(out_dir)
+    return out_dir
+
+
+def fetch_shaka(out_dir=CONTENT_DIR, source=SHAKA_JS):
+    """Copy the Shaka Player build into out_dir so the player page loads it from the local server"""
+    path = os.path.join(out_dir, SHAKA_FILE)
+    if os.path.isfile(source):
+        shutil.copyfile(source, path)
+    else:
+        with urllib.request.urlopen(source, timeout=60) as response, open(path, 'wb') as f:
+            shutil.copyfileobj(response, f)
+    return path
+
+
+def content_missing(content_dir=CONTENT_DIR):
+    """Why content_dir cannot be served yet, or None when manifest and player build are there"""
+    missing = [name for name in ('manifest.mpd', SHAKA_FILE) if not os.path.exists(os.path.join(content_dir, name))]
+    if missing:
+        return f"No {' or '.join(missing)} in {content_dir}. Generate it with: python shaka_qoe.py generate"
+    return None
+
+
+def parse_profile(profile):
+    """'4000:10,600:10,4000' -> [(bytes_per_sec, seconds or None)]; 0 kbps means unthrottled"""
+    steps = []
+    for part in profile.split(','):
+        kbps, _, seconds = part.strip().partition(':')
+        steps.append((int(kbps) * 1000 // 8, float(seconds) if seconds else None))
+    return steps
+
+
+class Throttle:
+    """Token bucket shared by all connections; the rate follows the profile steps over time"""
+
+    def __init__(self, profile='0'):
+        self.steps = parse_profile(profile)
+        self.start = time.monotonic()
+        self.lock = threading.Lock()
+        self.next_free = self.start
+
+    def rate(self, now):
+        elapsed = now - self.start
+        for bytes_per_sec, seconds in self.steps:
+            if seconds is None or elapsed < seconds:
+                return bytes_per_sec
+            elapsed -= seconds
+        return self.steps[-1][0]
+
+    def consume(self, size):
+        """Block until size bytes may be sent"""
+        with self.lock:
+            now = time.monotonic()
+            rate = self.rate(now)
+            if not rate:
+                return
+            self.next_free = max(self.next_free, now) + size / rate
+            wait = self.next_free - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+PLAYER_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>QoE</title><script src="/%(shaka)s"></script></head>
+<body><video id="video" muted autoplay width="640"></video>
+<script>
+var qoe = window.__qoe = {error: null, startupMs: null, firstFrameMs: null, rebuffers: 0, rebufferMs: 0,
+                          variants: [], done: false};
+var video = document.getElementById('video');
+var bufferingSince = null;
+shaka.polyfill.installAll();
+var player = new shaka.Player();
+window.__player = player;
+player.addEventListener('error', function (e) { qoe.error = String(e.detail && e.detail.code); });
+player.addEventListener('buffering', function (e) {
+    if (qoe.startupMs === null) { return; }  // initial load is startup, not a rebuffer
+    if (e.buffering) { qoe.rebuffers++; bufferingSince = performance.now(); }
+    else if (bufferingSince !== null) { qoe.rebufferMs += performance.now() - bufferingSince; bufferingSince = null; }
+});
+player.addEventListener('adaptation', function () {
+    var track = player.getVariantTracks().filter(function (t) { return t.active; })[0];
+    if (track) { qoe.variants.push({at: performance.now(), bandwidth: track.bandwidth, height: track.height}); }
+});
+var t0;
+video.addEventListener('playing', function () {
+    if (qoe.startupMs === null) { qoe.startupMs = performance.now() - t0; }
+});
+if (video.requestVideoFrameCallback) {
+    video.requestVideoFrameCallback(function () { qoe.firstFrameMs = performance.now() - t0; });
+}
+player.attach(video).then(function () {
+    t0 = performance.now();
+    return player.load('%(manifest)s');
+}).catch(function (e) { qoe.error = String(e.code || e); });
+</script></body></html>
+"""
+
+COLLECT_JS = """
+var qoe = window.__qoe, player = window.__player, video = document.getElementById('video');
+var quality = video.getVideoPlaybackQuality ? video.getVideoPlaybackQuality() : {};
+var stats = player ? player.getStats() : {};
+return {
+    error: qoe.error, startupMs: qoe.startupMs, firstFrameMs: qoe.firstFrameMs,
+    rebuffers: qoe.rebuffers, rebufferMs: qoe.rebufferMs, currentTime: video.currentTime,
+    droppedFrames: quality.droppedVideoFrames, decodedFrames: quality.totalVideoFrames,
+    estimatedBandwidth: stats.estimatedBandwidth, streamBandwidth: stats.streamBandwidth,
+    stallsDetected: stats.stallsDetected,
+    switches: (stats.switchHistory || []).filter(function (s) { return s.type === 'variant'; }).map(function (s) {
+        return {bandwidth: s.bandwidth, fromAdaptation: s.fromAdaptation}; }),
+    variants: qoe.variants
+};
+"""
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    throttle = None
+    manifest = 'manifest.mpd'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] in ('/', '/player.html'):
+            body = (PLAYER_HTML % {'shaka': SHAKA_FILE, 'manifest': self.manifest}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        size = os.path.getsize(path)
+        # the player build is not part of the throttled "link", only the stream is
+        throttled = os.path.basename(path) != SHAKA_FILE
+        start, end = 0, size - 1
+        match = re.match(r'bytes=(\d*)-(\d*)', self.headers.get('Range', ''))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else end
+            else:
+                start = max(size - int(match.group(2)), 0)
+            if start >= size or start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK, remaining))
+                if not chunk:
+                    break
+                if throttled:
+                    self.throttle.consume(len(chunk))
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+
+class ContentServer:
+    """Local DASH server on 127.0.0.1 (random port); use as a context manager"""
+
+    def __init__(self, content_dir=CONTENT_DIR, profile='0'):
+        missing = content_missing(content_dir)
+        if missing:
+            raise RuntimeError(missing)
+        self.content_dir = content_dir
+        self.profile = profile
+
+    def __enter__(self):
+        handler = type('Handler', (_Handler,), {'throttle': Throttle(self.profile)})
+        directory = os.path.abspath(self.content_dir)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                          lambda *args: handler(*args, directory=directory))
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/player.html'
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def collect(sb):
+    return sb.execute_script(COLLECT_JS)
+
+
+def save_result(result, results_dir=RESULTS_DIR):
+    """Write one run's metrics as data/qoe/<timestamp>.json and return the path"""
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, datetime.datetime.now().strftime('%Y%m%d_%H%M%S') + '.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=1)
+    return path
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'generate':
+        print("Generated DASH content in", generate_content(*sys.argv[2:3]))
+    else:
+        print(__doc__)
+        sys.exit(2)
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""Command line entry point for the Shufersal automation.
+
+    python shufersal.py run [--no-activate] [--no-save] [--max-rows N] [--resume] [--adaptive] [-- pytest args]
+    python shufersal.py export [--csv FILE] [--format csv|json] [--out FILE]
+    python shufersal.py report
+    python shufersal.py prefs [show | add KIND TERM | remove KIND TERM]
+    python shufersal.py replay [FILE] [--csv OUT]
+    python shufersal.py bench [FILE] [--repeat N] [--synthetic N,N,... [--browser]]
+    python shufersal.py ui [--port N]
+
+Only `run` starts a browser, and it does so in a pytest subprocess; every
+other command imports just the stdlib-only helper modules it needs, inside
+its handler, so it starts without loading SeleniumBase.
+"""
+import os
+import sys
+import argparse
+
+DATA_DIR = os.path.join('.', 'data')
+SAMPLE_PAGE = os.path.join('web_extracts', 'shufersal', 'couponsPage_body.html')
+
+
+def latest_csv(data_dir=DATA_DIR):
+    import glob
+    files = glob.glob(os.path.join(data_dir, '*.csv'))
+    if not files:
+        raise FileNotFoundError(f"No coupon CSV in {data_dir}. Run: python shufersal.py run")
+    return max(files, key=os.path.getmtime)
+
+
+def read_rows(path):
+    import csv
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+
+def write_rows(rows, out):
+    import csv
+    fieldnames = list(dict.fromkeys(k for row in rows for k in row))
+    writer = csv.DictWriter(out, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def _truthy(value):
+    return str(value).lower() in ('true', '1', 't')
+
+
+def cmd_run(args):
+    import subprocess
+    env = dict(os.environ, SAVE=str(args.save), ACTIVATE=str(args.activate), RESUME=str(args.resume))
+    if args.max_rows is not None:
+        env['MAX_ROWS'] = str(args.max_rows)
+    if args.adaptive:
+        import adaptive_launch
+        os.environ.update(env)
+        return adaptive_launch.run('shufersal', args.pytest_args)
+    cmd = [sys.executable, '-m', 'pytest', 'test_shufersal.py', '-s', '-v', '--uc'] + args.pytest_args
+    return subprocess.call(cmd, env=env)
+
+
+def cmd_export(args):
+    path = args.csv or latest_csv()
+    rows = read_rows(path)
+    out = open(args.out, 'w', newline='', encoding='utf-8') if args.out else sys.stdout
+    try:
+        if args.format == 'json':
+            import json
+            json.dump(rows, out, ensure_ascii=False, indent=1)
+            out.write('\n')
+        else:
+            write_rows(rows, out)
+    finally:
+        if args.out:
+            out.close()
+    if args.out:
+        print(f"Exported {len(rows)} coupons from {path} to {args.out}", file=sys.stderr)
+    return 0
+
+
+def cmd_report(args):
+    import json
+    import run_logging
+    import coupon_journal
+    import adaptive_launch
+
+    try:
+        path = latest_csv()
+    except FileNotFoundError as e:
+        print(e)
+    else:
+        rows = read_rows(path)
+        activated = sum(1 for row in rows if _truthy(row.get('activated')))
+        print(f"Latest run:   {path}")
+        print(f"Coupons:      {len(rows)} ({activated} activated)")
+        bought = sum(1 for row in rows if row.get('bought') not in (None, '', '0'))
+        if bought:
+            print(f"  bought      {bought} (coupon for a product in your purchase history)")
+        for kind in ('emphasize', 'exclude'):
+            count = sum(1 for row in rows if row.get('preference') == kind)
+            if count:
+                print(f"  {kind:10}  {count}")
+
+    log_file = os.path.join(run_logging.LOG_DIR, 'shufersal.jsonl')
+    if os.path.exists(log_file):
+        last = None
+        with open(log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                last = line
+        if last:
+            run = json.loads(last)['run_id']
+            print(f"Last log run: {run} (failure: {run_logging.failure_event(run) or 'none'})")
+
+    incomplete, resumed = coupon_journal.find_incomplete()
+    if incomplete:
+        print(f"Incomplete:   {incomplete} ({len(resumed)} coupons processed, resume with RESUME=True)")
+    tier = adaptive_launch.load_state().get('shufersal')
+    if tier:
+        print(f"Launch tier:  {tier['tier']} (since {tier['date']})")
+    return 0
+
+
+def cmd_prefs(args):
+    import preferences
+    if args.action == 'add':
+        prefs = preferences.add(args.kind, args.term)
+    elif args.action == 'remove':
+        prefs = preferences.remove(args.kind, args.term)
+    else:
+        prefs = preferences.load()
+    for kind in preferences.KINDS:
+        print(f"{kind}: {', '.join(prefs[kind]) or '-'}")
+    return 0
+
+
+def _records_from_file(path):
+    import network_capture
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if path.endswith('.json'):
+        import json
+        return network_capture.records_from_json(json.loads(text))
+    return network_capture.records_from_html(text)
+
+
+def cmd_replay(args):
+    import coupon_tiles
+    rows = [coupon_tiles.row_from_record(record) for record in _records_from_file(args.file)]
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8-sig') as f:
+            write_rows(rows, f)
+        print(f"Replayed {len(rows)} coupons from {args.file} to {args.csv}")
+    else:
+        for row in rows:
+            print(f"{row['title']} | {row['store']} | {row['percent']} | {row['dateValid']}")
+        print(f"{len(rows)} coupons")
+    return 0
+
+
+def cmd_bench(args):
+    if args.synthetic:
+        import synthetic_coupons
+        sizes = [int(n) for n in args.synthetic.split(',')]
+        results = synthetic_coupons.benchmark(sizes, min(args.repeat, 5), args.browser)
+        synthetic_coupons.print_results(results)
+        return 0
+    import time
+    import coupon_tiles
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        rows = [coupon_tiles.row_from_record(record) for record in _records_from_file(args.file)]
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    median = timings[len(timings) // 2]
+    print(f"{args.file}: {len(rows)} tiles, median {median * 1000:.1f} ms, "
+          f"best {timings[0] * 1000:.1f} ms, {len(rows) / median:.0f} tiles/s over {args.repeat} runs")
+    return 0
+
+
+def cmd_ui(args):
+    import coupon_browser
+    return coupon_browser.serve(args.port)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='shufersal', description='Shufersal coupons automation')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help='run the browser flow (pytest test_shufersal.py)')
+    run.add_argument('--no-save', dest='save', action='store_false', help='do not write the CSV')
+    run.add_argument('--no-activate', dest='activate', action='store_false', help='extract only')
+    run.add_argument('--max-rows', type=int)
+    run.add_argument('--resume', action='store_true', help='resume an interrupted run')
+    run.add_argument('--adaptive', action='store_true', help='escalate browser tiers (adaptive_launch.py)')
+    run.add_argument('pytest_args', nargs='*', help='extra pytest args after --, e.g. -- --proxy=host:port')
+    run.set_defaults(func=cmd_run)
+
+    export = sub.add_parser('export', help='export a coupons CSV (latest by default)')
+    export.add_argument('--csv', help='source CSV (default: latest in data/)')
+    export.add_argument('--format', choices=('csv', 'json'), default='csv')
+    export.add_argument('--out', help='output file (default: stdout)')
+    export.set_defaults(func=cmd_export)
+
+    report = sub.add_parser('report', help='summary of the latest run')
+    report.set_defaults(func=cmd_report)
+
+    prefs = sub.add_parser('prefs', help='show or edit coupon preferences')
+    prefs.add_argument('action', nargs='?', choices=('show', 'add', 'remove'), default='show')
+    prefs.add_argument('kind', nargs='?', choices=('exclude', 'emphasize'))
+    prefs.add_argument('term', nargs='?')
+    prefs.set_defaults(func=cmd_prefs)
+
+    replay = sub.add_parser('replay', help='parse a saved coupons page or response dump, no browser')
+    replay.add_argument('file', nargs='?', default=SAMPLE_PAGE)
+    replay.add_argument('--csv', help='write rows to this CSV instead of printing')
+    replay.set_defaults(func=cmd_replay)
+
+    bench = sub.add_parser('bench', help='time tile parsing of a saved page')
+    bench.add_argument('file', nargs='?', default=SAMPLE_PAGE)
+    bench.add_argument('--repeat', type=int, default=20)
+    bench.add_argument('--synthetic', metavar='N,N,...', help='benchmark generated pages of these tile counts instead')
+    bench.add_argument('--browser', action='store_true', help='with --synthetic: also time DOM reads and clicks')
+    bench.set_defaults(func=cmd_bench)
+
+    ui = sub.add_parser('ui', help='browse coupon history and mark preferences in the browser')
+    ui.add_argument('--port', type=int, default=8765)
+    ui.set_defaults(func=cmd_ui)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'prefs' and args.action != 'show' and not (args.kind and args.term):
+        parser.error(f"prefs {args.action} needs KIND and TERM")
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
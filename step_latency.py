@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""Timeouts learned from the observed latency of named wait steps.
+
+Every wrapped wait records how long it took, per site and environment
+(platform, headless/headed, UC, proxy, CI), in data/step_latency.json.
+Once a step has MIN_SAMPLES successful observations its timeout becomes
+
+    p95 of the last WINDOW samples * MARGIN + PAD, clamped to [floor, ceiling]
+
+(floor/ceiling default to a quarter and three times the hand-picked
+default). Until then the default is used. A wait that times out counts as
+a miss: each consecutive miss grows the next timeout by BACKOFF, so a step
+that became slow is not cut off forever; the next success resets it.
+Updates hold the 'step_latency' lock (data/locks), so concurrent runs do
+not lose each other's samples.
+
+Usage:
+    latency = step_latency.LatencyModel('shufersal', step_latency.environment(self))
+    with latency.step('login_form', 15) as step:
+        if not self.wait_for_element_visible('#j_username', timeout=step.timeout):
+            step.fail()
+    python step_latency.py [site]      # learned timeouts per step
+"""
+import os
+import sys
+import json
+import time
+import logging
+from contextlib import contextmanager
+
+from file_lock import wait_lock
+
+log = logging.getLogger(__name__)
+
+STATE_FILE = os.path.join('.', 'data', 'step_latency.json')
+WINDOW = 50
+MIN_SAMPLES = 5
+PERCENTILE = 0.95
+MARGIN = 1.5
+PAD = 1.0
+BACKOFF = 1.5
+LOCK_TIMEOUT = 5.0
+
+
+def environment(sb=None):
+    """Environment key such as 'linux/uc/headless/proxy/ci' for the given SeleniumBase instance"""
+    parts = [sys.platform]
+    if sb is not None:
+        parts.append('uc' if getattr(sb, 'undetectable', False) else 'std')
+        parts.append('headless' if getattr(sb, 'headless', False) else 'headed')
+        if getattr(sb, 'proxy_string', None):
+            parts.append('proxy')
+    if os.environ.get('CI'):
+        parts.append('ci')
+    return '/'.join(parts)
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, path)
+
+
+def learned_timeout(entry, default, floor=None, ceiling=None):
+    """Timeout for a stored step entry (None: nothing recorded yet)"""
+    floor = default / 4 if floor is None else floor
+    ceiling = default * 3 if ceiling is None else ceiling
+    if not entry:
+        return default
+    if len(entry['samples']) < MIN_SAMPLES:
+        value = default
+    else:
+        value = percentile(entry['samples'], PERCENTILE) * MARGIN + PAD
+    value *= BACKOFF ** entry['misses']
+    return round(min(ceiling, max(floor, value)), 1)
+
+
+class _Step:
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.failed = False
+        self.skipped = False
+
+    def fail(self):
+        """Mark the wait as timed out when it reports failure by return value instead of raising"""
+        self.failed = True
+
+    def skip(self):
+        """Record nothing: the wait ended for a reason that says nothing about its latency"""
+        self.skipped = True
+
+
+class LatencyModel:
+    def __init__(self, site, env=None, path=STATE_FILE):
+        self.site = site
+        self.env = env or environment()
+        self.path = path
+
+    def _entry(self, state, name):
+        return state.setdefault(self.site, {}).setdefault(self.env, {}).setdefault(name, {'samples': [], 'misses': 0})
+
+    def timeout(self, name, default, floor=None, ceiling=None):
+        """Learned timeout in seconds for step name (default until enough samples)"""
+        entry = load_state(self.path).get(self.site, {}).get(self.env, {}).get(name)
+        return learned_timeout(entry, default, floor, ceiling)
+
+    def record(self, name, seconds, default=None):
+        """Store a successful duration, or a miss when seconds is None; returns False if the lock stayed busy"""
+        lock_dir = os.path.join(os.path.dirname(self.path), 'locks')
+        lock = wait_lock('step_latency', lock_dir, LOCK_TIMEOUT, poll=0.05)
+        if lock is None:
+            log.warning(f"[WARN] Latency state is locked by another run, step {name} not recorded")
+            return False
+        try:
+            state = load_state(self.path)
+            entry = self._entry(state, name)
+            if default is not None:
+                entry['default'] = default
+            if seconds is None:
+                entry['misses'] += 1
+            else:
+                entry['samples'] = (entry['samples'] + [round(seconds, 3)])[-WINDOW:]
+                entry['misses'] = 0
+            save_state(state, self.path)
+        finally:
+            lock.close()
+        return True
+
+    @contextmanager
+    def step(self, name, default, floor=None, ceiling=None):
+        """Time the block; yields an object with .timeout, .fail() and .skip(); an exception counts as a miss"""
+        step = _Step(self.timeout(name, default, floor, ceiling))
+        start = time.monotonic()
+        try:
+            yield step
+        except Exception:
+            self.record(name, None, default)
+            log.warning(f"[TIME] Step {name} failed after {time.monotonic() - start:.1f}s (timeout {step.timeout}s)")
+            raise
+        elapsed = time.monotonic() - start
+        if step.skipped:
+            log.debug(f"[TIME] Step {name} ended after {elapsed:.1f}s, not recorded")
+            return
+        self.record(name, None if step.failed else elapsed, default)
+        if step.failed:
+            log.warning(f"[TIME] Step {name} timed out after {elapsed:.1f}s (timeout {step.timeout}s)")
+        else:
+            log.debug(f"[TIME] Step {name} took {elapsed:.2f}s (timeout {step.timeout}s)")
+
+
+def report(site=None, path=STATE_FILE):
+    for site_name, envs in sorted(load_state(path).items()):
+        if site and site_name != site:
+            continue
+        for env, steps in sorted(envs.items()):
+            print(f"{site_name} [{env}]")
+            for name, entry in sorted(steps.items()):
+                samples = entry['samples']
+                p95 = f"{percentile(samples, PERCENTILE):.1f}s" if samples else '-'
+                timeout = learned_timeout(entry, entry['default']) if entry.get('default') else '-'
+                print(f"  {name:20} {len(samples):>3} samples  p95 {p95:>6}  misses {entry['misses']}  "
+                      f"timeout {timeout}s (default {entry.get('default', '-')}s)")
+
+
+if __name__ == '__main__':
+    report(sys.argv[1] if len(sys.argv) > 1 else None)
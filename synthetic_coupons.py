@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""Synthetic coupon pages of any size, built from the saved coupons page.
+
+The 96 tiles of web_extracts/shufersal/couponsPage_body.html are used as
+templates: every generated tile is a copy of one of them with a fresh promo
+id and product code, in one of these states (mixed by weight):
+
+    available        untouched template, usable activation button
+    activated        activation button disabled
+    no_button        no activation button (class renamed)
+    no_product_code  empty data-product-code
+    no_description   no .description element (row falls back to title/alt)
+
+PageServer serves a generated page from 127.0.0.1 (scripts and remote
+images stripped, so nothing leaves the machine), and benchmark() reports
+time and peak memory against tile count for each extraction/activation
+strategy of test_shufersal.py:
+
+    parse_html    network_capture.records_from_html (captured responses, replay)
+    rows          coupon_tiles.row_from_record for every record
+    journal       coupon_journal append of every row (fsync batches)
+    csv           CSV writing of all rows
+    dom_bulk      coupon_tiles.read_tiles, one execute_script      (browser)
+    dom_fallback  read_tiles over every ALTERNATIVE_SELECTORS entry (browser)
+    activate      per-button WebDriver click, sampled and extrapolated (browser)
+
+Usage:
+    python synthetic_coupons.py generate N [out.html]
+    python synthetic_coupons.py serve N [port]
+    python shufersal.py bench --synthetic 100,1000,10000 [--browser]
+"""
+import os
+import re
+import sys
+import time
+import random
+import tempfile
+import threading
+import tracemalloc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+TEMPLATE_PAGE = os.path.join('web_extracts', 'shufersal', 'couponsPage_body.html')
+DEFAULT_MIX = {'available': 60, 'activated': 20, 'no_button': 5, 'no_product_code': 10, 'no_description': 5}
+ACTIVATE_SAMPLE = 100
+
+TILE_START = re.compile(r'<li [^>]*class="item_\d+">')
+
+
+def load_template(path=TEMPLATE_PAGE):
+    """Split the saved page into (text before the tiles, tile markups, text after the tiles)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        page = f.read()
+    starts = [m.start() for m in TILE_START.finditer(page)]
+    if not starts:
+        raise ValueError(f"No coupon tiles (li.item_N) found in {path}")
+    ends = [i for i in (page.find('<li data-v-e9bad3a2="" class="emptyFlexFix"', starts[-1]),
+                        page.find('</ul>', starts[-1])) if i != -1]
+    end = min(ends)
+    tiles = [page[a:b] for a, b in zip(starts, starts[1:] + [end])]
+    return page[:starts[0]], tiles, page[end:]
+
+
+def make_tile(template, index, state):
+    tile = TILE_START.sub(f'<li data-v-67cdcb1c="" data-v-e9bad3a2="" class="item_{index + 1}">', template, count=1)
+    tile = re.sub(r'data-promo="[^"]*"', f'data-promo="9{index:07d}"', tile, count=1)
+    product_code = '' if state == 'no_product_code' else f'P_{7290000000000 + index}'
+    tile = re.sub(r'data-product-code="[^"]*"', f'data-product-code="{product_code}"', tile, count=1)
+    if state == 'activated':
+        tile = tile.replace('miglog-btn-add">', 'miglog-btn-add" disabled="">')
+    elif state == 'no_button':
+        tile = tile.replace('miglog-btn-add', 'miglog-btn-done')
+    elif state == 'no_description':
+        tile = tile.replace('class="description"', 'class="descriptionRemoved"')
+    return tile
+
+
+def generate(count, mix=None, seed=0, template=TEMPLATE_PAGE):
+    """Return (html, states) for a coupons page with `count` tiles"""
+    head, tiles, tail = load_template(template)
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    states = rng.choices(list(mix), weights=list(mix.values()), k=count)
+    body = ''.join(make_tile(tiles[i % len(tiles)], i, state) for i, state in enumerate(states))
+    return head + body + tail, states
+
+
+def standalone(html):
+    """Wrap a generated body as a full document with scripts and remote resources removed"""
+    html = re.sub(r'<script\b.*?</script>', '', html, flags=re.S)
+    html = re.sub(r'\s(src|srcset)="https?:[^"]*"', '', html)
+    return ('<!DOCTYPE html><html lang="he" dir="rtl"><head><meta charset="utf-8">'
+            '<title>synthetic coupons</title></head>' + html + '</html>')
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    body = b''
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+
+class PageServer:
+    """Serves one page on 127.0.0.1 (random port by default); use as a context manager"""
+
+    def __init__(self, html, port=0):
+        self.body = standalone(html).encode('utf-8')
+        self.port = port
+
+    def __enter__(self):
+        handler = type('Handler', (_PageHandler,), {'body': self.body})
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/'
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _measure(fn, repeat):
+    """(median seconds over untraced runs, peak bytes of one tracemalloc run, result)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    timings.sort()
+    return timings[len(timings) // 2], peak, result
+
+
+def _offline_strategies(html, workdir):
+    import csv
+    import network_capture
+    import coupon_tiles
+    import coupon_journal
+
+    records = network_capture.records_from_html(html)
+    rows = [coupon_tiles.row_from_record(r) for r in records]
+
+    def journal():
+        j = coupon_journal.CouponJournal(run_id='bench', journal_dir=workdir)
+        for record, row in zip(records, rows):
+            j.append(coupon_journal.coupon_key(record, row), row)
+        j.close()
+        os.remove(j.path)
+
+    def write_csv():
+        with open(os.path.join(workdir, 'bench.csv'), 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fieldnames=list(dict.fromkeys(k for row in rows for k in row)))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    return [
+        ('parse_html', lambda: network_capture.records_from_html(html)),
+        ('rows', lambda: [coupon_tiles.row_from_record(r) for r in records]),
+        ('journal', journal),
+        ('csv', write_csv),
+    ]
+
+
+def _browser_strategies(sb):
+    import coupon_tiles
+
+    def fallback():
+        return sum(len(coupon_tiles.read_tiles(sb, selector, visible_only=False))
+                   for selector in coupon_tiles.ALTERNATIVE_SELECTORS)
+
+    def activate():
+        # Each click is one WebDriver round trip; a sample is timed and scaled to all usable buttons
+        usable = [r['button'] for r in coupon_tiles.read_tiles(sb) if r['buttonUsable']]
+        sample = usable[:ACTIVATE_SAMPLE]
+        start = time.perf_counter()
+        for button in sample:
+            sb.execute_script("arguments[0].scrollIntoView({block: 'center'});", button)
+            button.click()
+        return (time.perf_counter() - start) * len(usable) / max(len(sample), 1)
+
+    return [
+        ('dom_bulk', lambda: coupon_tiles.read_tiles(sb)),
+        ('dom_fallback', fallback),
+        ('activate', activate),
+    ]
+
+
+def benchmark(sizes, repeat=3, browser=False, seed=0):
+    """Time and peak Python memory per strategy and tile count; returns a list of result dicts"""
+    results = []
+    sb_context = None
+    if browser:
+        from seleniumbase import SB
+        sb_context = SB(headless=True)
+        sb = sb_context.__enter__()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for size in sizes:
+                html, states = generate(size, seed=seed)
+                strategies = _offline_strategies(html, workdir)
+                for name, fn in strategies:
+                    seconds, peak, _ = _measure(fn, repeat)
+                    results.append({'tiles': size, 'strategy': name, 'seconds': seconds, 'peak_bytes': peak})
+                if not browser:
+                    continue
+                with PageServer(html) as server:
+                    sb.open(server.url)
+                    heap = sb.execute_script("return performance.memory ? performance.memory.usedJSHeapSize : null;")
+                    for name, fn in _browser_strategies(sb):
+                        # activate reports its own extrapolated time and is not repeated (buttons stay clicked)
+                        seconds, peak, result = _measure(fn, 1 if name == 'activate' else repeat)
+                        if name == 'activate':
+                            seconds = result
+                        results.append({'tiles': size, 'strategy': name, 'seconds': seconds,
+                                        'peak_bytes': peak, 'js_heap_bytes': heap})
+    finally:
+        if sb_context is not None:
+            sb_context.__exit__(None, None, None)
+    return results
+
+
+def print_results(results):
+    print(f"{'tiles':>7} {'strategy':14} {'time':>10} {'per tile':>10} {'py peak':>9}")
+    for r in results:
+        print(f"{r['tiles']:>7} {r['strategy']:14} {r['seconds'] * 1000:>8.1f}ms "
+              f"{r['seconds'] * 1e6 / r['tiles']:>8.1f}us {r['peak_bytes'] / 2**20:>7.1f}MB")
+    heaps = {r['tiles']: r['js_heap_bytes'] for r in results if r.get('js_heap_bytes')}
+    for tiles, heap in heaps.items():
+        print(f"JS heap with {tiles} tiles: {heap / 2**20:.1f}MB")
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    if command == 'generate' and len(sys.argv) > 2:
+        html, _ = generate(int(sys.argv[2]))
+        out = sys.argv[3] if len(sys.argv) > 3 else f'synthetic_{sys.argv[2]}.html'
+        with open(out, 'w', encoding='utf-8') as f:
+            f.write(standalone(html))
+        print(f"Wrote {sys.argv[2]} tiles to {out}")
+    elif command == 'serve' and len(sys.argv) > 2:
+        html, _ = generate(int(sys.argv[2]))
+        with PageServer(html, int(sys.argv[3]) if len(sys.argv) > 3 else 0) as server:
+            print(f"Serving {sys.argv[2]} tiles at {server.url} (Ctrl+C to stop)")
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
+    else:
+        print(__doc__)
+        sys.exit(2)
@@ -1,14 +1,21 @@
+import os
 import time
+import pytest
 from seleniumbase import BaseCase
+import shaka_qoe
+import step_latency
+import run_logging
 BaseCase.main(__name__, __file__)
 
+log = run_logging.setup_logging('shaka')
+
 class TestShakaBrowser(BaseCase):
     def test_shaka_support(self):
         self.open("https://shaka-player-demo.appspot.com/support.html")
         self.wait_for_element("#output")
         self.scroll_to_bottom()
         txt = self.get_text_content("#output")
-        print(txt)
+        log.info(txt)
         assert('"com.widevine.alpha": {\n      "persistentState":' in txt)
 
     def test_playback(self):
@@ -21,12 +28,15 @@ class TestShakaBrowser(BaseCase):
         self.wait_for_element('//button[text()="Play"]', by='xpath')
         self.click('//button[text()="Play"]', by='xpath')
 
-        videoEl = self.wait_for_element("video#video",timeout=4)
+        latency = step_latency.LatencyModel('shaka_demo', step_latency.environment(self))
+        with latency.step('video_element', 4) as step:
+            videoEl = self.wait_for_element("video#video",timeout=step.timeout)
 
         readyState = videoEl.get_attribute("readyState")
         #self.assert_equal(readyState, "0", msg=None)
 
-        self.wait_for_attribute("video#video", "readyState", "4", timeout=4)
+        with latency.step('video_ready', 4) as step:
+            self.wait_for_attribute("video#video", "readyState", "4", timeout=step.timeout)
 
         src = videoEl.get_attribute("src")
         self.console_log_string("playing src: " + src)
@@ -36,3 +46,27 @@ class TestShakaBrowser(BaseCase):
 
         currentTime = int(float(self.get_attribute("video#video", "currentTime")))
         self.assertTrue(currentTime >= secondsToPlay, msg=None)
+
+    def test_playback_qoe(self):
+        # Local DASH content behind a throttled link; QOE_PROFILE is kbps:seconds steps, e.g. "4000:10,600:10,4000"
+        profile = os.environ.get('QOE_PROFILE', '4000:10,600:10,4000')
+        secondsToPlay = float(os.environ.get('QOE_SECONDS', 30))
+        missing = shaka_qoe.content_missing()
+        if missing:
+            pytest.skip(missing)
+        with shaka_qoe.ContentServer(profile=profile) as server:
+            self.open(server.url)
+            self.wait_for_attribute("video#video", "readyState", "4", timeout=20)
+            time.sleep(secondsToPlay)
+            result = shaka_qoe.collect(self)
+
+        result.update(profile=profile, seconds=secondsToPlay, browser=self.browser)
+        path = shaka_qoe.save_result(result)
+        # startupMs stays None when playback never started; the error assertion below reports why
+        startup = 'n/a' if result['startupMs'] is None else f"{result['startupMs']:.0f} ms"
+        log.info(f"QoE: startup {startup}, first frame {result['firstFrameMs'] or 0:.0f} ms, "
+                 f"{result['rebuffers']} rebuffers ({result['rebufferMs']:.0f} ms), "
+                 f"dropped {result['droppedFrames']}/{result['decodedFrames']} frames, "
+                 f"{len(result['switches'])} variant switches -> {path}")
+        self.assertIsNone(result['error'], msg="Shaka error code %s" % result['error'])
+        self.assertTrue(result['currentTime'] >= secondsToPlay / 2, msg=None)
@@ -1,13 +1,19 @@
 import os
+import datetime
 from seleniumbase import SB
+import yad2_bumps
+import step_latency
+import run_logging
+
+log = run_logging.setup_logging('yad2')
 
 with SB(uc=True) as sb:
     email = os.environ.get('EMAIL')
     pswd = os.environ.get('PSWD')
     if email is None or pswd is None:
-        print("USER or PSWD not provided in ENV")
+        log.error("[FAIL] USER or PSWD not provided in ENV")
         exit(1)
-    print("email=%s" % email)
+    log.info("email=%s" % email)
 
     sb.driver.uc_open_with_tab("https://www.yad2.co.il/personal/my-ads")
     sb.sleep(4)
@@ -19,28 +25,39 @@ with SB(uc=True) as sb:
         sb.click('span:contains("התחברות")')  # Use :contains() on any tag
 
     mail = sb.get_text_content("div[class*=profile-block_email]")
-    print(mail) 
+    log.info(mail)
     assert(mail == email)
 
-    sb.wait_for_element_present("div[class*=ad-details_detailsActions]", timeout=8)
+    latency = step_latency.LatencyModel('yad2', step_latency.environment(sb))
+    with latency.step('ad_actions', 8) as step:
+        sb.wait_for_element_present("div[class*=ad-details_detailsActions]", timeout=step.timeout)
     ads = sb.find_visible_elements("div[class*=ad-details_detailsActions]")
     num_ads = len(ads)
-    print("found %s ads" % num_ads)
+    log.info("found %s ads" % num_ads)
+    countdowns = {}              # ad key -> "time until jump" text, see yad2_bumps.py
     for ad in range(num_ads):
         ind = 4 + ad             # for some reason every 2nd div is hidden
 
+        # Key by the ad's item link when there is one: positions change after a bump
+        link = 'div[class*=general-layout_children__] > div:nth-child(%s) a[href*="/item/"]' % (ind)
+        if sb.is_element_present(link):
+            key = sb.get_attribute(link, 'href').split('/item/')[1].split('?')[0]
+        else:
+            key = "ad%s" % (ad+1)
+
         selector = 'div[class*=general-layout_children__] > div:nth-child(%s) span[class*=details_counter]' % (ind)
-        print(selector)
+        log.info(selector)
         if sb.is_element_present(selector):
-            print("found label %s" % str(ad+1))
+            log.info("found label %s" % str(ad+1))
             timeUntilJump = sb.get_text(selector)
-            print("ad %s timeUntilJump=%s" % (str(ad+1), timeUntilJump))
+            log.info("ad %s timeUntilJump=%s" % (str(ad+1), timeUntilJump))
+            countdowns[key] = timeUntilJump
             continue
 
         selector = 'div[class*=general-layout_children__] > div:nth-child(%s) button[class*=ad-details_bump]' % (ind)
-        print(selector)
+        log.info(selector)
         #breakpoint()
-        print("found button %s" % str(ad+1))
+        log.info("found button %s" % str(ad+1))
         sb.click(selector)
         
         # close popup
@@ -50,4 +67,13 @@ with SB(uc=True) as sb:
         # either ad was not yet bumpable or it was just bumped
         selector = 'div[class*=general-layout_children__] > div:nth-child(%s) span[class*=details_counter]' % (ind)
         timeUntilJump = sb.get_text(selector)
-        print("After bump ad %s timeUntilJump=%s" % (str(ad+1), timeUntilJump))
+        log.info("After bump ad %s timeUntilJump=%s" % (str(ad+1), timeUntilJump))
+        countdowns[key] = timeUntilJump
+
+    # Persist absolute eligibility times; the scheduler wakes the next run from them
+    unparsed = yad2_bumps.record_countdowns(countdowns)
+    for key in unparsed:
+        log.warning("[WARN] could not parse countdown for ad %s: %s" % (key, countdowns[key]))
+    wakeup = yad2_bumps.next_wakeup(datetime.datetime.now().timestamp())
+    if wakeup:
+        log.info("next bump wake-up at %s" % datetime.datetime.fromtimestamp(wakeup).strftime('%Y-%m-%d %H:%M'))
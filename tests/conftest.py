@@ -0,0 +1,5 @@
+# Unit tests for the stdlib helper modules; the browser flows stay in the root test_*.py files
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
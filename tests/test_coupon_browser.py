@@ -0,0 +1,78 @@
+import os
+import csv
+import time
+
+import pytest
+
+import coupon_browser
+
+
+def write_csv(path, rows, mtime=None):
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=['title', 'store', 'description', 'percent', 'activated'])
+        writer.writeheader()
+        writer.writerows(rows)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def coupon(title, store='', description='', activated=''):
+    return {'title': title, 'store': store, 'description': description, 'percent': '10%', 'activated': activated}
+
+
+@pytest.fixture
+def store(tmp_path):
+    write_csv(tmp_path / '01_05_2026_09_00_00.csv', [
+        coupon('קפה עלית', 'עלית', 'קפה טורקי 200 גרם'),
+        coupon('שוקולד פרה', 'עלית', 'שוקולד חלב', activated='True'),
+    ])
+    write_csv(tmp_path / '01_06_2026_09_00_00.csv', [coupon('קפה עלית', 'עלית', 'קפה טורקי 200 גרם')] +
+              [coupon(f'מוצר {i}', 'שופרסל') for i in range(5)])
+    store = coupon_browser.CouponStore(str(tmp_path / 'coupons.sqlite'), str(tmp_path / '*.csv'))
+    store.refresh(force=True)
+    return store
+
+
+def test_normalize_folds_niqqud_final_letters_and_geresh():
+    assert coupon_browser.normalize('שָׁלוֹם') == 'שלומ'
+    assert coupon_browser.normalize('צ׳יפס') == 'ציפס'
+    assert coupon_browser.fts_query('קפה, עלית!') == '"קפה"* "עלית"*'
+    assert coupon_browser.fts_query('!!') == ''
+
+
+def test_search_matches_word_prefixes_in_any_field(store):
+    total, coupons = store.query('קפ')
+    assert total == 1 and coupons[0]['title'] == 'קפה עלית'
+    assert store.query('עלית')[0] == 2          # store column
+    assert store.query('חלב')[0] == 1           # description column
+    assert store.query('קפה חלב')[0] == 0       # every word must match
+
+
+def test_distinct_coupons_track_first_and_last_seen(store):
+    _, coupons = store.query('קפה')
+    assert coupons[0]['seen'] == 2
+    assert coupons[0]['first_seen'].startswith('2026-01-05')
+    assert coupons[0]['last_seen'].startswith('2026-01-06')
+
+
+def test_paging_and_filters_run_in_sql(store):
+    total, first = store.query(page=1, size=3)
+    _, last = store.query(page=3, size=3)
+    assert total == 7 and len(first) == 3 and len(last) == 1
+    assert not {c['id'] for c in first} & {c['id'] for c in last}
+    assert store.query(activated=True)[0] == 1
+    prefs = {'exclude': ['שוקולד'], 'emphasize': []}
+    total, coupons = store.query(preference='exclude', prefs=prefs)
+    assert total == 1 and coupons[0]['preference_term'] == 'שוקולד'
+    assert store.query(preference='emphasize', prefs=prefs)[0] == 0
+
+
+def test_refresh_imports_only_changed_files_without_double_counting(store, tmp_path):
+    version = store.version()
+    assert store.refresh(force=True) == 0
+    path = tmp_path / '01_06_2026_09_00_00.csv'
+    write_csv(path, [coupon('קפה עלית', 'עלית', 'קפה טורקי 200 גרם'), coupon('חדש')], mtime=time.time() + 10)
+    assert store.refresh(force=True) == 1
+    assert store.version() == version + 1
+    assert store.query('קפה')[1][0]['seen'] == 2
+    assert store.query('חדש')[0] == 1
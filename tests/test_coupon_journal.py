@@ -0,0 +1,44 @@
+import os
+
+import coupon_journal
+
+
+def write_journal(journal_dir, run_id, rows, completed, mtime):
+    journal = coupon_journal.CouponJournal(run_id=run_id, journal_dir=str(journal_dir))
+    for key, row in rows:
+        journal.append(key, row)
+    journal.close(completed=completed)
+    os.utime(journal.path, (mtime, mtime))
+    return journal.path
+
+
+def test_coupon_key_prefers_promo_id():
+    row = {'title': 'Coffee', 'description': '200g'}
+    assert coupon_journal.coupon_key({'promo': '123'}, row) == 'promo:123'
+    assert coupon_journal.coupon_key({}, row) == 'text:Coffee|200g'
+
+
+def test_read_journal_keeps_last_row_per_key_and_ignores_torn_line(tmp_path):
+    path = write_journal(tmp_path, 'run', [('a', {'n': 1}), ('b', {'n': 2}), ('a', {'n': 3})], False, 1000)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"event": "coupon", "key": "c", "ro')
+    rows, completed = coupon_journal.read_journal(path)
+    assert rows == {'a': {'n': 3}, 'b': {'n': 2}}
+    assert list(rows) == ['a', 'b']
+    assert not completed
+
+
+def test_find_incomplete_only_resumes_the_newest_journal(tmp_path):
+    write_journal(tmp_path, 'old', [('a', {})], False, 1000)
+    path = write_journal(tmp_path, 'new', [('b', {'n': 1})], False, 2000)
+    assert coupon_journal.find_incomplete(str(tmp_path)) == (path, {'b': {'n': 1}})
+    write_journal(tmp_path, 'done', [], True, 3000)
+    assert coupon_journal.find_incomplete(str(tmp_path)) == (None, {})
+
+
+def test_prune_keeps_newest_and_recent_completed(tmp_path):
+    for i in range(6):
+        write_journal(tmp_path, f'r{i}', [], completed=i != 1, mtime=1000 + i)
+    removed = coupon_journal.prune(str(tmp_path), keep=2)
+    assert sorted(os.path.basename(p) for p in removed) == ['r0.jsonl', 'r1.jsonl', 'r2.jsonl']
+    assert sorted(os.listdir(tmp_path)) == ['r3.jsonl', 'r4.jsonl', 'r5.jsonl']
@@ -0,0 +1,32 @@
+import facet_tabs
+
+
+def facet(id, count):
+    return {'id': id, 'name': id, 'count': count}
+
+
+def test_plan_partitions_balances_largest_first():
+    facets = [facet('a', 10), facet('b', 40), facet('c', 30), facet('d', 20)]
+    partitions = facet_tabs.plan_partitions(facets, 2)
+    assert [[f['id'] for f in p] for p in partitions] == [['b', 'a'], ['c', 'd']]
+    assert [sum(f['count'] for f in p) for p in partitions] == [50, 50]
+
+
+def test_plan_partitions_never_exceeds_facet_count():
+    partitions = facet_tabs.plan_partitions([facet('a', 5), facet('b', 0)], 4)
+    assert len(partitions) == 2
+    assert facet_tabs.plan_partitions([], 3) == []
+
+
+def test_merge_deduplicates_by_product_code_then_promo():
+    first = [{'productCode': 'P1', 'promo': '1'}, {'productCode': '', 'promo': '2'}]
+    second = [{'productCode': 'P1', 'promo': '9'}, {'productCode': '', 'promo': '2'},
+              {'productCode': '', 'promo': '', 'allText': 'no ids'}]
+    merged = facet_tabs.merge([first, second])
+    assert [r['promo'] for r in merged] == ['1', '2', '']
+    assert merged[0] is first[0]
+
+
+def test_record_key():
+    assert facet_tabs.record_key({'productCode': 'P1', 'promo': '1'}) == 'P1'
+    assert facet_tabs.record_key({'productCode': '', 'promo': '1'}) == 'promo:1'
@@ -0,0 +1,68 @@
+import random
+import string
+
+import pytest
+
+import human_typing
+
+ROWS = ['qwertyuiop', 'asdfghjkl', 'zxcvbnm']
+
+
+def replay(timeline):
+    """Field values after the page replays timeline"""
+    values = {}
+    for selector, op, char, _ in timeline:
+        value = values.setdefault(selector, '')
+        if op == 'char':
+            values[selector] = value + char
+        elif op == 'back':
+            values[selector] = value[:-1]
+    return values
+
+
+def position(key):
+    row = next(r for r, keys in enumerate(ROWS) if key in keys)
+    return row, ROWS[row].index(key)
+
+
+def test_neighbour_map_covers_every_letter_with_adjacent_keys():
+    assert sorted(human_typing._NEIGHBOURS) == list(string.ascii_lowercase)
+    for key, neighbours in human_typing._NEIGHBOURS.items():
+        row, col = position(key)
+        for other in neighbours:
+            assert key in human_typing._NEIGHBOURS[other], (key, other)
+            other_row, other_col = position(other)
+            assert abs(other_row - row) <= 1 and abs(other_col - col) <= 1, (key, other)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_timeline_types_the_exact_text(seed):
+    random.seed(seed)
+    fields = [('#email', 'Someone@Example.com', None), ('#password', 'p4ss-WORD', (80, 90)), ('#name', 'שלום', None)]
+    timeline, total_ms = human_typing.build_timeline(fields, mistake_chance=0.5)
+    assert replay(timeline) == {'#email': 'Someone@Example.com', '#password': 'p4ss-WORD', '#name': 'שלום'}
+    assert total_ms == sum(ev[3] for ev in timeline)
+    assert [ev[0] for ev in timeline if ev[1] == 'focus'] == ['#email', '#password', '#name']
+
+
+def test_typo_is_a_neighbour_key_corrected_with_backspace():
+    random.seed(1)
+    timeline, _ = human_typing.build_timeline([('#f', 'hello', None), ('#h', 'שלום 123', None)], mistake_chance=1.0)
+    ops = [ev[1] for ev in timeline if ev[0] == '#f']
+    assert ops.count('back') == 1
+    back = ops.index('back')
+    wrong, right = timeline[back - 1][2], timeline[back + 1][2]
+    assert wrong in human_typing._NEIGHBOURS[right]
+    # no ASCII letter to mistype
+    assert 'back' not in [ev[1] for ev in timeline if ev[0] == '#h']
+
+
+def test_delays_stay_in_their_ranges():
+    random.seed(3)
+    fields = [('#a', 'abcdef', (10, 20)), ('#b', 'xyz', None)]
+    timeline, _ = human_typing.build_timeline(fields, key_delay=(30, 40), pause=(500, 600), mistake_chance=0.0)
+    by_field = {sel: [ev for ev in timeline if ev[0] == sel] for sel, _, _ in fields}
+    for selector, low, high in (('#a', 10, 20), ('#b', 30, 40)):
+        events = by_field[selector]
+        assert 500 <= events[0][3] <= 600 and 500 <= events[-1][3] <= 600
+        assert all(low <= ev[3] <= high for ev in events[1:-1])
@@ -0,0 +1,97 @@
+import re
+import json
+
+import network_capture
+
+TILE = ('<li class="tile" data-promo="{promo}" data-product-code="P_{promo}">'
+        '<div class="price"><span class="number">{percent}</span></div>'
+        '<div class="description">{description}</div>'
+        '<div class="smallText grayBg">until 31/12</div>'
+        '<button class="miglog-btn-add"{disabled}>activate</button></li>')
+
+
+def tile(promo, description='Coffee, Elite', percent='20%', disabled=False):
+    return TILE.format(promo=promo, description=description, percent=percent,
+                       disabled=' disabled=""' if disabled else '')
+
+
+def test_records_from_html_reads_tile_fields():
+    records = network_capture.records_from_html('<ul>' + tile('1') + tile('2', disabled=True) + '</ul>')
+    assert [r['promo'] for r in records] == ['1', '2']
+    first = records[0]
+    assert first['productCode'] == 'P_1'
+    assert first['description'] == 'Coffee, Elite'
+    assert first['percent'] == '20%'
+    assert first['smallText'] == 'until 31/12'
+    assert first['buttonText'] == 'activate'
+    assert first['buttonUsable'] and not records[1]['buttonUsable']
+
+
+def test_records_from_json_requires_coupon_specific_key():
+    payload = {
+        'facets': [{'code': 'dairy', 'name': 'Dairy'}],
+        'results': [{'promotionCode': '77', 'description': 'Milk 1L', 'discount': '5'}],
+    }
+    records = network_capture.records_from_json(payload)
+    assert [(r['promo'], r['description'], r['percent']) for r in records] == [('77', 'Milk 1L', '5')]
+
+
+def test_records_from_json_parses_embedded_html():
+    records = network_capture.records_from_json({'html': '<ul>' + tile('9') + '</ul>'})
+    assert [r['promo'] for r in records] == ['9']
+
+
+def test_records_from_responses_later_response_wins():
+    responses = [
+        {'type': 'text/html', 'body': tile('1', percent='10%')},
+        {'type': 'application/json', 'body': 'not json'},
+        {'type': 'application/json', 'body': json.dumps({'html': tile('1', percent='30%')})},
+    ]
+    records = network_capture.records_from_responses(responses)
+    assert [(r['promo'], r['percent']) for r in records] == [('1', '30%')]
+
+
+def test_url_pattern_skips_unrelated_urls():
+    pattern = re.compile(network_capture.URL_PATTERN, re.I)
+    assert pattern.search('https://www.shufersal.co.il/online/he/coupons/c/A?q=:relevance')
+    assert pattern.search('https://www.shufersal.co.il/online/he/my-account/personal-area/my-coupons')
+    assert not pattern.search('https://www.shufersal.co.il/online/he/search/facets?category=dairy')
+
+
+class FakeCdpDriver:
+    reactor = object()
+
+    def __init__(self):
+        self.bodies = {}
+
+    def add_cdp_listener(self, event, callback):
+        self.callback = callback
+
+    def execute_cdp_cmd(self, cmd, params):
+        if params['requestId'] not in self.bodies:
+            raise RuntimeError('No resource with given identifier found')
+        return {'body': self.bodies[params['requestId']]}
+
+    def respond(self, request_id, url, body, mime='application/json'):
+        self.bodies[request_id] = body
+        self.callback({'params': {'requestId': request_id, 'response': {'url': url, 'mimeType': mime, 'status': 200}}})
+
+
+def test_since_mark_is_not_shifted_by_evicted_bodies():
+    driver = FakeCdpDriver()
+    capture = network_capture.NetworkCapture(driver)
+    assert capture.start()
+    driver.respond('1', 'https://x/coupons/a', '{}')
+    driver.respond('2', 'https://x/coupons/b', '{}')
+    del driver.bodies['1']   # evicted by the browser before it was read
+    capture.mark()
+    driver.respond('3', 'https://x/coupons/c', '{"n": 3}')
+    driver.respond('4', 'https://x/static/app.js', '', mime='application/javascript')
+    assert [r['url'] for r in capture.since_mark()] == ['https://x/coupons/c']
+    assert [r['url'] for r in capture.responses()] == ['https://x/coupons/b', 'https://x/coupons/c']
+
+
+def test_start_without_event_stream_or_hook_disables_capture():
+    class PlainDriver:
+        pass
+    assert not network_capture.NetworkCapture(PlainDriver()).start()
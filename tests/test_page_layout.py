@@ -0,0 +1,43 @@
+import page_layout
+
+BASELINE = {
+    '#couponsPage': ['0|div', '1|section', '2|ul'],
+    '.couponsCards': ['0|div.couponsCards', '1|li.tile'],
+    '.tileContainer': None,
+}
+
+
+def test_identical_skeletons_do_not_drift():
+    report = page_layout.compare_skeletons(BASELINE, dict(BASELINE))
+    assert report['drift'] == 0.0
+    assert report['baseline_hash'] == report['current_hash']
+
+
+def test_drift_is_worst_root_jaccard_distance():
+    current = dict(BASELINE, **{'#couponsPage': ['0|div', '1|section', '2|ol']})
+    report = page_layout.compare_skeletons(BASELINE, current)
+    assert report['drift'] == 0.5
+    assert report['roots']['#couponsPage']['added'] == ['2|ol']
+    assert report['roots']['#couponsPage']['removed'] == ['2|ul']
+    assert report['roots']['.couponsCards']['drift'] == 0.0
+
+
+def test_missing_root_is_full_drift():
+    current = dict(BASELINE, **{'.couponsCards': None})
+    report = page_layout.compare_skeletons(BASELINE, current)
+    assert report['drift'] == 1.0
+    assert report['roots']['.couponsCards']['missing']
+
+
+def test_root_absent_from_baseline_is_ignored():
+    current = dict(BASELINE, **{'.tileContainer': ['0|div.new']})
+    report = page_layout.compare_skeletons(BASELINE, current)
+    assert '.tileContainer' not in report['roots']
+    assert report['drift'] == 0.0
+
+
+def test_baseline_round_trip(tmp_path):
+    path = str(tmp_path / 'baseline.json')
+    saved = page_layout.save_baseline(BASELINE, path)
+    assert page_layout.load_baseline(path) == saved
+    assert page_layout.load_baseline(str(tmp_path / 'missing.json')) is None
@@ -0,0 +1,26 @@
+import pytest
+
+import preferences
+
+
+def test_classify_returns_kind_and_matching_term():
+    prefs = {'exclude': ['Alcohol'], 'emphasize': ['coffee', 'alcohol']}
+    assert preferences.classify({'title': 'Elite COFFEE', 'description': ''}, prefs) == ('emphasize', 'coffee')
+    # exclude wins when both match
+    assert preferences.classify({'title': 'x', 'description': 'alcohol free'}, prefs) == ('exclude', 'Alcohol')
+    assert preferences.classify({'title': None, 'description': None}, prefs) == ('', '')
+
+
+def test_add_remove_round_trip(tmp_path):
+    path = str(tmp_path / 'prefs.json')
+    assert preferences.load(path) == {'exclude': [], 'emphasize': []}
+    preferences.add('exclude', 'wine', path)
+    preferences.add('exclude', 'wine', path)
+    assert preferences.load(path)['exclude'] == ['wine']
+    preferences.remove('exclude', 'wine', path)
+    assert preferences.load(path)['exclude'] == []
+
+
+def test_unknown_kind_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        preferences.add('hide', 'x', str(tmp_path / 'prefs.json'))
@@ -0,0 +1,118 @@
+import socket
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+import preflight
+import proxy_pool
+
+URL = 'http://shufersal.test/online/he/coupons'
+
+
+def make_pool(tmp_path, proxies=('a:1', 'b:2', 'c:3')):
+    return proxy_pool.ProxyPool(proxies=list(proxies), health_file=str(tmp_path / 'health.json'))
+
+
+def test_record_folds_observations_with_ewma(tmp_path):
+    pool = make_pool(tmp_path)
+    pool.record('a:1', True, 1.0)
+    pool.record('a:1', False, 1.0)
+    entry = pool.health['a:1']
+    assert entry['success'] == 1 - proxy_pool.ALPHA
+    assert entry['latency'] == (1 - proxy_pool.ALPHA) * 1.0 + proxy_pool.ALPHA * proxy_pool.FAILURE_LATENCY
+    assert entry['samples'] == 2
+
+
+def test_best_prefers_fast_healthy_proxy(tmp_path):
+    pool = make_pool(tmp_path)
+    pool.record('a:1', True, 4.0)
+    pool.record('b:2', True, 0.5)
+    pool.record('c:3', False, 0.1)
+    assert pool.ranked()[0] == 'b:2'
+    assert pool.best() == 'b:2'
+    assert pool.best(exclude=('b:2',)) == 'a:1'
+
+
+def test_unknown_proxy_is_never_best(tmp_path):
+    pool = make_pool(tmp_path)
+    assert pool.best() is None
+
+
+def test_failover_never_returns_to_a_failed_proxy(tmp_path):
+    pool = make_pool(tmp_path, ('a:1', 'b:2'))
+    pool.record('a:1', True, 1.0)
+    pool.record('b:2', True, 1.0)
+    assert pool.report_failure('a:1') == 'b:2'
+    # a:1 may still score as healthy, but it already failed in this run
+    assert pool.report_failure('b:2') is None
+
+
+def test_health_is_persisted(tmp_path):
+    pool = make_pool(tmp_path)
+    pool.record('a:1', True, 1.0)
+    pool.save()
+    assert make_pool(tmp_path).health['a:1']['success'] == 1.0
+
+
+class _StandInProxy(BaseHTTPRequestHandler):
+    """Plain-HTTP forward proxy that answers every request itself with the page it was given"""
+    body = b''
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+
+@pytest.fixture
+def stand_in_proxies():
+    """{'good1', 'good2', 'geo', 'dead'} -> host:port; 'dead' is a port nothing listens on"""
+    servers, proxies = [], {}
+    pages = {'good1': b'<html>coupons</html>', 'good2': b'<html>coupons</html>',
+             'geo': b'<html><img src="/maintenance1.jpg"></html>'}
+    for name, body in pages.items():
+        handler = type('Handler', (_StandInProxy,), {'body': body})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.requests = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        proxies[name] = f'127.0.0.1:{server.server_address[1]}'
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        proxies['dead'] = f'127.0.0.1:{s.getsockname()[1]}'
+    yield proxies, servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_probe_all_through_stand_in_proxies(tmp_path, stand_in_proxies):
+    proxies, servers = stand_in_proxies
+    pool = proxy_pool.ProxyPool(proxies=[proxies[n] for n in ('dead', 'geo', 'good1')], url=URL,
+                                timeout=2.0, health_file=str(tmp_path / 'health.json'))
+    codes = {proxy: code for proxy, code, _, _ in pool.probe_all()}
+    assert codes == {proxies['dead']: preflight.EXIT_OUTAGE, proxies['geo']: preflight.EXIT_GEO_BLOCKED,
+                     proxies['good1']: preflight.EXIT_OK}
+    assert servers[0].requests == [URL]   # absolute URL: the request really went through the proxy
+    assert pool.ranked()[0] == proxies['good1']
+    assert pool.best() == proxies['good1']
+    assert pool.best(exclude=(proxies['good1'],)) is None
+
+
+def test_failover_through_stand_in_proxies_never_repeats(tmp_path, stand_in_proxies):
+    proxies, _ = stand_in_proxies
+    pool = proxy_pool.ProxyPool(proxies=list(proxies.values()), url=URL, timeout=2.0,
+                                health_file=str(tmp_path / 'health.json'))
+    pool.probe_all()
+    current, used = pool.best(), []
+    while current is not None:
+        used.append(current)
+        current = pool.report_failure(current)
+        assert current not in used
+    assert sorted(used) == sorted([proxies['good1'], proxies['good2']])
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+import purchase_history
+
+URL = 'https://www.shufersal.co.il/online/he/my-account/personal-area/orders/online-orders'
+PER_PAGE = 10
+
+
+class FakeSite:
+    """Order list pages (newest first, PER_PAGE per page) and one product per order"""
+
+    def __init__(self, count):
+        self.orders = []
+        self.fetched = []
+        self.add(count)
+
+    def add(self, count):
+        start = len(self.orders)
+        self.orders += [f'O{i:03d}' for i in range(start, start + count)]
+
+    def fetch(self, url):
+        self.fetched.append(url)
+        if '?page=' in url:
+            page = int(url.rsplit('=', 1)[1])
+            codes = self.orders[::-1][page * PER_PAGE:(page + 1) * PER_PAGE]
+            return ''.join(f'<a href="/online/he/my-account/personal-area/orders/{c}">{c}</a>' for c in codes)
+        code = url.rsplit('/', 1)[1]
+        return (f'<li data-product-code="P_{code}" data-product-name="product {code}"></li>'
+                '<li data-product-code="P_MILK" title="milk"></li>')
+
+
+def test_parsers():
+    html = ('<a href="/online/he/my-account/personal-area/orders/online-orders?page=1">next</a>'
+            '<a href="/online/he/my-account/personal-area/orders/A1">A1</a>'
+            '<a href="/online/he/my-account/personal-area/orders/A1">again</a>')
+    assert purchase_history.parse_order_list(html) == ['A1']
+    lines = purchase_history.parse_order_lines('<img data-product-code="P1" alt="Milk "><div data-product-code="P2">')
+    assert lines == {'P1': 'Milk', 'P2': ''}
+
+
+def test_capped_syncs_index_every_order(tmp_path):
+    path = str(tmp_path / 'history.json')
+    site = FakeSite(50)   # 5 list pages, more than SYNC_PAGES
+    for run in range(20):
+        index = purchase_history.sync(site.fetch, path, URL, max_pages=3, max_orders=8)
+        if run % 3 == 1:
+            site.add(4)   # new orders between runs push the older ones to later pages
+        if index['backfill_page'] is None and len(index['indexed']) == len(site.orders):
+            break
+    assert sorted(index['indexed']) == site.orders
+    assert index['orders'] == len(site.orders)
+    assert index['cursor'] == site.orders[-1]
+    assert index['products']['P_MILK']['count'] == len(site.orders)
+    assert all(index['products'][f'P_{c}']['count'] == 1 for c in site.orders)
+
+
+def test_sync_is_incremental_once_caught_up(tmp_path):
+    path = str(tmp_path / 'history.json')
+    site = FakeSite(25)
+    purchase_history.sync(site.fetch, path, URL, max_pages=10, max_orders=0)
+    site.add(2)
+    site.fetched.clear()
+    index = purchase_history.sync(site.fetch, path, URL, max_pages=10, max_orders=0)
+    assert index['orders'] == 27
+    assert index['backfill_page'] is None
+    # one list page, then only the two new orders
+    assert len(site.fetched) == 3
+
+
+def test_legacy_index_is_not_backfilled_again(tmp_path):
+    path = tmp_path / 'history.json'
+    path.write_text(json.dumps({'cursor': 'O009', 'orders': 10, 'products': {}}), encoding='utf-8')
+    site = FakeSite(12)
+    index = purchase_history.sync(site.fetch, str(path), URL)
+    assert index['indexed'] == ['O009', 'O010', 'O011']
+    assert index['orders'] == 12
+
+
+@pytest.mark.parametrize('code, expected', [('P_MILK', 3), ('P_NONE', 0), ('', 0)])
+def test_bought_counts(code, expected):
+    index = {'products': {'P_MILK': {'count': 3}}}
+    assert purchase_history.bought_counts([{'productCode': code}], index) == [expected]
@@ -0,0 +1,21 @@
+import run_profiler
+
+
+def test_align_trace_puts_the_sync_marker_on_the_run_clock():
+    events = [{'ph': 'M', 'pid': 7, 'name': 'process_name', 'args': {'name': 'Renderer'}},
+              {'ph': 'c', 'pid': 7, 'name': 'clock_sync', 'ts': 5_000_000, 'args': {'sync_id': 'run_profiler'}},
+              {'ph': 'X', 'pid': 7, 'name': 'RunTask', 'ts': 5_250_000, 'dur': 1000}]
+    aligned = run_profiler.align_trace(events, sync_time=1_700_000_000.0)
+    assert aligned[0] == events[0]
+    assert aligned[1]['ts'] == 1_700_000_000.0 * 1e6
+    assert aligned[2]['ts'] == 1_700_000_000.25 * 1e6
+    assert events[2]['ts'] == 5_250_000
+
+
+def test_browser_trace_is_merged_into_the_timeline():
+    profiler = run_profiler.RunProfiler(sb=None, run='r1')
+    profiler.phases = [('login', 10.0), ('coupons', 12.0)]
+    profiler.browser_events = [{'ph': 'X', 'pid': 7, 'name': 'RunTask', 'ts': 11e6, 'dur': 1000}]
+    events = profiler._trace_events()
+    assert {'ph': 'X', 'pid': 1, 'tid': 1, 'name': 'login', 'cat': 'phase', 'ts': 10e6, 'dur': 2e6} in events
+    assert events[-1] == profiler.browser_events[0]
@@ -0,0 +1,104 @@
+import sys
+import types
+import datetime
+
+import pytest
+
+import scheduler
+
+
+class NoJitter:
+    def uniform(self, a, b):
+        return a
+
+
+def at(hour, minute=0, day=1):
+    return datetime.datetime(2026, 3, day, hour, minute).timestamp()
+
+
+def make_scheduler(tmp_path, jobs):
+    return scheduler.Scheduler(jobs=jobs, limits={'browser': 1}, state_file=str(tmp_path / 'jobs.json'),
+                               lock_dir=str(tmp_path / 'locks'), rng=NoJitter())
+
+
+JOB = {'command': ['true'], 'schedule': ('daily', '09:30'), 'retries': 2, 'backoff': 60, 'no_retry': (13,)}
+
+
+def test_daily_slot_is_today_or_tomorrow():
+    assert scheduler.next_slot(JOB, at(8), NoJitter()) == at(9, 30)
+    assert scheduler.next_slot(JOB, at(9, 30), NoJitter()) == at(9, 30, day=2)
+
+
+def test_every_and_wake_schedules(monkeypatch):
+    assert scheduler.next_slot({'schedule': ('every', 600)}, 1000.0, NoJitter()) == 1600.0
+    wake = types.ModuleType('fake_wake')
+    wake.next_wakeup = lambda after: None
+    monkeypatch.setitem(sys.modules, 'fake_wake', wake)
+    job = {'schedule': ('wake', 'fake_wake', 300)}
+    assert scheduler.next_slot(job, 1000.0, NoJitter()) == 1300.0  # nothing recorded yet: fallback
+    wake.next_wakeup = lambda after: after + 42
+    assert scheduler.next_slot(job, 1000.0, NoJitter()) == 1042.0
+
+
+def test_unknown_schedule_kind_fails():
+    with pytest.raises(ValueError):
+        scheduler.next_slot({'schedule': ('hourly', 1)}, 0.0, NoJitter())
+
+
+def test_failures_retry_with_backoff_then_fall_back_to_the_schedule(tmp_path):
+    sched = make_scheduler(tmp_path, {'job': JOB})
+    entry = sched.state['job']
+    sched._finish('job', 1, at(9))
+    assert (entry['attempts'], entry['next_run']) == (1, at(9) + 60)
+    sched._finish('job', 1, at(9, 5))
+    assert (entry['attempts'], entry['next_run']) == (2, at(9, 5) + 120)
+    sched._finish('job', 1, at(9, 10))
+    assert (entry['attempts'], entry['next_run']) == (0, at(9, 30))
+    sched._finish('job', 0, at(10))
+    assert (entry['attempts'], entry['last_code'], entry['next_run']) == (0, 0, at(9, 30, day=2))
+
+
+def test_no_retry_codes_and_lost_lock_race(tmp_path):
+    sched = make_scheduler(tmp_path, {'job': JOB})
+    entry = sched.state['job']
+    sched._finish('job', 13, at(9))
+    assert (entry['attempts'], entry['next_run']) == (0, at(9, 30))
+    sched._finish('job', scheduler.EXIT_LOCKED, at(9, 40))
+    assert (entry['attempts'], entry['last_code'], entry['next_run']) == (0, 13, at(9, 40) + scheduler.TICK)
+
+
+def test_catch_up_runs_missed_jobs_once(tmp_path):
+    jobs = {'catch': dict(JOB, jitter=0), 'skip': dict(JOB, catch_up=False)}
+    sched = make_scheduler(tmp_path, jobs)
+    for name in jobs:
+        sched.state[name]['next_run'] = at(9, 30)
+    sched._catch_up(at(12))
+    assert sched.state['catch']['next_run'] == at(12)
+    assert sched.state['skip']['next_run'] == at(9, 30, day=2)
+
+
+def test_resource_limit_keeps_job_due(tmp_path):
+    jobs = {'a': dict(JOB, resource='browser'), 'b': dict(JOB, resource='browser')}
+    sched = make_scheduler(tmp_path, jobs)
+    sched.running['a'] = (None, 0.0)
+    assert not sched._start('b', at(9, 30))
+    assert 'b' not in sched.running
+
+
+def test_lock_is_exclusive(tmp_path):
+    lock = scheduler.try_lock('job', str(tmp_path))
+    assert lock is not None
+    assert scheduler.try_lock('job', str(tmp_path)) is None
+    lock.close()
+    scheduler.try_lock('job', str(tmp_path)).close()
+
+
+def test_run_now_holds_the_lock(tmp_path):
+    jobs = {'ok': {'command': [sys.executable, '-c', 'raise SystemExit(3)']}}
+    assert scheduler.run_now('missing', jobs, str(tmp_path)) == 2
+    assert scheduler.run_now('ok', jobs, str(tmp_path)) == 3
+    lock = scheduler.try_lock('ok', str(tmp_path))
+    try:
+        assert scheduler.run_now('ok', jobs, str(tmp_path)) == scheduler.EXIT_LOCKED
+    finally:
+        lock.close()
@@ -0,0 +1,64 @@
+import pytest
+
+import file_lock
+import step_latency
+
+
+@pytest.fixture
+def model(tmp_path):
+    return step_latency.LatencyModel('site', 'env', path=str(tmp_path / 'latency.json'))
+
+
+def test_percentile_is_nearest_rank():
+    samples = list(range(1, 21))
+    assert step_latency.percentile(samples, 0.95) == 19
+    assert step_latency.percentile([7], 0.95) == 7
+
+
+def test_default_until_enough_samples(model):
+    for _ in range(step_latency.MIN_SAMPLES - 1):
+        model.record('wait', 1.0, 10)
+    assert model.timeout('wait', 10) == 10
+
+
+def test_learned_timeout_is_clamped(model):
+    for _ in range(step_latency.MIN_SAMPLES):
+        model.record('wait', 2.0, 10)
+    assert model.timeout('wait', 10) == 2.0 * step_latency.MARGIN + step_latency.PAD
+    assert model.timeout('wait', 40) == 10.0      # floor: a quarter of the default
+    assert model.timeout('wait', 1) == 3.0        # ceiling: three times the default
+
+
+def test_misses_back_off_until_next_success(model):
+    model.record('wait', None, 10)
+    model.record('wait', None, 10)
+    assert model.timeout('wait', 10) == round(10 * step_latency.BACKOFF ** 2, 1)
+    model.record('wait', 1.0, 10)
+    assert model.timeout('wait', 10) == 10
+
+
+def test_step_records_sample_miss_or_nothing(model):
+    with model.step('ok', 10):
+        pass
+    with model.step('slow', 10) as step:
+        step.fail()
+    with model.step('blocked', 10) as step:
+        step.skip()
+    with pytest.raises(RuntimeError):
+        with model.step('crash', 10):
+            raise RuntimeError('boom')
+    steps = step_latency.load_state(model.path)['site']['env']
+    assert len(steps['ok']['samples']) == 1 and steps['ok']['misses'] == 0
+    assert steps['slow'] == {'samples': [], 'misses': 1, 'default': 10}
+    assert steps['crash']['misses'] == 1
+    assert 'blocked' not in steps
+
+
+def test_record_gives_up_when_lock_stays_busy(model, tmp_path, monkeypatch):
+    monkeypatch.setattr(step_latency, 'LOCK_TIMEOUT', 0.1)
+    lock = file_lock.try_lock('step_latency', str(tmp_path / 'locks'))
+    try:
+        assert not model.record('wait', 1.0, 10)
+    finally:
+        lock.close()
+    assert model.record('wait', 1.0, 10)
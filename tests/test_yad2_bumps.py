@@ -0,0 +1,47 @@
+import pytest
+
+import yad2_bumps
+
+
+@pytest.mark.parametrize('text, seconds', [
+    ('05:12:30', 5 * 3600 + 12 * 60 + 30),
+    ('1:05:12:30', 86400 + 5 * 3600 + 12 * 60 + 30),
+    ('12:30', 12 * 3600 + 30 * 60),
+    ('בעוד 3 שעות ו-20 דקות', 3 * 3600 + 20 * 60),
+    ('בעוד שעתיים', 2 * 3600),
+    ('יום ו-4 שעות', 86400 + 4 * 3600),
+    ('עוד 45 שניות', 45),
+    ('2 hours 15 minutes', 2 * 3600 + 15 * 60),
+    ('1 Day', 86400),
+])
+def test_parse_countdown(text, seconds):
+    assert yad2_bumps.parse_countdown(text) == seconds
+
+
+@pytest.mark.parametrize('text', ['', None, 'הקפץ עכשיו', '2h 15m', '5 m', 'days2 hoursx', 'bump this ad'])
+def test_parse_countdown_rejects_unit_letters_and_other_text(text):
+    assert yad2_bumps.parse_countdown(text) is None
+
+
+def test_record_countdowns_keeps_parsed_ads(tmp_path):
+    path = str(tmp_path / 'bumps.json')
+    unparsed = yad2_bumps.record_countdowns({'a': '01:00:00', 'b': '?'}, now=1000.0, path=path)
+    assert unparsed == ['b']
+    assert yad2_bumps.load_state(path)['ads'] == {'a': {'eligible_at': 4600.0, 'countdown': 3600, 'text': '01:00:00'}}
+
+
+def test_batch_window_follows_the_first_countdown(tmp_path):
+    path = str(tmp_path / 'bumps.json')
+    # first ad 4 h out: a 12 minute window takes the ad 10 minutes later, not the one 15 minutes later
+    yad2_bumps.record_countdowns({'a': '04:00:00', 'b': '04:10:00', 'c': '04:15:00'}, now=0.0, path=path)
+    assert yad2_bumps.next_wakeup(0.0, path=path) == 4 * 3600 + 10 * 60
+    # first ad 10 minutes out: a 30 second window, nothing to batch
+    yad2_bumps.record_countdowns({'a': '10 דקות', 'b': '12 דקות'}, now=0.0, path=path)
+    assert yad2_bumps.next_wakeup(0.0, path=path) == 10 * 60
+
+
+def test_next_wakeup_keeps_min_gap_and_handles_empty_state(tmp_path):
+    path = str(tmp_path / 'bumps.json')
+    assert yad2_bumps.next_wakeup(0.0, path=path) is None
+    yad2_bumps.record_countdowns({'a': '1 דקה'}, now=0.0, path=path)
+    assert yad2_bumps.next_wakeup(0.0, path=path) == yad2_bumps.MIN_GAP
@@ -1,23 +1,25 @@
 import time
 from seleniumbase import page_actions
 from seleniumbase import DriverContext
-from sbvirtualdisplay import Display
+from display_pool import DisplayPool
+import run_logging
+
+log = run_logging.setup_logging('verify_undetected')
 
 
 def verify_success(driver):
     page_actions.wait_for_text(
         driver, "OH YEAH, you passed!", "h1", by="css selector"
     )
-    print("\n Success! Website did not detect Selenium!")
+    log.info("[OK] Success! Website did not detect Selenium!")
 
 
 def fail_me():
     raise Exception('Selenium was detected! Try using: "pytest --uc"')
 
 
-display = Display(visible=0, size=(1440, 1880))
-display.start()
-with DriverContext(uc=True, headless=False) as driver:
+# Lease a long-lived Xvfb display from the pool instead of starting a fresh one
+with DisplayPool().lease(), DriverContext(uc=True, headless=False) as driver:
     driver.get("https://nowsecure.nl/#relax")
     try:
         verify_success(driver)
@@ -46,5 +48,4 @@ with DriverContext(uc=True, headless=False) as driver:
     time.sleep(2)
     screenshot_name = "now_secure_image.png"
     driver.save_screenshot(screenshot_name)
-    print("\nScreenshot saved to: %s\n" % screenshot_name)
-display.stop()
+    log.info("Screenshot saved to: %s" % screenshot_name)
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""Persistent Chrome profile per flow, kept warm for its HTTP cache.
+
+With --uc every run normally gets a fresh temporary profile and downloads
+all of the site's JS, CSS, fonts and images again. A managed profile in
+~/.cache/pytests_profiles/<name> keeps the disk cache between runs:
+
+  - the HTTP cache is capped with --disk-cache-size (Chrome evicts LRU
+    itself); after each run all cache folders together are trimmed back to
+    CACHE_CAP_MB, least recently written files first
+  - one run at a time per profile: an exclusive file lock is held for the
+    whole browser session; when it stays busy the run falls back to a
+    temporary profile instead of sharing (Chrome corrupts shared profiles)
+  - stale Singleton* files of a crashed Chrome are removed under the lock
+  - session state (cookies, storages, service workers) is cleared before
+    every run, so logins behave exactly as with a fresh profile
+  - `cleanup` (scheduled daily by scheduler.py) also scrubs history, site
+    engagement and other tracking state while keeping the cached assets
+
+Usage:
+    with warm_profile.lease('shufersal') as path:   # None when busy
+        ...
+    python warm_profile.py cleanup [name ...]
+    python warm_profile.py status
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+from contextlib import contextmanager
+
+from file_lock import try_lock, wait_lock
+
+log = logging.getLogger(__name__)
+
+PROFILES_DIR = os.environ.get('WARM_PROFILE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'pytests_profiles'))
+CACHE_CAP_MB = int(os.environ.get('WARM_PROFILE_CACHE_MB', 300))
+LOCK_TIMEOUT = 60.0
+EXIT_BUSY = 12   # not the scheduler's EXIT_LOCKED (75): a busy profile is retried on the job's backoff
+
+# Relative to the profile (user data dir); these are kept by every scrub
+CACHE_DIRS = [
+    os.path.join('Default', 'Cache'),
+    os.path.join('Default', 'Code Cache'),
+    os.path.join('Default', 'GPUCache'),
+    'GrShaderCache',
+    'GraphiteDawnCache',
+    'ShaderCache',
+]
+
+SESSION_STATE = [
+    os.path.join('Default', 'Cookies'),
+    os.path.join('Default', 'Cookies-journal'),
+    os.path.join('Default', 'Network', 'Cookies'),
+    os.path.join('Default', 'Network', 'Cookies-journal'),
+    os.path.join('Default', 'Local Storage'),
+    os.path.join('Default', 'Session Storage'),
+    os.path.join('Default', 'Sessions'),
+    os.path.join('Default', 'IndexedDB'),
+    os.path.join('Default', 'Service Worker'),
+    os.path.join('Default', 'Shared Dictionary'),
+    os.path.join('Default', 'shared_proto_db'),
+    os.path.join('Default', 'WebStorage'),
+]
+
+TRACKING_STATE = SESSION_STATE + [
+    os.path.join('Default', 'History'),
+    os.path.join('Default', 'History-journal'),
+    os.path.join('Default', 'Visited Links'),
+    os.path.join('Default', 'Top Sites'),
+    os.path.join('Default', 'Top Sites-journal'),
+    os.path.join('Default', 'Shortcuts'),
+    os.path.join('Default', 'Shortcuts-journal'),
+    os.path.join('Default', 'Favicons'),
+    os.path.join('Default', 'Favicons-journal'),
+    os.path.join('Default', 'Network Action Predictor'),
+    os.path.join('Default', 'Network Action Predictor-journal'),
+    os.path.join('Default', 'Web Data'),
+    os.path.join('Default', 'Web Data-journal'),
+    os.path.join('Default', 'Login Data'),
+    os.path.join('Default', 'Login Data-journal'),
+    os.path.join('Default', 'Network', 'Network Persistent State'),
+    os.path.join('Default', 'Network', 'Reporting and NEL'),
+    os.path.join('Default', 'Network', 'Reporting and NEL-journal'),
+    os.path.join('Default', 'Network', 'Trust Tokens'),
+    os.path.join('Default', 'Network', 'Trust Tokens-journal'),
+    os.path.join('Default', 'Network', 'TransportSecurity'),
+    os.path.join('Default', 'Safe Browsing Cookies'),
+    os.path.join('Default', 'Safe Browsing Cookies-journal'),
+    os.path.join('Default', 'Site Characteristics Database'),
+    os.path.join('Default', 'BudgetDatabase'),
+    os.path.join('Default', 'Platform Notifications'),
+]
+
+SINGLETON_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie')
+
+
+def profile_path(name):
+    return os.path.join(PROFILES_DIR, name)
+
+
+def chromium_args(existing=None, cap_mb=CACHE_CAP_MB):
+    """Comma-separated --chromium-arg value with the HTTP cache cap appended"""
+    args = [a for a in (existing or '').split(',') if a and not a.startswith('--disk-cache-size')]
+    return ','.join(args + [f'--disk-cache-size={cap_mb * 2**20}'])
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def scrub(path, entries):
+    """Delete the given profile entries; returns how many existed"""
+    removed = 0
+    for entry in entries:
+        target = os.path.join(path, entry)
+        if os.path.lexists(target):
+            _remove(target)
+            removed += 1
+    return removed
+
+
+def cache_files(path):
+    """[(mtime, size, file)] of every cache file except the cache indexes"""
+    files = []
+    for folder in CACHE_DIRS:
+        for root, dirs, names in os.walk(os.path.join(path, folder)):
+            dirs[:] = [d for d in dirs if d != 'index-dir']
+            for name in names:
+                if name in ('index', 'the-real-index'):
+                    continue
+                file = os.path.join(root, name)
+                try:
+                    st = os.stat(file)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, file))
+    return files
+
+
+def trim_cache(path, cap_mb=CACHE_CAP_MB):
+    """Evict least recently written cache files until all cache folders fit in cap_mb; returns bytes freed"""
+    files = cache_files(path)
+    excess = sum(size for _, size, _ in files) - cap_mb * 2**20
+    freed = 0
+    for _, size, file in sorted(files):
+        if freed >= excess:
+            break
+        try:
+            os.remove(file)
+        except OSError:
+            continue
+        freed += size
+    return freed
+
+
+@contextmanager
+def lease(name, timeout=LOCK_TIMEOUT, cap_mb=CACHE_CAP_MB):
+    """Hold the profile for the duration of the block; yields its path, or None when it stayed busy"""
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    lock = wait_lock(name, PROFILES_DIR, timeout)
+    if lock is None:
+        log.warning(f"[WARN] Profile '{name}' is in use by another run, using a temporary profile")
+        yield None
+        return
+    path = profile_path(name)
+    try:
+        os.makedirs(path, exist_ok=True)
+        scrub(path, SINGLETON_FILES)
+        scrub(path, SESSION_STATE)
+        cached = sum(size for _, size, _ in cache_files(path))
+        log.info(f"[CACHE] Warm profile {path} ({cached / 2**20:.0f}MB cached)")
+        yield path
+    finally:
+        try:
+            freed = trim_cache(path, cap_mb)
+            if freed:
+                log.info(f"[CACHE] Trimmed {freed / 2**20:.0f}MB of least recently used cache")
+        finally:
+            lock.close()
+
+
+def cleanup(names=None, cap_mb=CACHE_CAP_MB):
+    """Scrub tracking state and trim the cache of idle profiles; returns the names that were busy"""
+    if not os.path.isdir(PROFILES_DIR):
+        return []
+    names = names or sorted(n for n in os.listdir(PROFILES_DIR) if os.path.isdir(profile_path(n)))
+    busy = []
+    for name in names:
+        lock = try_lock(name, PROFILES_DIR)
+        if lock is None:
+            busy.append(name)
+            continue
+        try:
+            path = profile_path(name)
+            removed = scrub(path, TRACKING_STATE)
+            freed = trim_cache(path, cap_mb)
+            log.info(f"[CLEAN] {name}: {removed} tracking entries removed, {freed / 2**20:.0f}MB cache trimmed")
+        finally:
+            lock.close()
+    return busy
+
+
+def status():
+    if not os.path.isdir(PROFILES_DIR):
+        print(f"No warm profiles in {PROFILES_DIR}")
+        return
+    for name in sorted(os.listdir(PROFILES_DIR)):
+        path = profile_path(name)
+        if os.path.isdir(path):
+            files = cache_files(path)
+            newest = max((m for m, _, _ in files), default=None)
+            age = f"{(time.time() - newest) / 3600:.1f}h ago" if newest else 'never'
+            print(f"{name}: {sum(s for _, s, _ in files) / 2**20:.0f}MB cache (cap {CACHE_CAP_MB}MB), last written {age}")
+
+
+if __name__ == '__main__':
+    import run_logging
+    run_logging.setup_logging('warm_profile')
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if command == 'cleanup':
+        busy = cleanup(sys.argv[2:])
+        if busy:
+            log.warning(f"[WARN] Profiles in use, not cleaned: {', '.join(busy)}")
+            sys.exit(EXIT_BUSY)
+    elif command == 'status':
+        status()
+    else:
+        print(__doc__)
+        sys.exit(2)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Yad2 bump eligibility: turns the "time until jump" countdowns into wake-up times.
+
+test_y2.py reads each ad's span[class*=details_counter] and records it here as
+an absolute eligibility time in data/yad2_bumps.json. The scheduler's yad2 job
+asks next_wakeup() when to launch the browser next: at the earliest eligibility
+time, stretched by up to BATCH_SHARE of that ad's countdown so ads that become
+eligible close together are bumped in a single launch.
+
+Usage:
+    python yad2_bumps.py       # print recorded ads and the next wake-up
+"""
+import os
+import re
+import json
+import time
+import datetime
+
+STATE_FILE = os.path.join('.', 'data', 'yad2_bumps.json')
+BATCH_SHARE = 0.05       # the first eligible ad waits at most this share of its countdown for a batch
+MIN_GAP = 5 * 60         # never wake up sooner than this after the previous run
+
+# Hebrew and English unit words as details_counter renders them -> seconds
+_UNITS = [
+    (('יומיים',), 2 * 86400),
+    (('שעתיים',), 2 * 3600),
+    (('ימים', 'יום', 'days', 'day'), 86400),
+    (('שעות', 'שעה', 'hours', 'hour'), 3600),
+    (('דקות', 'דקה', 'minutes', 'minute'), 60),
+    (('שניות', 'שנייה', 'שניה', 'seconds', 'second'), 1),
+]
+_UNIT_RE = re.compile(r'(\d+)?\s*(?<![a-zא-ת])(' + '|'.join(w for words, _ in _UNITS for w in words) + r')(?![a-zא-ת\d])',
+                      re.IGNORECASE)
+_CLOCK_RE = re.compile(r'\d+(?::\d{2}){1,3}')
+
+
+def parse_countdown(text):
+    """
+    Seconds until the ad can be bumped, from the counter text, or None if unrecognised.
+    Accepts clock formats ("05:12:30", "1:05:12:30" with days, "12:30" as HH:MM) and
+    unit phrases ("בעוד 3 שעות ו-20 דקות", "2 hours 15 minutes"); a unit without a number counts as 1.
+    """
+    if not text:
+        return None
+    text = text.strip()
+    match = _CLOCK_RE.search(text)
+    if match:
+        fields = [int(x) for x in match.group().split(':')]
+        if len(fields) == 2:   # HH:MM
+            fields.append(0)
+        fields = [0] * (4 - len(fields)) + fields
+        days, hours, minutes, seconds = fields
+        return days * 86400 + hours * 3600 + minutes * 60 + seconds
+    total, found = 0, False
+    for number, word in _UNIT_RE.findall(text):
+        for words, seconds in _UNITS:
+            if word.lower() in words:
+                total += int(number or 1) * seconds
+                found = True
+                break
+    return total if found else None
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {'ads': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def record_countdowns(countdowns, now=None, path=STATE_FILE):
+    """
+    Replace the recorded ads with {ad_key: counter_text} from the current run.
+    Returns the keys whose text could not be parsed (those ads get no wake-up).
+    """
+    now = time.time() if now is None else now
+    ads, unparsed = {}, []
+    for key, text in countdowns.items():
+        seconds = parse_countdown(text)
+        if seconds is None:
+            unparsed.append(key)
+            continue
+        ads[key] = {'eligible_at': now + seconds, 'countdown': seconds, 'text': text}
+    save_state({'updated': now, 'ads': ads}, path)
+    return unparsed
+
+
+def next_wakeup(after, share=BATCH_SHARE, path=STATE_FILE):
+    """
+    When to launch the bump job next (epoch), or None when no ad is recorded.
+    Starts at the earliest eligibility and moves to the last one within share of that
+    ad's countdown, so one launch bumps the whole batch: an ad read at 4 hours waits
+    up to 12 minutes for others, one read at 10 minutes only 30 seconds.
+    """
+    state = load_state(path)
+    ads = sorted(state['ads'].values(), key=lambda ad: ad['eligible_at'])
+    if not ads:
+        return None
+    first = ads[0]
+    # states written before countdowns were stored: the time from the recording run
+    countdown = first.get('countdown', first['eligible_at'] - state.get('updated', first['eligible_at']))
+    window = max(countdown, 0) * share
+    batch = [ad['eligible_at'] for ad in ads if ad['eligible_at'] <= first['eligible_at'] + window]
+    return max(batch[-1], after + MIN_GAP)
+
+
+if __name__ == '__main__':
+    state = load_state()
+    for key, ad in sorted(state['ads'].items(), key=lambda item: item[1]['eligible_at']):
+        eligible = datetime.datetime.fromtimestamp(ad['eligible_at']).strftime('%Y-%m-%d %H:%M')
+        print(f"{key:30} eligible={eligible} ({ad['text']})")
+    wakeup = next_wakeup(time.time())
+    print("next wake-up:", datetime.datetime.fromtimestamp(wakeup).strftime('%Y-%m-%d %H:%M') if wakeup else 'none recorded')